@@ -0,0 +1,175 @@
+import os
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from account_deletion import models
+from authentication.models import User
+from cravings.models import Craving
+from cravings.feed_cache import feed_cache
+from cravings.trending import trending_tracker
+from cravings import crud as cravings_crud
+from responses.models import Response
+from notifications.models import Notification
+from notifications.crud import discount_unread
+from user_profile.models import UserProfile
+from vendor_profile.models import VendorProfile, VendorItem
+from vendor_profile.crud import item_price_stats
+from archive.models import ArchivedCraving, ArchivedResponse, ArchivedNotification
+
+ACCOUNT_DELETION_BATCH_SIZE = int(os.getenv("ACCOUNT_DELETION_BATCH_SIZE", "500"))
+ACCOUNT_DELETION_PAUSE_SECONDS = float(os.getenv("ACCOUNT_DELETION_PAUSE_SECONDS", "0.2"))
+
+PENDING = "pending"
+COMPLETED = "completed"
+
+
+def _delete_batch(db: Session, model, *criteria, batch_size: int) -> int:
+    """DELETE ... WHERE pk IN (SELECT pk ... LIMIT n); portable across SQLite and Postgres"""
+    pk = model.__mapper__.primary_key[0]
+    ids = select(pk).where(*criteria).limit(batch_size)
+    result = db.execute(delete(model).where(pk.in_(ids)).execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def _users_cravings(user_id: str):
+    return select(Craving.id).where(Craving.user_id == user_id)
+
+
+def _delete_own_responses(db: Session, user_id: str, batch_size: int) -> int:
+    """The user's responses to other people's cravings; those cravings' counters are recomputed"""
+    rows = db.execute(
+        select(Response.id, Response.craving_id).where(Response.user_id == user_id).limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    db.execute(
+        delete(Response)
+        .where(Response.id.in_([row.id for row in rows]))
+        .execution_options(synchronize_session=False)
+    )
+    cravings_crud.recompute_response_counters(db, list({row.craving_id for row in rows}), commit=False)
+    return len(rows)
+
+
+def _delete_craving_notifications(db: Session, user_id: str, batch_size: int) -> int:
+    """Other users' notifications about this user's cravings; their unread counters drop accordingly"""
+    ids = db.execute(
+        select(Notification.id).where(Notification.craving_id.in_(_users_cravings(user_id))).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    discount_unread(db, Notification.id.in_(ids))
+    db.execute(delete(Notification).where(Notification.id.in_(ids)).execution_options(synchronize_session=False))
+    return len(ids)
+
+
+def _delete_cravings(db: Session, user_id: str, batch_size: int) -> int:
+    """The user's cravings; each batch also leaves the trending tracker"""
+    ids = db.execute(select(Craving.id).where(Craving.user_id == user_id).limit(batch_size)).scalars().all()
+    if not ids:
+        return 0
+    db.execute(delete(Craving).where(Craving.id.in_(ids)).execution_options(synchronize_session=False))
+    for craving_id in ids:
+        trending_tracker.discard(craving_id)
+    return len(ids)
+
+
+def _delete_profiles(db: Session, user_id: str, batch_size: int) -> int:
+    deleted = _delete_batch(db, VendorProfile, VendorProfile.vendor_id == user_id, batch_size=batch_size)
+    return deleted + _delete_batch(db, UserProfile, UserProfile.user_id == user_id, batch_size=batch_size)
+
+
+# Children before parents, so every statement only ever touches one bounded batch
+# and the ON DELETE CASCADE clauses never have anything left to fan out to.
+STAGES: list[tuple[str, Callable[[Session, str, int], int]]] = [
+    ("notifications", lambda db, uid, n: _delete_batch(db, Notification, Notification.user_id == uid, batch_size=n)),
+    ("craving_notifications", _delete_craving_notifications),
+    ("craving_responses", lambda db, uid, n: _delete_batch(
+        db, Response, Response.craving_id.in_(_users_cravings(uid)), batch_size=n)),
+    ("responses", _delete_own_responses),
+    ("cravings", _delete_cravings),
+    ("vendor_items", lambda db, uid, n: _delete_batch(db, VendorItem, VendorItem.vendor_id == uid, batch_size=n)),
+    ("profiles", _delete_profiles),
+    ("archived_notifications", lambda db, uid, n: _delete_batch(
+        db, ArchivedNotification, ArchivedNotification.user_id == uid, batch_size=n)),
+    ("archived_craving_responses", lambda db, uid, n: _delete_batch(
+        db, ArchivedResponse,
+        ArchivedResponse.craving_id.in_(select(ArchivedCraving.id).where(ArchivedCraving.user_id == uid)),
+        batch_size=n)),
+    ("archived_responses", lambda db, uid, n: _delete_batch(
+        db, ArchivedResponse, ArchivedResponse.user_id == uid, batch_size=n)),
+    ("archived_cravings", lambda db, uid, n: _delete_batch(
+        db, ArchivedCraving, ArchivedCraving.user_id == uid, batch_size=n)),
+    ("user", lambda db, uid, n: _delete_batch(db, User, User.id == uid, batch_size=n)),
+]
+STAGE_NAMES = [name for name, _ in STAGES]
+
+
+def request_account_deletion(db: Session, user: User) -> models.AccountDeletion:
+    """Disable the account right away and queue the data for background deletion"""
+    user.disabled = True
+    job = db.get(models.AccountDeletion, user.id)
+    if job is None:
+        job = models.AccountDeletion(user_id=user.id, status=PENDING, stage=STAGE_NAMES[0], rows_deleted=0)
+        db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_pending_deletions(db: Session) -> list[str]:
+    return [
+        row.user_id
+        for row in db.query(models.AccountDeletion.user_id).filter(
+            models.AccountDeletion.status == PENDING
+        ).order_by(models.AccountDeletion.requested_at)
+    ]
+
+
+def process_account_deletion(
+    db: Session,
+    user_id: str,
+    batch_size: int = ACCOUNT_DELETION_BATCH_SIZE,
+    pause: float = ACCOUNT_DELETION_PAUSE_SECONDS,
+    report: Optional[Callable[[models.AccountDeletion, str, int], None]] = None,
+) -> Optional[models.AccountDeletion]:
+    """
+    Run (or resume) a queued deletion. Every batch is its own transaction that
+    also records the job's stage and running total, so after a crash the job
+    picks up at the stage it was in. Re-running a stage is harmless: each one
+    only deletes whatever is still there.
+    """
+    job = db.get(models.AccountDeletion, user_id)
+    if job is None or job.status == COMPLETED:
+        return job
+
+    start = STAGE_NAMES.index(job.stage) if job.stage in STAGE_NAMES else 0
+    for index in range(start, len(STAGES)):
+        name, step = STAGES[index]
+        stage_deleted = 0
+        while True:
+            deleted = step(db, user_id, batch_size)
+            stage_deleted += deleted
+            finished = deleted < batch_size
+            job.rows_deleted += deleted
+            job.stage = STAGE_NAMES[index + 1] if finished and index + 1 < len(STAGES) else name
+            db.commit()
+            if report:
+                report(job, name, deleted)
+            if deleted:
+                time.sleep(pause)
+            if finished:
+                break
+        if name == "cravings":
+            feed_cache.bump_version()
+            cravings_crud.craving_price_stats.mark_stale(stage_deleted)
+        elif name == "vendor_items":
+            item_price_stats.mark_stale(stage_deleted)
+
+    job.status = COMPLETED
+    job.stage = None
+    job.completed_at = datetime.utcnow()
+    db.commit()
+    return job
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, DateTime, func
+from database import Base
+
+
+class AccountDeletion(Base):
+    """
+    Progress of a background account deletion. Keyed by user id without a
+    foreign key so the record outlives the user row it describes.
+    """
+    __tablename__ = "account_deletions"
+
+    user_id = Column(String, primary_key=True, index=True)
+    status = Column(String(20), default="pending", nullable=False, index=True)  # pending / completed
+    stage = Column(String(40), nullable=True)  # Next stage to run (see account_deletion.crud.STAGES)
+    rows_deleted = Column(Integer, default=0, server_default="0", nullable=False)
+
+    requested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -16,7 +16,10 @@ from user_profile.models import UserProfile
 from vendor_profile.models import VendorProfile, ServiceCategory, VendorItem
 from cravings.models import Craving, CravingStatus, CravingCategory
 from responses.models import Response, ResponseStatus
-from notifications.models import Notification, NotificationType
+from notifications.models import Notification, NotificationOutbox, NotificationType
+from archive.models import ArchivedCraving, ArchivedResponse, ArchivedNotification
+from account_deletion.models import AccountDeletion
+from idempotency.models import IdempotencyRecord
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
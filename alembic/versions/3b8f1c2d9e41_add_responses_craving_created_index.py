@@ -0,0 +1,33 @@
+"""add_responses_craving_created_index
+
+Revision ID: 3b8f1c2d9e41
+Revises: 7566ec630e2f
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8f1c2d9e41'
+down_revision: Union[str, Sequence[str], None] = '7566ec630e2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_responses_craving_id_created_at',
+        'responses',
+        ['craving_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_responses_craving_id_created_at', table_name='responses')
@@ -0,0 +1,33 @@
+"""add_craving_response_counters
+
+Revision ID: 5c2e7a9b1f03
+Revises: 3b8f1c2d9e41
+Create Date: 2026-10-18 10:03:12.771940
+
+Run `python repair_craving_counters.py` after upgrading to backfill existing rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e7a9b1f03'
+down_revision: Union[str, Sequence[str], None] = '3b8f1c2d9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cravings', sa.Column('response_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('cravings', sa.Column('pending_response_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('cravings', sa.Column('last_response_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cravings', 'last_response_at')
+    op.drop_column('cravings', 'pending_response_count')
+    op.drop_column('cravings', 'response_count')
@@ -0,0 +1,111 @@
+"""add_archive_tables
+
+Revision ID: 8d4a6f0e2b57
+Revises: 5c2e7a9b1f03
+Create Date: 2026-10-18 11:26:48.090215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4a6f0e2b57'
+down_revision: Union[str, Sequence[str], None] = '5c2e7a9b1f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Reuse the enum types already created for the hot tables
+craving_category = postgresql.ENUM(
+    'food', 'snacks', 'drinks', 'gadgets', 'furniture', 'electronics', 'clothing', 'beauty_health', 'books', 'other',
+    name='cravingcategory', create_type=False,
+)
+craving_status = postgresql.ENUM('open', 'in_progress', 'fulfilled', 'cancelled', name='cravingstatus', create_type=False)
+response_status = postgresql.ENUM('pending', 'accepted', 'rejected', 'completed', name='responsestatus', create_type=False)
+notification_type = postgresql.ENUM(
+    'craving_response', 'response_accepted', 'response_rejected', 'craving_fulfilled', 'new_message', 'system',
+    name='notificationtype', create_type=False,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'archived_cravings',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('category', craving_category, nullable=False),
+        sa.Column('status', craving_status, nullable=False),
+        sa.Column('price_estimate', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('delivery_address', sa.Text(), nullable=True),
+        sa.Column('recommended_vendor', sa.String(), nullable=True),
+        sa.Column('vendor_contact', sa.String(), nullable=True),
+        sa.Column('share_token', sa.String(), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('response_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('pending_response_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_response_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('fulfilled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_archived_cravings_id', 'archived_cravings', ['id'], unique=False)
+    op.create_index('ix_archived_cravings_user_id', 'archived_cravings', ['user_id'], unique=False)
+    op.create_index('ix_archived_cravings_share_token', 'archived_cravings', ['share_token'], unique=True)
+
+    op.create_table(
+        'archived_responses',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('craving_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('status', response_status, nullable=False),
+        sa.Column('is_anonymous', sa.Boolean(), nullable=False),
+        sa.Column('anonymous_name', sa.String(length=100), nullable=True),
+        sa.Column('anonymous_contact', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_archived_responses_id', 'archived_responses', ['id'], unique=False)
+    op.create_index('ix_archived_responses_user_id', 'archived_responses', ['user_id'], unique=False)
+    op.create_index(
+        'ix_archived_responses_craving_id_created_at',
+        'archived_responses',
+        ['craving_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+    op.create_table(
+        'archived_notifications',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('notification_type', notification_type, nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('craving_id', sa.String(), nullable=True),
+        sa.Column('response_id', sa.String(), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=False),
+        sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_archived_notifications_id', 'archived_notifications', ['id'], unique=False)
+    op.create_index('ix_archived_notifications_user_id', 'archived_notifications', ['user_id'], unique=False)
+    op.create_index('ix_archived_notifications_craving_id', 'archived_notifications', ['craving_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('archived_notifications')
+    op.drop_table('archived_responses')
+    op.drop_table('archived_cravings')
@@ -0,0 +1,32 @@
+"""add_notification_coalescing
+
+Revision ID: a3c8e1f7b246
+Revises: e4a7c2b9d051
+Create Date: 2026-10-19 15:02:37.284619
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c8e1f7b246'
+down_revision: Union[str, Sequence[str], None] = 'e4a7c2b9d051'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('notifications', sa.Column('recent_actors', sa.JSON(), nullable=True))
+    op.add_column('notification_outbox', sa.Column('actor_name', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notification_outbox', 'actor_name')
+    op.drop_column('notifications', 'recent_actors')
+    op.drop_column('notifications', 'count')
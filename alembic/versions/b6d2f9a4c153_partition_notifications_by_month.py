@@ -0,0 +1,94 @@
+"""partition_notifications_by_month
+
+Revision ID: b6d2f9a4c153
+Revises: a3c8e1f7b246
+Create Date: 2026-10-19 16:20:48.517302
+
+Postgres only: rebuilds `notifications` as a table partitioned by month on
+created_at, so notifications/retention.py can drop expired months as whole
+partitions. Partitions cover the existing rows up to PARTITIONS_AHEAD months
+from now (the pruner keeps creating them ahead of time) plus a DEFAULT
+partition as a safety net. Partitioned primary keys must include the
+partition key, hence (id, created_at). SQLite keeps the plain table and the
+pruner's batched deletes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2f9a4c153'
+down_revision: Union[str, Sequence[str], None] = 'a3c8e1f7b246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3
+
+# (column, referred table, ON DELETE), named like c4a8e1f05d92 names them
+FOREIGN_KEYS = [
+    ('user_id', 'users', 'CASCADE'),
+    ('craving_id', 'cravings', 'CASCADE'),
+    ('response_id', 'responses', 'SET NULL'),
+]
+INDEXES = [
+    ('ix_notifications_id', 'id'),
+    ('ix_notifications_user_id', 'user_id'),
+    ('ix_notifications_user_id_created_at', 'user_id, created_at'),
+]
+
+
+def _rebuild(partitioned: bool) -> None:
+    """Copy `notifications` into a new table (partitioned or not) and swap it in"""
+    op.execute(
+        "CREATE TABLE notifications_new (LIKE notifications INCLUDING DEFAULTS)"
+        + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+    )
+    if partitioned:
+        op.execute(f"""
+            DO $$
+            DECLARE
+                month date;
+            BEGIN
+                FOR month IN
+                    SELECT generate_series(
+                        date_trunc('month', COALESCE((SELECT min(created_at) FROM notifications), now())),
+                        date_trunc('month', now()) + interval '{PARTITIONS_AHEAD} months',
+                        interval '1 month'
+                    )::date
+                LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF notifications_new FOR VALUES FROM (%L) TO (%L)',
+                        'notifications_p' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+                    );
+                END LOOP;
+            END $$
+        """)
+        op.execute("CREATE TABLE notifications_default PARTITION OF notifications_new DEFAULT")
+    op.execute("INSERT INTO notifications_new SELECT * FROM notifications")
+    op.execute("DROP TABLE notifications")
+    op.execute("ALTER TABLE notifications_new RENAME TO notifications")
+
+    primary_key = "id, created_at" if partitioned else "id"
+    op.execute(f"ALTER TABLE notifications ADD CONSTRAINT notifications_pkey PRIMARY KEY ({primary_key})")
+    for column, referred_table, ondelete in FOREIGN_KEYS:
+        op.execute(
+            f"ALTER TABLE notifications ADD CONSTRAINT notifications_{column}_fkey FOREIGN KEY ({column}) "
+            f"REFERENCES {referred_table} (id) ON DELETE {ondelete}"
+        )
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON notifications ({columns})")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _rebuild(partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _rebuild(partitioned=False)
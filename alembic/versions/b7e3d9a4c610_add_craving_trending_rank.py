@@ -0,0 +1,30 @@
+"""add_craving_trending_rank
+
+Revision ID: b7e3d9a4c610
+Revises: 8d4a6f0e2b57
+Create Date: 2026-10-18 12:04:37.218664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d9a4c610'
+down_revision: Union[str, Sequence[str], None] = '8d4a6f0e2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cravings', sa.Column('trending_rank', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_cravings_trending_rank'), 'cravings', ['trending_rank'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cravings_trending_rank'), table_name='cravings')
+    op.drop_column('cravings', 'trending_rank')
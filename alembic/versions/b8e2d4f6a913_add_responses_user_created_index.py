@@ -0,0 +1,32 @@
+"""add_responses_user_created_index
+
+Revision ID: b8e2d4f6a913
+Revises: a3c9e5f71b08
+Create Date: 2026-10-19 10:04:52.731946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2d4f6a913'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e5f71b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_responses_user_id_created_at',
+        'responses',
+        ['user_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_responses_user_id_created_at', table_name='responses')
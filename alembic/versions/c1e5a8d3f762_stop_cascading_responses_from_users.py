@@ -0,0 +1,43 @@
+"""stop_cascading_responses_from_users
+
+Revision ID: c1e5a8d3f762
+Revises: b6d2f9a4c153
+Create Date: 2026-10-19 17:05:12.340981
+
+responses.user_id loses ON DELETE CASCADE: responses removed by a user
+delete left their cravings' response counters stale. Accounts are deleted by
+account_deletion, which removes the user's responses (and recomputes those
+counters) before the user row.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1e5a8d3f762'
+down_revision: Union[str, Sequence[str], None] = 'b6d2f9a4c153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_user_foreign_key(ondelete) -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # SQLite can't ALTER constraints; dev databases are built by create_all from the models
+        return
+    for fk in sa.inspect(bind).get_foreign_keys('responses'):
+        if fk['constrained_columns'] == ['user_id'] and fk['referred_table'] == 'users':
+            op.drop_constraint(fk['name'], 'responses', type_='foreignkey')
+    op.create_foreign_key('responses_user_id_fkey', 'responses', 'users', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_user_foreign_key(None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_user_foreign_key('CASCADE')
@@ -0,0 +1,62 @@
+"""add_on_delete_cascades
+
+Revision ID: c4a8e1f05d92
+Revises: b7e3d9a4c610
+Create Date: 2026-10-18 13:12:05.604318
+
+Recreates foreign keys with ON DELETE actions so deleting a user or a craving
+is a single statement. Constraint names are looked up rather than assumed,
+since the original tables were created outside Alembic.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e1f05d92'
+down_revision: Union[str, Sequence[str], None] = 'b7e3d9a4c610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table, referred column, ON DELETE)
+FOREIGN_KEYS = [
+    ('cravings', 'user_id', 'users', 'id', 'CASCADE'),
+    ('responses', 'craving_id', 'cravings', 'id', 'CASCADE'),
+    ('responses', 'user_id', 'users', 'id', 'CASCADE'),
+    ('notifications', 'user_id', 'users', 'id', 'CASCADE'),
+    ('notifications', 'craving_id', 'cravings', 'id', 'CASCADE'),
+    ('notifications', 'response_id', 'responses', 'id', 'SET NULL'),
+    ('user_profiles', 'user_id', 'users', 'id', 'CASCADE'),
+    ('vendor_profiles', 'vendor_id', 'users', 'id', 'CASCADE'),
+    ('vendor_profiles', 'service_category_id', 'service_categories', 'id', 'SET NULL'),
+    ('vendor_items', 'vendor_id', 'vendor_profiles', 'vendor_id', 'CASCADE'),
+]
+
+
+def _replace_foreign_keys(ondelete_for) -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # SQLite can't ALTER constraints; dev databases are built by create_all from the models
+        return
+    inspector = sa.inspect(bind)
+    for table, column, referred_table, referred_column, ondelete in FOREIGN_KEYS:
+        for fk in inspector.get_foreign_keys(table):
+            if fk['constrained_columns'] == [column] and fk['referred_table'] == referred_table:
+                op.drop_constraint(fk['name'], table, type_='foreignkey')
+        op.create_foreign_key(
+            f'{table}_{column}_fkey', table, referred_table,
+            [column], [referred_column],
+            ondelete=ondelete_for(ondelete),
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_foreign_keys(lambda ondelete: ondelete)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_foreign_keys(lambda ondelete: None)
@@ -0,0 +1,29 @@
+"""add_user_unread_notification_count
+
+Revision ID: c7f3a9d2e615
+Revises: b8e2d4f6a913
+Create Date: 2026-10-19 11:12:37.408215
+
+Run `python repair_notification_counters.py` after upgrading to backfill existing rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f3a9d2e615'
+down_revision: Union[str, Sequence[str], None] = 'b8e2d4f6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('unread_notification_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'unread_notification_count')
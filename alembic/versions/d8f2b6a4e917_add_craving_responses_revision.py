@@ -0,0 +1,31 @@
+"""add_craving_responses_revision
+
+Revision ID: d8f2b6a4e917
+Revises: c1e5a8d3f762
+Create Date: 2026-10-19 17:48:26.905113
+
+Response edits used to bump cravings.last_response_at so craving ETags
+changed; they now bump this counter instead and last_response_at only moves
+for new responses.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2b6a4e917'
+down_revision: Union[str, Sequence[str], None] = 'c1e5a8d3f762'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cravings', sa.Column('responses_revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cravings', 'responses_revision')
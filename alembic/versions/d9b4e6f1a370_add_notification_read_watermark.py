@@ -0,0 +1,30 @@
+"""add_notification_read_watermark
+
+Revision ID: d9b4e6f1a370
+Revises: c7f3a9d2e615
+Create Date: 2026-10-19 12:26:08.164503
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4e6f1a370'
+down_revision: Union[str, Sequence[str], None] = 'c7f3a9d2e615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('notifications_read_through', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_user_id_created_at', table_name='notifications')
+    op.drop_column('users', 'notifications_read_through')
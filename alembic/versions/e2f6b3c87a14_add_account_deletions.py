@@ -0,0 +1,41 @@
+"""add_account_deletions
+
+Revision ID: e2f6b3c87a14
+Revises: c4a8e1f05d92
+Create Date: 2026-10-18 13:48:51.330927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f6b3c87a14'
+down_revision: Union[str, Sequence[str], None] = 'c4a8e1f05d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('account_deletions',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('stage', sa.String(length=40), nullable=True),
+    sa.Column('rows_deleted', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('requested_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_account_deletions_user_id'), 'account_deletions', ['user_id'], unique=False)
+    op.create_index(op.f('ix_account_deletions_status'), 'account_deletions', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_account_deletions_status'), table_name='account_deletions')
+    op.drop_index(op.f('ix_account_deletions_user_id'), table_name='account_deletions')
+    op.drop_table('account_deletions')
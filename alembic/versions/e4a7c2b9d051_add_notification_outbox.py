@@ -0,0 +1,49 @@
+"""add_notification_outbox
+
+Revision ID: e4a7c2b9d051
+Revises: d9b4e6f1a370
+Create Date: 2026-10-19 13:41:55.620318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2b9d051'
+down_revision: Union[str, Sequence[str], None] = 'd9b4e6f1a370'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Reuse the enum type already created for notifications
+notification_type = postgresql.ENUM(
+    'craving_response', 'response_accepted', 'response_rejected', 'craving_fulfilled', 'new_message', 'system',
+    name='notificationtype', create_type=False,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('notification_type', notification_type, nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('craving_id', sa.String(), nullable=True),
+        sa.Column('response_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['craving_id'], ['cravings.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['response_id'], ['responses.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('notification_outbox')
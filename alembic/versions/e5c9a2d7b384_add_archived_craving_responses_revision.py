@@ -0,0 +1,30 @@
+"""add_archived_craving_responses_revision
+
+Revision ID: e5c9a2d7b384
+Revises: d8f2b6a4e917
+Create Date: 2026-10-19 19:12:40.381527
+
+archived_cravings mirrors cravings (rows move with INSERT ... SELECT), and
+archived craving ETags have the same validator shape as hot ones.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c9a2d7b384'
+down_revision: Union[str, Sequence[str], None] = 'd8f2b6a4e917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('archived_cravings', sa.Column('responses_revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('archived_cravings', 'responses_revision')
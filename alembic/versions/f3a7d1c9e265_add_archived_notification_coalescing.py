@@ -0,0 +1,33 @@
+"""add_archived_notification_coalescing
+
+Revision ID: f3a7d1c9e265
+Revises: e5c9a2d7b384
+Create Date: 2026-10-19 19:40:12.664093
+
+archived_notifications mirrors notifications (rows move with INSERT ...
+SELECT), so archived coalesced notifications keep their count and actors
+and show up in exports like live ones.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7d1c9e265'
+down_revision: Union[str, Sequence[str], None] = 'e5c9a2d7b384'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('archived_notifications', sa.Column('count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('archived_notifications', sa.Column('recent_actors', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('archived_notifications', 'recent_actors')
+    op.drop_column('archived_notifications', 'count')
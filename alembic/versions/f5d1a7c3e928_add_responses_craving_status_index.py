@@ -0,0 +1,32 @@
+"""add_responses_craving_status_index
+
+Revision ID: f5d1a7c3e928
+Revises: e2f6b3c87a14
+Create Date: 2026-10-18 14:31:40.117205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5d1a7c3e928'
+down_revision: Union[str, Sequence[str], None] = 'e2f6b3c87a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_responses_craving_id_status_created_at',
+        'responses',
+        ['craving_id', 'status', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_responses_craving_id_status_created_at', table_name='responses')
@@ -0,0 +1,117 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from archive import models
+from cravings.models import Craving, CravingStatus
+from responses.models import Response
+from notifications.models import Notification
+from responses import crud as responses_crud
+from notifications.crud import discount_unread, read_clause
+
+# Closed cravings older than this many days are moved to the archive tables
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVABLE_STATUSES = (CravingStatus.fulfilled, CravingStatus.cancelled)
+
+
+def _copy_rows(db: Session, source, target, where, **computed):
+    """
+    INSERT INTO target (...) SELECT ... FROM source WHERE ... for every shared
+    column; `computed` maps column names to SQL expressions to copy instead.
+    """
+    names = [column.name for column in target.__table__.columns if column.name != "archived_at"]
+    db.execute(
+        insert(target.__table__).from_select(
+            names,
+            select(*[computed.get(name, source.__table__.c[name]) for name in names]).where(where),
+        )
+    )
+
+
+def archive_closed_cravings_batch(db: Session, older_than: datetime, batch_size: int = 200) -> int:
+    """
+    Move up to `batch_size` fulfilled/cancelled cravings closed before `older_than`,
+    together with their responses and notifications, into the archive tables.
+
+    Everything happens set-based in a single transaction, so a crash leaves the
+    batch either fully archived or untouched. Returns the number of cravings moved.
+    """
+    closed_at = func.coalesce(Craving.fulfilled_at, Craving.updated_at)
+    craving_ids = db.execute(
+        select(Craving.id)
+        .where(Craving.status.in_(ARCHIVABLE_STATUSES), closed_at < older_than)
+        .limit(batch_size)
+    ).scalars().all()
+    if not craving_ids:
+        return 0
+
+    response_ids = select(Response.id).where(Response.craving_id.in_(craving_ids))
+    notification_filter = or_(
+        Notification.craving_id.in_(craving_ids),
+        Notification.response_id.in_(response_ids),
+    )
+    response_filter = Response.craving_id.in_(craving_ids)
+    craving_filter = Craving.id.in_(craving_ids)
+
+    try:
+        _copy_rows(db, Craving, models.ArchivedCraving, craving_filter)
+        _copy_rows(db, Response, models.ArchivedResponse, response_filter)
+        # Archived rows have no watermark to compare against, so store whether they were read
+        _copy_rows(db, Notification, models.ArchivedNotification, notification_filter, is_read=read_clause())
+
+        # Children first so foreign keys on the hot tables are never violated
+        discount_unread(db, notification_filter)
+        db.execute(delete(Notification).where(notification_filter).execution_options(synchronize_session=False))
+        db.execute(delete(Response).where(response_filter).execution_options(synchronize_session=False))
+        db.execute(delete(Craving).where(craving_filter).execution_options(synchronize_session=False))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(craving_ids)
+
+
+def archive_cutoff(days: int = ARCHIVE_AFTER_DAYS) -> datetime:
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def _archived_craving_query(db: Session, *columns, craving_id: str = None, share_token: str = None):
+    query = db.query(*columns) if columns else db.query(models.ArchivedCraving)
+    if share_token is not None:
+        return query.filter(models.ArchivedCraving.share_token == share_token)
+    return query.filter(models.ArchivedCraving.id == craving_id)
+
+
+def get_archived_craving_version(db: Session, craving_id: str = None, share_token: str = None):
+    """Same validator shape as cravings.crud.get_craving_version, read from the archive"""
+    return _archived_craving_query(
+        db,
+        models.ArchivedCraving.id,
+        models.ArchivedCraving.updated_at,
+        models.ArchivedCraving.response_count,
+        models.ArchivedCraving.pending_response_count,
+        models.ArchivedCraving.last_response_at,
+        models.ArchivedCraving.responses_revision,
+        craving_id=craving_id,
+        share_token=share_token,
+    ).first()
+
+
+def get_archived_craving_detail(
+    db: Session,
+    craving_id: str = None,
+    share_token: str = None,
+    responses_limit: int = 20,
+    responses_cursor: str = None,
+):
+    """Archived craving with a bounded page of archived responses, shaped like the hot detail"""
+    archived = _archived_craving_query(db, craving_id=craving_id, share_token=share_token).first()
+    if not archived:
+        return None
+
+    responses, next_cursor = responses_crud.get_craving_responses_page(
+        db, archived.id, limit=responses_limit, cursor=responses_cursor, model=models.ArchivedResponse
+    )
+    archived.responses = responses
+    archived.responses_next_cursor = next_cursor
+    return archived
@@ -0,0 +1,82 @@
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Enum as SAEnum, Index, Integer, JSON, Numeric, func
+from database import Base
+from cravings.models import CravingStatus, CravingCategory
+from responses.models import ResponseStatus
+from notifications.models import NotificationType
+
+
+# Cold storage for closed cravings and everything hanging off them.
+# Columns mirror the hot tables (including legacy column names) so rows can be
+# moved with INSERT ... SELECT. There are no foreign keys: archived rows must not
+# block deleting users or cravings in the hot tables.
+
+class ArchivedCraving(Base):
+    __tablename__ = "archived_cravings"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+
+    name = Column("title", String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    category = Column(SAEnum(CravingCategory), nullable=False)
+    status = Column(SAEnum(CravingStatus), nullable=False)
+    price_estimate = Column(Numeric(10, 2), nullable=True)
+    image_url = Column(String, nullable=True)
+    delivery_address = Column(Text, nullable=True)
+    recommended_vendor = Column(String, nullable=True)
+    vendor_link = Column("vendor_contact", String, nullable=True)
+    share_token = Column(String, unique=True, nullable=False, index=True)
+    notes = Column(Text, nullable=True)
+
+    response_count = Column(Integer, default=0, server_default="0", nullable=False)
+    pending_response_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_response_at = Column(DateTime(timezone=True), nullable=True)
+    responses_revision = Column(Integer, default=0, server_default="0", nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    fulfilled_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ArchivedResponse(Base):
+    __tablename__ = "archived_responses"
+    __table_args__ = (
+        Index("ix_archived_responses_craving_id_created_at", "craving_id", "created_at", "id"),
+    )
+
+    id = Column(String, primary_key=True, index=True)
+    craving_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=True, index=True)
+
+    message = Column(Text, nullable=False)
+    status = Column(SAEnum(ResponseStatus), nullable=False)
+
+    is_anonymous = Column(Boolean, default=False, nullable=False)
+    anonymous_name = Column(String(100), nullable=True)
+    anonymous_contact = Column(String(200), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ArchivedNotification(Base):
+    __tablename__ = "archived_notifications"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, nullable=False, index=True)
+
+    notification_type = Column(SAEnum(NotificationType), nullable=False)
+    title = Column(String(200), nullable=False)
+    message = Column(Text, nullable=False)
+
+    craving_id = Column(String, nullable=True, index=True)
+    response_id = Column(String, nullable=True)
+
+    is_read = Column(Boolean, default=False, nullable=False)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    count = Column(Integer, default=1, server_default="1", nullable=False)
+    recent_actors = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,53 @@
+"""
+Move fulfilled/cancelled cravings closed more than N days ago (with their
+responses and notifications) into the archive tables.
+
+Each batch is a single transaction; the script sleeps between batches so the
+primary database is never saturated. Safe to stop and re-run at any time.
+Archived cravings stay readable via GET /cravings/{id} and share links.
+
+Usage: python archive_cravings.py [--days 90] [--batch-size 200] [--pause 0.5] [--max-batches N]
+"""
+import argparse
+import time
+
+from database import SessionLocal
+from authentication.models import User  # noqa: F401 - register mappers
+from user_profile.models import UserProfile  # noqa: F401
+from vendor_profile.models import VendorProfile  # noqa: F401
+from archive import crud
+from archive.crud import ARCHIVE_AFTER_DAYS
+
+
+def archive_cravings(days: int = ARCHIVE_AFTER_DAYS, batch_size: int = 200, pause: float = 0.5, max_batches: int = None):
+    db = SessionLocal()
+    cutoff = crud.archive_cutoff(days)
+    archived = 0
+    batches = 0
+
+    try:
+        print(f"🔄 Archiving cravings closed before {cutoff.isoformat()}...")
+        while max_batches is None or batches < max_batches:
+            moved = crud.archive_closed_cravings_batch(db, cutoff, batch_size=batch_size)
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+            print(f"   batch {batches}: {moved} cravings archived ({archived} total)")
+            time.sleep(pause)
+
+        print(f"✅ Archival complete: {archived} cravings archived in {batches} batches")
+    except Exception as e:
+        print(f"❌ Archival failed after {archived} cravings: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old fulfilled/cancelled cravings in throttled batches")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.5, help="Seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    archive_cravings(days=args.days, batch_size=args.batch_size, pause=args.pause, max_batches=args.max_batches)
@@ -1,8 +1,9 @@
+import logging
 import os
 import re
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status, APIRouter, Request
+from fastapi import BackgroundTasks, Depends, HTTPException, status, APIRouter, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
@@ -16,12 +17,14 @@ except ImportError:  # pragma: no cover - handled at runtime if optional depende
     google_id_token = None
 
 from authentication import schemas, models, crud
-from database import get_db, engine
+from database import SessionLocal, get_db, engine
 from vendor_profile.models import VendorProfile
 from user_profile.models import UserProfile
+from account_deletion import crud as deletion_crud
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -126,23 +129,26 @@ def _verify_google_id_token(id_token: str) -> dict:
     return payload
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Authentication failed. Please log in again.",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def user_from_token(db: Session, token: str) -> Optional[models.User]:
+    """User an access token belongs to, or None if the token is invalid"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    user = crud.get_user_by_username(db, username=token_data.username)
+        return None
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    return crud.get_user_by_username(db, username=schemas.TokenData(username=username).username)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    user = user_from_token(db, token)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed. Please log in again.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
@@ -444,6 +450,39 @@ def change_password(
     }
 
 
+def _run_account_deletion(user_id: str):
+    """
+    Background half of DELETE /users/me; delete_accounts.py resumes it if this
+    process dies. Runs after the request's session is closed, so it opens its own.
+    """
+    with SessionLocal() as db:
+        try:
+            deletion_crud.process_account_deletion(db, user_id)
+        except Exception:
+            db.rollback()
+            logger.exception("Account deletion for %s interrupted", user_id)
+
+
+@router.delete("/users/me", response_model=schemas.GenericResponse, status_code=status.HTTP_202_ACCEPTED)
+def delete_current_user(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Delete the current account
+    
+    The account is disabled immediately; its data is removed in the background
+    """
+    job = deletion_crud.request_account_deletion(db, current_user)
+    background_tasks.add_task(_run_account_deletion, current_user.id)
+    return {
+        "success": True,
+        "message": "Account deletion scheduled",
+        "data": {"status": job.status, "requested_at": job.requested_at}
+    }
+
+
 @router.get("/users/{user_id}", response_model=schemas.GenericResponse)
 def read_user(
     user_id: str, 
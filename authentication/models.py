@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Enum, TIMESTAMP, text
+from sqlalchemy import Column, String, Boolean, DateTime, Enum, Integer, TIMESTAMP, text
 from sqlalchemy.orm import relationship
 from database import Base
 import shortuuid
@@ -24,10 +24,16 @@ class User(Base):
     updated_at = Column(TIMESTAMP, server_default=text("now()"), onupdate=text("now()"))
 
     active_role = Column(Enum(UserType), default=UserType.user, nullable=True)
+
+    # Denormalized, maintained by notifications/crud.py (repair_notification_counters.py fixes drift)
+    unread_notification_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Notifications created at or before this are read ("mark all read"), whatever their own flag
+    notifications_read_through = Column(DateTime(timezone=True), nullable=True)
    
-    # Relationships
-    profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    vendor_profile = relationship("VendorProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    cravings = relationship("Craving", back_populates="user", cascade="all, delete-orphan")
-    responses = relationship("Response", back_populates="user", cascade="all, delete-orphan")
-    notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    # Relationships (child rows are removed by ON DELETE CASCADE, not loaded and deleted one by one)
+    profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    vendor_profile = relationship("VendorProfile", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    cravings = relationship("Craving", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    # Deleted by account_deletion (which fixes craving counters), never by the ORM or the database
+    responses = relationship("Response", back_populates="user", passive_deletes="all")
+    notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
@@ -131,3 +131,7 @@ class StandardResponse(BaseModel, Generic[T]):
     success: bool
     message: str
     data: Optional[T] = None
+
+class PagedResponse(StandardResponse[T], Generic[T]):
+    """A page of a keyset-paginated list; pass `next_cursor` back as `cursor` (None on the last page)"""
+    next_cursor: Optional[str] = None
@@ -0,0 +1,42 @@
+"""
+Craving detail payload cost as the number of responses grows.
+
+Compares the old lazy `Craving.responses` load against crud.get_craving_detail,
+which embeds a bounded page plus a COUNT. The bounded path should stay flat.
+
+Usage: python -m benchmarks.bench_craving_detail
+"""
+from benchmarks.common import make_session, seed_craving, measure, print_table
+from cravings import crud, models, schemas
+
+
+def main():
+    rows = []
+    for response_count in (10, 100, 1000, 5000):
+        db = make_session()
+        craving_id = seed_craving(db, response_count).id
+
+        def lazy_detail():
+            db.expunge_all()
+            craving = db.query(models.Craving).filter(models.Craving.id == craving_id).first()
+            schemas.CravingWithResponses.model_validate(craving).model_dump_json()
+
+        def bounded_detail():
+            db.expunge_all()
+            craving = crud.get_craving_detail(db, craving_id=craving_id)
+            schemas.CravingWithResponses.model_validate(craving).model_dump_json()
+
+        lazy_ms, lazy_kib = measure(lazy_detail)
+        bounded_ms, bounded_kib = measure(bounded_detail)
+        rows.append([response_count, lazy_ms, bounded_ms, lazy_kib, bounded_kib])
+        db.close()
+
+    print_table(
+        "Craving detail (median ms / peak KiB)",
+        ["responses", "lazy ms", "bounded ms", "lazy KiB", "bounded KiB"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Craving response listing cost as the number of responses grows.
+
+Compares the old unbounded crud.get_craving_responses against one keyset page
+from crud.get_craving_responses_page (first page, a page deep in the list via
+its cursor, and a status-filtered page). The paged paths should stay flat.
+
+Usage: python -m benchmarks.bench_craving_responses
+"""
+from typing import List
+
+from benchmarks.common import make_session, seed_craving, measure, print_table
+from fast_json import render_model
+from responses import crud, schemas
+from responses.models import ResponseStatus
+
+PAGE_SIZE = 50
+STATUSES = [ResponseStatus.pending, ResponseStatus.pending, ResponseStatus.rejected, ResponseStatus.accepted]
+
+
+def main():
+    rows = []
+    for response_count in (100, 1000, 10000, 50000):
+        db = make_session()
+        craving_id = seed_craving(db, response_count, statuses=STATUSES).id
+
+        # Cursor pointing roughly at the middle of the list
+        cursor, skipped = None, 0
+        while skipped < response_count // 2:
+            _, cursor = crud.get_craving_responses_page(db, craving_id, limit=PAGE_SIZE, cursor=cursor)
+            skipped += PAGE_SIZE
+
+        def render(responses):
+            db.expunge_all()
+            render_model(List[schemas.ResponseOut], responses)
+
+        def unbounded():
+            db.expunge_all()
+            render(crud.get_craving_responses(db, craving_id))
+
+        def first_page():
+            db.expunge_all()
+            render(crud.get_craving_responses_page(db, craving_id, limit=PAGE_SIZE)[0])
+
+        def deep_page():
+            db.expunge_all()
+            render(crud.get_craving_responses_page(db, craving_id, limit=PAGE_SIZE, cursor=cursor)[0])
+
+        def accepted_page():
+            db.expunge_all()
+            render(crud.get_craving_responses_page(db, craving_id, limit=PAGE_SIZE, status=ResponseStatus.accepted.value)[0])
+
+        rows.append([
+            response_count,
+            measure(unbounded, repeat=5)[0],
+            measure(first_page)[0],
+            measure(deep_page)[0],
+            measure(accepted_page)[0],
+        ])
+        db.close()
+
+    print_table(
+        f"Craving responses listing (median ms, page size {PAGE_SIZE})",
+        ["responses", "unbounded", "first page", "middle page", "accepted page"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cost of marking a user's notifications read as their unread backlog grows.
+
+Compares the old path (load every unread Notification, flag them read in
+a Python loop, flush one UPDATE per row) against crud.mark_all_as_read, which
+only moves the user's read-through watermark, and the set-based
+crud.mark_notifications_as_read. Peak memory of both should stay flat
+whatever the number of rows.
+
+Usage: python -m benchmarks.bench_mark_read
+"""
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from benchmarks.common import make_session, measure, print_table
+from authentication.models import User
+from notifications import crud
+from notifications.models import Notification, NotificationType
+
+USER_ID = "bench-user"
+
+
+def seed_notifications(db, count: int) -> list[str]:
+    start = datetime(2024, 1, 1)
+    db.add(User(id=USER_ID, username="bench", email="bench@example.com", hashed_password="x", created_at=start))
+    ids = [f"n{i:08d}" for i in range(count)]
+    db.bulk_insert_mappings(Notification, [
+        {
+            "id": notification_id,
+            "user_id": USER_ID,
+            "notification_type": NotificationType.craving_response,
+            "title": "New Response to Your Craving",
+            "message": f"Responder {i} responded to your craving!",
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i, notification_id in enumerate(ids)
+    ])
+    db.commit()
+    return ids
+
+
+def reset(db, count: int):
+    db.execute(update(Notification).values({Notification.flagged_read: False, Notification.read_at: None}))
+    db.execute(update(User).values(
+        unread_notification_count=count, notifications_read_through=None, updated_at=User.updated_at
+    ))
+    db.commit()
+    db.expunge_all()
+
+
+def orm_mark_all_read(db):
+    """The pre-bulk implementation, for comparison"""
+    notifications = db.query(Notification).filter(
+        Notification.user_id == USER_ID, Notification.flagged_read == False
+    ).all()
+    for notification in notifications:
+        notification.flagged_read = True
+        notification.read_at = datetime.utcnow()
+    db.commit()
+    return len(notifications)
+
+
+def peak_kib(db, count: int, fn) -> float:
+    reset(db, count)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    rows = []
+    for count in (1000, 5000, 20000):
+        db = make_session(with_users=True)
+        ids = seed_notifications(db, count)
+
+        paths = {
+            "orm loop": lambda: orm_mark_all_read(db),
+            "mark all": lambda: crud.mark_all_as_read(db, USER_ID),
+            "bulk by ids": lambda: crud.mark_notifications_as_read(db, ids[:500], USER_ID),
+        }
+        row = [count]
+        for fn in paths.values():
+            row.append(measure(lambda: (reset(db, count), fn()), repeat=3)[0])
+        for fn in paths.values():
+            row.append(peak_kib(db, count, fn))
+        rows.append(row)
+        db.close()
+
+    print_table(
+        "Mark notifications read (median ms incl. reset, then peak KiB without it)",
+        ["unread rows", "orm ms", "mark all ms", "500 ids ms", "orm KiB", "mark all KiB", "500 ids KiB"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+StandardResponse serialization: FastAPI's default path vs fast_json.render_model.
+
+The default path is response-model validation + dump to Python objects +
+jsonable_encoder + json.dumps, exactly as FastAPI runs it for a route.
+Payloads mirror the craving feed, notification list and vendor profile.
+
+Usage: python -m benchmarks.bench_serialization
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from benchmarks.common import print_table
+from authentication.schemas import StandardResponse
+from cravings.schemas import CravingResponse
+from fast_json import render_model
+from notifications.schemas import NotificationResponse
+from vendor_profile.schemas import VendorProfileResponse
+
+NOW = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+REPEAT = 300
+
+
+def craving(i):
+    return SimpleNamespace(
+        id=f"craving-{i}", user_id="user-1", name=f"Craving {i}", description="Something tasty",
+        category="food", price_estimate=Decimal("1500.50"), delivery_address="12 Allen Avenue, Ikeja",
+        recommended_vendor="Mama Put", vendor_link="https://vendor.example/mama-put", notes=None,
+        status="open", image_url=None, share_token=f"share-{i}", created_at=NOW, updated_at=NOW,
+        fulfilled_at=None, response_count=3, pending_response_count=2, last_response_at=NOW,
+    )
+
+
+def notification(i):
+    return SimpleNamespace(
+        id=f"notification-{i}", user_id="user-1", notification_type="craving_response",
+        title="New Response to Your Craving", message="Someone responded to your craving!",
+        craving_id="craving-1", response_id=f"response-{i}", is_read=False, read_at=None, created_at=NOW,
+    )
+
+
+def vendor_profile(item_count):
+    category = SimpleNamespace(id=1, name="Food", description="Food vendors", created_at=NOW, updated_at=NOW)
+    items = [
+        SimpleNamespace(
+            id=f"item-{i}", vendor_id="vendor-1", item_name=f"Item {i}", item_description="House special",
+            item_price=Decimal("18.50"), item_image_url=None, availability_status="available",
+            created_at=NOW, updated_at=NOW,
+        )
+        for i in range(item_count)
+    ]
+    return SimpleNamespace(
+        vendor_id="vendor-1", business_name="Owner Foods", service_category_id=1, vendor_address="1 Vendor Road",
+        vendor_phone="+12345678901", vendor_email="vendor@example.com", logo_url=None, banner_url=None,
+        rating=Decimal("4.50"), is_verified=True, status="active", verification_status="verified",
+        created_at=NOW, updated_at=NOW, category=category, items=items,
+    )
+
+
+async def time_default(model_type, content) -> float:
+    field = create_response_field(name="Response_bench", type_=model_type)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        JSONResponse(await serialize_response(field=field, response_content=content))
+    return (time.perf_counter() - start) * 1000 / REPEAT
+
+
+def time_fast(model_type, content) -> float:
+    render_model(model_type, content)  # build the cached adapter outside the timing loop
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        render_model(model_type, content)
+    return (time.perf_counter() - start) * 1000 / REPEAT
+
+
+def main():
+    payloads = {
+        "cravings": (StandardResponse[List[CravingResponse]], lambda n: [craving(i) for i in range(n)]),
+        "notifications": (StandardResponse[List[NotificationResponse]], lambda n: [notification(i) for i in range(n)]),
+        "vendor profile": (StandardResponse[VendorProfileResponse], vendor_profile),
+    }
+    rows = []
+    for name, (model_type, build) in payloads.items():
+        for size in (1, 50, 100):
+            content = {"success": True, "message": "Retrieved successfully", "data": build(size)}
+            default_ms = asyncio.run(time_default(model_type, content))
+            fast_ms = time_fast(model_type, content)
+            rows.append([name, size, default_ms, fast_ms, round(default_ms / fast_ms, 1)])
+
+    print_table(
+        "StandardResponse serialization (mean ms per response)",
+        ["payload", "items", "default ms", "fast ms", "speed-up x"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
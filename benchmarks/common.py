@@ -0,0 +1,92 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks run against an in-memory SQLite database so they can be executed
+anywhere with: python -m benchmarks.<script_name>
+"""
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import MetaData, create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from database import Base  # noqa: E402
+# Import all models so relationships resolve
+from authentication.models import User  # noqa: E402,F401
+from user_profile.models import UserProfile  # noqa: E402,F401
+from vendor_profile.models import VendorProfile, VendorItem, ServiceCategory  # noqa: E402,F401
+from cravings.models import Craving, CravingCategory  # noqa: E402
+from responses.models import Response  # noqa: E402
+from notifications.models import Notification  # noqa: E402,F401
+
+
+def make_session(with_users: bool = False):
+    """
+    Fresh in-memory database with every table except `users`, whose now() default
+    is Postgres-only. `with_users` adds a copy of it without those defaults
+    (rows must then set created_at themselves).
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    if with_users:
+        users = Base.metadata.tables["users"].to_metadata(MetaData())
+        for column in users.columns:
+            if column.server_default is not None and "now()" in str(column.server_default.arg):
+                column.server_default = None
+        users.create(bind=engine)
+    tables = [t for name, t in Base.metadata.tables.items() if name != "users"]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed_craving(db, response_count: int, user_id: str = "bench-owner", statuses=None) -> Craving:
+    """Craving with `response_count` responses, one second apart; `statuses` (if given) are assigned round-robin"""
+    craving = Craving(user_id=user_id, name="Benchmark craving", category=CravingCategory.food)
+    db.add(craving)
+    db.flush()
+    start = datetime(2024, 1, 1)
+    db.bulk_insert_mappings(Response, [
+        {
+            "id": f"r{i:08d}",
+            "craving_id": craving.id,
+            "user_id": f"responder-{i % 50}",
+            "message": f"Response number {i}",
+            "is_anonymous": False,
+            "created_at": start + timedelta(seconds=i),
+            **({"status": statuses[i % len(statuses)]} if statuses else {}),
+        }
+        for i in range(response_count)
+    ])
+    db.commit()
+    return craving
+
+
+def measure(fn, repeat: int = 20) -> tuple[float, float]:
+    """Return (median latency in ms, peak traced memory in KiB) for fn()"""
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], peak / 1024
+
+
+def print_table(title: str, header: list[str], rows: list[list]):
+    print(f"\n{title}")
+    print(" | ".join(f"{h:>14}" for h in header))
+    for row in rows:
+        print(" | ".join(f"{c:>14.2f}" if isinstance(c, float) else f"{c!s:>14}" for c in row))
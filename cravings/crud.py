@@ -1,7 +1,39 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, noload
+from sqlalchemy.orm.attributes import set_committed_value
 from cravings import models, schemas
+from cravings.feed_cache import feed_cache
+from cravings.trending import trending_tracker, decayed_score, TRENDING_STATUSES
+from responses import crud as responses_crud
+from archive import crud as archive_crud
+from mutations import update_owned, delete_owned, unchanged
+from database import SessionLocal
+from price_stats import PriceStats, PRICE_STATS_REBUILD_SECONDS, PRICE_STATS_MAX_STALE_WRITES, PRICE_STATS_SCAN_BATCH
 from datetime import datetime
 
+# Max responses embedded in a craving detail payload; the rest are paged via cursor
+DETAIL_RESPONSES_LIMIT = 20
+
+
+def _category_key(category) -> str:
+    return getattr(category, "value", category)
+
+
+def _craving_prices(db: Session):
+    rows = db.query(models.Craving.category, models.Craving.price_estimate).filter(
+        models.Craving.price_estimate.isnot(None)
+    ).yield_per(PRICE_STATS_SCAN_BATCH)
+    for category, price in rows:
+        yield _category_key(category), price
+
+
+craving_price_stats = PriceStats(
+    _craving_prices,
+    rebuild_seconds=PRICE_STATS_REBUILD_SECONDS,
+    max_stale_writes=PRICE_STATS_MAX_STALE_WRITES,
+    session_factory=SessionLocal,
+)
+
 
 def create_craving(db: Session, user_id: str, craving: schemas.CravingCreate, image_url: str = None):
     db_craving = models.Craving(
@@ -18,6 +50,8 @@ def create_craving(db: Session, user_id: str, craving: schemas.CravingCreate, im
     )
     db.add(db_craving)
     db.commit()
+    feed_cache.bump_version()
+    craving_price_stats.record(_category_key(craving.category), craving.price_estimate)
     db.refresh(db_craving)
     return db_craving
 
@@ -26,6 +60,81 @@ def get_craving(db: Session, craving_id: str):
     return db.query(models.Craving).filter(models.Craving.id == craving_id).first()
 
 
+# Validator columns of a craving detail: its ETag, and the If-Match check in writes
+CRAVING_VERSION_COLUMNS = (
+    models.Craving.id,
+    models.Craving.updated_at,
+    models.Craving.response_count,
+    models.Craving.pending_response_count,
+    models.Craving.last_response_at,
+    models.Craving.responses_revision,
+)
+
+
+def get_craving_version(db: Session, craving_id: str = None, share_token: str = None):
+    """Validator columns for a craving detail (used for ETags); None if it doesn't exist"""
+    query = db.query(*CRAVING_VERSION_COLUMNS)
+    if share_token is not None:
+        query = query.filter(models.Craving.share_token == share_token)
+    else:
+        query = query.filter(models.Craving.id == craving_id)
+    # Closed cravings may have been moved to the archive tables
+    return query.first() or archive_crud.get_archived_craving_version(db, craving_id=craving_id, share_token=share_token)
+
+
+def get_user_cravings_version(db: Session, user_id: str):
+    """Aggregate validator for a user's craving list, computed without loading rows"""
+    return db.query(
+        func.count(models.Craving.id),
+        func.max(models.Craving.updated_at),
+        func.max(models.Craving.last_response_at),
+        func.sum(models.Craving.response_count),
+        # Accepting/rejecting responses leaves updated_at alone but moves these
+        func.sum(models.Craving.pending_response_count),
+        func.sum(models.Craving.responses_revision),
+    ).filter(models.Craving.user_id == user_id).one()
+
+
+def get_craving_detail(
+    db: Session,
+    craving_id: str = None,
+    share_token: str = None,
+    responses_limit: int = DETAIL_RESPONSES_LIMIT,
+    responses_cursor: str = None,
+):
+    """
+    Load a craving by id or share token with a bounded, newest-first page of responses.
+
+    The `responses` relationship is never lazy-loaded here: the page is fetched with
+    its own LIMIT query and attached to the instance, together with
+    `responses_next_cursor` for the detail schema. Counts come from the
+    denormalized columns, so no COUNT query is needed. Archived cravings are
+    read from the archive tables transparently.
+    """
+    query = db.query(models.Craving).options(noload(models.Craving.responses))
+    if share_token is not None:
+        query = query.filter(models.Craving.share_token == share_token)
+    else:
+        query = query.filter(models.Craving.id == craving_id)
+
+    db_craving = query.first()
+    if not db_craving:
+        return archive_crud.get_archived_craving_detail(
+            db,
+            craving_id=craving_id,
+            share_token=share_token,
+            responses_limit=responses_limit,
+            responses_cursor=responses_cursor,
+        )
+
+    responses, next_cursor = responses_crud.get_craving_responses_page(
+        db, db_craving.id, limit=responses_limit, cursor=responses_cursor
+    )
+    set_committed_value(db_craving, "responses", responses)
+    db_craving.responses_next_cursor = next_cursor
+    return db_craving
+
+
 def get_cravings(db: Session, skip: int = 0, limit: int = 50, status: str = None, category: str = None):
     query = db.query(models.Craving)
     
@@ -37,33 +146,203 @@ def get_cravings(db: Session, skip: int = 0, limit: int = 50, status: str = None
     return query.order_by(models.Craving.created_at.desc()).offset(skip).limit(limit).all()
 
 
+def get_user_cravings_export_queries(db: Session, user_id: str) -> list:
+    """
+    Unmaterialized queries over all of a user's cravings, oldest first (see
+    exports.py): the archived ones, which are older, then the live ones.
+    """
+    return [
+        db.query(model).filter(model.user_id == user_id).order_by(model.created_at, model.id)
+        for model in (archive_crud.models.ArchivedCraving, models.Craving)
+    ]
+
+
+def get_price_stats(db: Session, category: str) -> dict:
+    """Typical craving prices in `category`, served from in-memory sketches"""
+    return {"category": category, **craving_price_stats.summary(db, category)}
+
+
+def get_trending_cravings(db: Session, limit: int = 20):
+    """
+    Top `limit` open cravings by decayed activity. Ids come from the in-process
+    ranking; only those rows are loaded, by primary key.
+    """
+    trending_tracker.refresh()
+    top = trending_tracker.top(limit)
+    if not top:
+        return []
+    rows = {
+        craving.id: craving
+        for craving in db.query(models.Craving).filter(
+            models.Craving.id.in_([craving_id for craving_id, _ in top]),
+            models.Craving.status.in_(TRENDING_STATUSES),
+        )
+    }
+    now = datetime.utcnow()
+    cravings = []
+    for craving_id, rank in top:
+        craving = rows.get(craving_id)
+        if craving is None:
+            # Closed, archived or deleted since the ranking was loaded
+            trending_tracker.discard(craving_id)
+            continue
+        craving.trending_score = decayed_score(rank, now)
+        cravings.append(craving)
+    return cravings
+
+
 def get_user_cravings(db: Session, user_id: str, skip: int = 0, limit: int = 50):
     return db.query(models.Craving).filter(
         models.Craving.user_id == user_id
     ).order_by(models.Craving.created_at.desc()).offset(skip).limit(limit).all()
 
 
-def update_craving(db: Session, craving_id: str, craving_update: schemas.CravingUpdate):
-    db_craving = get_craving(db, craving_id)
-    if not db_craving:
-        return None
-    
-    for key, value in craving_update.model_dump(exclude_unset=True).items():
-        setattr(db_craving, key, value)
+def _version_criteria(db: Session, expected_version) -> tuple:
+    """Compare-and-set criteria for a craving If-Match matched at `expected_version` (none without one)"""
+    if expected_version is None:
+        return ()
+    return tuple(unchanged(db, CRAVING_VERSION_COLUMNS, expected_version))
+
+
+def update_craving(
+    db: Session, craving_id: str, user_id: str, craving_update: schemas.CravingUpdate, expected_version=None
+):
+    """
+    Update a craving owned by `user_id` with a single UPDATE ... RETURNING.
+    Returns None if it doesn't exist, belongs to someone else or no longer
+    matches `expected_version` (see get_craving_version).
+    """
+    data = craving_update.model_dump(exclude_unset=True)
+    values = {getattr(models.Craving, key): value for key, value in data.items()}
     
     # If status is being changed to fulfilled, set fulfilled_at
-    if craving_update.status == schemas.CravingStatus.fulfilled and not db_craving.fulfilled_at:
-        db_craving.fulfilled_at = datetime.utcnow()
+    if craving_update.status == schemas.CravingStatus.fulfilled:
+        values[models.Craving.fulfilled_at] = func.coalesce(models.Craving.fulfilled_at, datetime.utcnow())
     
+    db_craving = update_owned(
+        db, models.Craving.user_id, craving_id, user_id, values, _version_criteria(db, expected_version)
+    )
+    if not db_craving:
+        db.rollback()
+        return None
+    # Keep the returned values loaded instead of expiring them on commit
+    db.expunge(db_craving)
     db.commit()
-    db.refresh(db_craving)
+    feed_cache.bump_version()
+    if "price_estimate" in data or "category" in data:
+        craving_price_stats.mark_stale()
+    if db_craving.status not in TRENDING_STATUSES:
+        trending_tracker.discard(craving_id)
     return db_craving
 
 
-def delete_craving(db: Session, craving_id: str):
-    db_craving = get_craving(db, craving_id)
-    if db_craving:
-        db.delete(db_craving)
+def delete_craving(db: Session, craving_id: str, user_id: str, expected_version=None) -> bool:
+    """
+    Delete a craving owned by `user_id` (still at `expected_version`, if given);
+    responses and notifications go with it via ON DELETE CASCADE
+    """
+    from notifications.crud import discount_unread
+    from notifications.models import Notification
+
+    discount_unread(db, Notification.craving_id == craving_id)
+    if not delete_owned(db, models.Craving.user_id, craving_id, user_id, _version_criteria(db, expected_version)):
+        db.rollback()
+        return False
+    db.commit()
+    feed_cache.bump_version()
+    trending_tracker.discard(craving_id)
+    craving_price_stats.mark_stale()
+    return True
+
+
+def accept_response(db: Session, craving_id: str, response_id: str, user_id: str, expected_version=None):
+    """
+    Accept one pending response to an open craving owned by `user_id` and reject
+    every other pending response, in one transaction: an UPDATE on the craving,
+    one on the accepted response, one bulk UPDATE for the rest and one bulk
+    notification INSERT. Returns (craving, accepted response, rejected count),
+    or None if the craving (still at `expected_version`, if given) or the
+    response doesn't qualify.
+    """
+    from responses.models import Response, ResponseStatus
+    from notifications import crud as notifications_crud
+
+    # Craving first (same lock order as response creation). Every pending response
+    # is resolved below, so the pending counter ends at zero.
+    db_craving = db.scalars(
+        update(models.Craving)
+        .where(
+            models.Craving.id == craving_id,
+            models.Craving.user_id == user_id,
+            models.Craving.status == models.CravingStatus.open,
+            *_version_criteria(db, expected_version),
+        )
+        .values(status=models.CravingStatus.in_progress, pending_response_count=0)
+        .returning(models.Craving),
+        execution_options={"populate_existing": True},
+    ).first()
+    if db_craving is None:
+        db.rollback()
+        return None
+
+    accepted = db.scalars(
+        update(Response)
+        .where(
+            Response.id == response_id,
+            Response.craving_id == craving_id,
+            Response.status == ResponseStatus.pending,
+        )
+        .values(status=ResponseStatus.accepted)
+        .returning(Response),
+        execution_options={"populate_existing": True},
+    ).first()
+    if accepted is None:
+        db.rollback()
+        return None
+
+    rejected = db.execute(
+        update(Response)
+        .where(Response.craving_id == craving_id, Response.status == ResponseStatus.pending)
+        .values(status=ResponseStatus.rejected)
+        .returning(Response.id, Response.user_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    notifications_crud.notify_response_status_changes(
+        db,
+        craving_id,
+        [(accepted.user_id, accepted.id, "accepted")]
+        + [(row.user_id, row.id, "rejected") for row in rejected],
+    )
+    # Keep the returned values loaded instead of expiring them on commit
+    db.expunge(db_craving)
+    db.expunge(accepted)
+    db.commit()
+    feed_cache.bump_version()
+    return db_craving, accepted, len(rejected)
+
+
+def recompute_response_counters(db: Session, craving_ids: list[str], commit: bool = True):
+    """Recompute denormalized response counters for the given cravings in one UPDATE"""
+    from responses.models import Response, ResponseStatus
+
+    def _scalar(*columns, pending=False):
+        query = select(*columns).where(Response.craving_id == models.Craving.id)
+        if pending:
+            query = query.where(Response.status == ResponseStatus.pending)
+        return query.correlate(models.Craving).scalar_subquery()
+
+    result = db.execute(
+        update(models.Craving)
+        .where(models.Craving.id.in_(craving_ids))
+        .values(
+            response_count=_scalar(func.count(Response.id)),
+            pending_response_count=_scalar(func.count(Response.id), pending=True),
+            last_response_at=_scalar(func.max(Response.created_at)),
+            updated_at=models.Craving.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if commit:
         db.commit()
-        return True
-    return False
+    return result.rowcount
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for the shared version counter
+    redis = None
+
+FEED_CACHE_REDIS_URL = os.getenv("FEED_CACHE_REDIS_URL")
+FEED_CACHE_TTL_SECONDS = float(os.getenv("FEED_CACHE_TTL_SECONDS", "5"))
+FEED_CACHE_STALE_SECONDS = float(os.getenv("FEED_CACHE_STALE_SECONDS", "30"))
+FEED_CACHE_MAX_ENTRIES = int(os.getenv("FEED_CACHE_MAX_ENTRIES", "512"))
+
+
+class LocalVersion:
+    """Feed version counter for a single process"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+
+
+class RedisVersion:
+    """Feed version counter shared by every worker through one Redis key"""
+
+    KEY = "feed_cache:version"
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("FEED_CACHE_REDIS_URL is set but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self) -> int:
+        return int(self._client.get(self.KEY) or 0)
+
+    def bump(self):
+        self._client.incr(self.KEY)
+
+
+class FeedCache:
+    """
+    Cache of already-serialized feed pages.
+
+    Every entry is tagged with the feed version it was built from. Writes bump
+    the version, which makes all entries stale at once without walking them.
+    Pages are kept per process but the version lives in `versions`: set
+    FEED_CACHE_REDIS_URL (needs the `redis` package) so a write on any worker
+    invalidates the pages cached by all of them, or plug in another counter
+    with `feed_cache.set_versions`. Stale entries are still served (for up to
+    `stale_ttl` seconds) while a single request per key rebuilds the page, so
+    a burst after an invalidation costs one DB query instead of one per request.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.versions = LocalVersion()
+        self._entries: "OrderedDict[Hashable, tuple[int, float, bytes]]" = OrderedDict()
+        self._locks: dict[Hashable, threading.Lock] = {}
+        self._mutex = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def set_versions(self, versions):
+        self.versions = versions
+
+    def bump_version(self):
+        """Invalidate every cached page (on every worker sharing the counter)"""
+        self.versions.bump()
+
+    def clear(self):
+        with self._mutex:
+            self._entries.clear()
+            self._locks.clear()
+            self.hits = self.stale_hits = self.misses = 0
+
+    def _fresh(self, entry, version: int, now: float) -> bool:
+        return entry is not None and entry[0] == version and now - entry[1] < self.ttl
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], bytes]) -> bytes:
+        """Return the cached payload for `key`, calling `builder` at most once per refresh"""
+        # Read the (possibly remote) counter once, outside the mutex
+        version = self.versions.get()
+        with self._mutex:
+            entry = self._entries.get(key)
+            if self._fresh(entry, version, time.monotonic()):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[2]
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        servable = entry is not None and time.monotonic() - entry[1] < self.ttl + self.stale_ttl
+        if servable:
+            if not lock.acquire(blocking=False):
+                # Someone else is already rebuilding this page
+                with self._mutex:
+                    self.stale_hits += 1
+                return entry[2]
+        else:
+            lock.acquire()
+
+        try:
+            with self._mutex:
+                # Another request may have rebuilt the page while we waited
+                current = self._entries.get(key)
+                if self._fresh(current, version, time.monotonic()):
+                    self.hits += 1
+                    return current[2]
+                self.misses += 1
+
+            payload = builder()
+
+            with self._mutex:
+                self._entries[key] = (version, time.monotonic(), payload)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted_key, _ = self._entries.popitem(last=False)
+                    self._locks.pop(evicted_key, None)
+            return payload
+        finally:
+            lock.release()
+
+    def stats(self) -> dict:
+        version = self.versions.get()
+        with self._mutex:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "version": version,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+feed_cache = FeedCache(
+    ttl=FEED_CACHE_TTL_SECONDS,
+    stale_ttl=FEED_CACHE_STALE_SECONDS,
+    max_entries=FEED_CACHE_MAX_ENTRIES,
+)
+if FEED_CACHE_REDIS_URL:
+    feed_cache.set_versions(RedisVersion(FEED_CACHE_REDIS_URL))
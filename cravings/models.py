@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, ForeignKey, DateTime, Enum as SAEnum, func, Numeric
+from sqlalchemy import Column, String, Text, Boolean, ForeignKey, DateTime, Enum as SAEnum, func, Numeric, Integer, Float
 from sqlalchemy.orm import relationship
 from database import Base
 import shortuuid
@@ -29,7 +29,7 @@ class Craving(Base):
     __tablename__ = "cravings"
 
     id = Column(String, primary_key=True, default=shortuuid.uuid, index=True)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Keep legacy DB column names for compatibility while exposing new API field names.
     name = Column("title", String(200), nullable=False)
@@ -44,10 +44,17 @@ class Craving(Base):
     share_token = Column(String, unique=True, nullable=False, default=shortuuid.uuid, index=True)  # For share URLs
     notes = Column(Text, nullable=True)
     
+    # Denormalized response activity, maintained by responses.crud in the same transaction
+    response_count = Column(Integer, default=0, server_default="0", nullable=False)
+    pending_response_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_response_at = Column(DateTime(timezone=True), nullable=True)  # Last response created
+    responses_revision = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped by response edits (ETags)
+    trending_rank = Column(Float, nullable=True, index=True)  # Log-space decayed activity, see cravings.trending
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     fulfilled_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="cravings")
-    responses = relationship("Response", back_populates="craving", cascade="all, delete-orphan")
+    responses = relationship("Response", back_populates="craving", cascade="all, delete-orphan", passive_deletes=True)
@@ -1,42 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, status, UploadFile, File, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from authentication.auth import get_current_active_user
 from authentication import models as auth_models, schemas as auth_schemas
 from database import get_db
-from cravings import crud, schemas
+from cravings import crud, models, schemas
+from responses import crud as responses_crud
+from cravings.feed_cache import feed_cache
 from cloudinary_setup import upload_image
+from http_cache import weak_etag, not_modified_response, if_match_version, precondition_failed
+from mutations import raise_missing_or_forbidden
+from fast_json import fast_response, render_model
+from exports import ExportFormat, stream_export
+from idempotency.store import IDEMPOTENCY_KEY_MAX_LENGTH, idempotency_store
+from notifications.outbox import outbox_worker
 
 router = APIRouter()
 
+CravingListResponse = auth_schemas.StandardResponse[List[schemas.CravingResponse]]
+
+
+def _version_etag(version) -> str:
+    return weak_etag("craving", *version)
+
+
+def _craving_etag(db: Session, craving_id: str) -> Optional[str]:
+    version = crud.get_craving_version(db, craving_id=craving_id)
+    return _version_etag(version) if version else None
+
+
+def _if_match(request: Request, db: Session, craving_id: str):
+    """Craving version the request's If-Match matched; the write re-checks it in its WHERE clause"""
+    return if_match_version(request, lambda: crud.get_craving_version(db, craving_id=craving_id), _version_etag)
+
+
+def _raise_if_changed(db: Session, craving_id: str, expected_version):
+    """Failure path of a conditional write: 412 if the craving changed after its If-Match check"""
+    if expected_version is None:
+        return
+    current = crud.get_craving_version(db, craving_id=craving_id)
+    if current is not None and tuple(current) != tuple(expected_version):
+        raise precondition_failed()
+
 
 @router.get("/categories", response_model=auth_schemas.GenericResponse)
 def get_craving_categories():
     """Get all available craving categories for dropdowns"""
-    categories = [
-        {"id": cat.value, "name": cat.value.replace("_", " ").title()}
-        for cat in schemas.CravingCategory
-    ]
     return {
         "success": True,
         "message": "Categories retrieved successfully",
-        "data": categories
+        "data": schemas.CRAVING_CATEGORY_OPTIONS
     }
 
 
 @router.post("/", response_model=auth_schemas.StandardResponse[schemas.CravingResponse], status_code=status.HTTP_201_CREATED)
 def create_craving(
     craving: schemas.CravingCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
-    """Create a new craving using JSON payload."""
-    db_craving = crud.create_craving(db, current_user.id, craving)
-    return {
-        "success": True,
-        "message": "Craving created successfully",
-        "data": db_craving
-    }
+    """
+    Create a new craving using JSON payload.
+    Retries sent with the same Idempotency-Key header replay the first result.
+    """
+    user_id = current_user.id
+
+    def create():
+        db_craving = crud.create_craving(db, user_id, craving)
+        return {
+            "success": True,
+            "message": "Craving created successfully",
+            "data": db_craving
+        }
+
+    return idempotency_store.run(
+        db,
+        idempotency_key,
+        scope=f"cravings:create:{user_id}",
+        request=craving.model_dump(mode="json"),
+        model_type=auth_schemas.StandardResponse[schemas.CravingResponse],
+        handler=create,
+        status_code=status.HTTP_201_CREATED,
+    )
 
 
 @router.get("/{craving_id}/share-url", response_model=auth_schemas.GenericResponse)
@@ -90,7 +136,7 @@ async def upload_craving_image(
         raise HTTPException(status_code=500, detail=f"Image upload failed: {str(e)}")
 
 
-@router.get("/", response_model=auth_schemas.StandardResponse[List[schemas.CravingResponse]])
+@router.get("/", response_model=CravingListResponse)
 def list_cravings(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
@@ -99,39 +145,109 @@ def list_cravings(
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
-    """Get all cravings with optional filters"""
-    cravings = crud.get_cravings(db, skip=skip, limit=limit, status=status, category=category)
-    return {
-        "success": True,
-        "message": "Cravings retrieved successfully",
-        "data": cravings
-    }
+    """Get all cravings with optional filters (served from the shared feed cache)"""
+    def build_page() -> bytes:
+        cravings = crud.get_cravings(db, skip=skip, limit=limit, status=status, category=category)
+        return render_model(CravingListResponse, {
+            "success": True,
+            "message": "Cravings retrieved successfully",
+            "data": cravings
+        })
+
+    payload = feed_cache.get_or_build((status, category, skip, limit), build_page)
+    return Response(content=payload, media_type="application/json")
 
 
 @router.get("/my-cravings", response_model=auth_schemas.StandardResponse[List[schemas.CravingResponse]])
 def list_my_cravings(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Get current user's cravings"""
+    etag = weak_etag("my-cravings", current_user.id, *crud.get_user_cravings_version(db, current_user.id))
+    cached = not_modified_response(request, response, etag)
+    if cached:
+        return cached
+
     my_cravings = crud.get_user_cravings(db, current_user.id, skip=skip, limit=limit)
-    return {
+    return fast_response(CravingListResponse, {
         "success": True,
         "message": "Your cravings retrieved successfully",
         "data": my_cravings
-    }
+    }, headers={"ETag": etag})
+
+
+@router.get("/export")
+def export_my_cravings(
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Download all of the current user's cravings as NDJSON or CSV"""
+    queries = crud.get_user_cravings_export_queries(db, current_user.id)
+    return stream_export(db, queries, schemas.CravingResponse, format, "cravings")
+
+
+@router.get("/price-stats", response_model=auth_schemas.StandardResponse[schemas.PriceStatsResponse])
+def get_price_stats(
+    category: schemas.CravingCategory,
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Typical prices (mean, spread and quantiles) of cravings in a category"""
+    return fast_response(auth_schemas.StandardResponse[schemas.PriceStatsResponse], {
+        "success": True,
+        "message": "Price stats retrieved successfully",
+        "data": crud.get_price_stats(db, category.value)
+    })
+
+
+@router.get("/trending", response_model=auth_schemas.StandardResponse[List[schemas.TrendingCravingResponse]])
+def list_trending_cravings(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Get open cravings with the most recent responses and share-link views"""
+    cravings = crud.get_trending_cravings(db, limit=limit)
+    return fast_response(auth_schemas.StandardResponse[List[schemas.TrendingCravingResponse]], {
+        "success": True,
+        "message": "Trending cravings retrieved successfully",
+        "data": cravings
+    })
 
 
 @router.get("/{craving_id}", response_model=auth_schemas.StandardResponse[schemas.CravingWithResponses])
 def get_craving(
     craving_id: str,
+    request: Request,
+    response: Response,
+    responses_limit: int = Query(crud.DETAIL_RESPONSES_LIMIT, ge=1, le=100),
+    responses_cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
-    """Get a specific craving with its responses"""
-    db_craving = crud.get_craving(db, craving_id)
+    """Get a specific craving with a page of its most recent responses"""
+    etag = _craving_etag(db, craving_id)
+    if not etag:
+        raise HTTPException(status_code=404, detail="Craving not found")
+    cached = not_modified_response(request, response, etag)
+    if cached:
+        return cached
+
+    try:
+        db_craving = crud.get_craving_detail(
+            db,
+            craving_id=craving_id,
+            responses_limit=responses_limit,
+            responses_cursor=responses_cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not db_craving:
         raise HTTPException(status_code=404, detail="Craving not found")
     return {
@@ -145,18 +261,21 @@ def get_craving(
 def update_craving(
     craving_id: str,
     craving_update: schemas.CravingUpdate,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Update a craving"""
-    db_craving = crud.get_craving(db, craving_id)
-    if not db_craving:
-        raise HTTPException(status_code=404, detail="Craving not found")
-    
-    if db_craving.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this craving")
+    expected_version = _if_match(request, db, craving_id)
     
-    updated_craving = crud.update_craving(db, craving_id, craving_update)
+    updated_craving = crud.update_craving(db, craving_id, current_user.id, craving_update, expected_version)
+    if not updated_craving:
+        _raise_if_changed(db, craving_id, expected_version)
+        raise_missing_or_forbidden(
+            db, models.Craving.user_id, craving_id,
+            not_found="Craving not found",
+            forbidden="Not authorized to modify this craving",
+        )
     return {
         "success": True,
         "message": "Craving updated successfully",
@@ -164,23 +283,64 @@ def update_craving(
     }
 
 
+@router.post("/{craving_id}/accept/{response_id}", response_model=auth_schemas.StandardResponse[schemas.AcceptResponseResult])
+def accept_response(
+    craving_id: str,
+    response_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Accept one response to your craving and decline every other pending response"""
+    expected_version = _if_match(request, db, craving_id)
+
+    result = crud.accept_response(db, craving_id, response_id, current_user.id, expected_version)
+    if not result:
+        # Failure path only: work out which check rejected the request
+        db_craving = crud.get_craving(db, craving_id)
+        if not db_craving:
+            raise HTTPException(status_code=404, detail="Craving not found")
+        if db_craving.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to modify this craving")
+        _raise_if_changed(db, craving_id, expected_version)
+        if db_craving.status != models.CravingStatus.open:
+            raise HTTPException(status_code=400, detail="Craving is no longer accepting responses")
+        db_response = responses_crud.get_response(db, response_id)
+        if not db_response or db_response.craving_id != craving_id:
+            raise HTTPException(status_code=404, detail="Response not found")
+        raise HTTPException(status_code=400, detail="Only pending responses can be accepted")
+
+    db_craving, accepted, rejected_count = result
+    background_tasks.add_task(outbox_worker.drain)
+    return {
+        "success": True,
+        "message": "Response accepted",
+        "data": {
+            "craving": db_craving,
+            "accepted_response": accepted,
+            "rejected_count": rejected_count,
+        }
+    }
+
+
 @router.delete("/{craving_id}", response_model=auth_schemas.GenericResponse)
 def delete_craving(
     craving_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Delete a craving"""
-    db_craving = crud.get_craving(db, craving_id)
-    if not db_craving:
-        raise HTTPException(status_code=404, detail="Craving not found")
-    
-    if db_craving.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this craving")
+    expected_version = _if_match(request, db, craving_id)
     
-    success = crud.delete_craving(db, craving_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete craving")
+    if not crud.delete_craving(db, craving_id, current_user.id, expected_version):
+        _raise_if_changed(db, craving_id, expected_version)
+        raise_missing_or_forbidden(
+            db, models.Craving.user_id, craving_id,
+            not_found="Craving not found",
+            forbidden="Not authorized to delete this craving",
+        )
     return {
         "success": True,
         "message": "Craving deleted successfully"
@@ -25,6 +25,13 @@ class CravingCategory(str, Enum):
     other = "other"
 
 
+# Dropdown options, built once at import rather than on every request
+CRAVING_CATEGORY_OPTIONS = [
+    {"id": cat.value, "name": cat.value.replace("_", " ").title()}
+    for cat in CravingCategory
+]
+
+
 class CravingBase(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
@@ -82,18 +89,49 @@ class CravingResponse(CravingBase):
     created_at: datetime
     updated_at: datetime
     fulfilled_at: Optional[datetime] = None
+    response_count: int = 0
+    pending_response_count: int = 0
+    last_response_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class TrendingCravingResponse(CravingResponse):
+    trending_score: float = 0.0  # Weighted responses/views, exponentially decayed
+
+    class Config:
+        from_attributes = True
+
+
+class PriceStatsResponse(BaseModel):
+    category: str
+    count: int
+    mean: Optional[float] = None
+    stddev: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+
+
+class AcceptResponseResult(BaseModel):
+    craving: CravingResponse
+    accepted_response: "ResponseOut"
+    rejected_count: int
+
+
 class CravingWithResponses(CravingResponse):
     responses: List["ResponseInCraving"] = []
+    responses_next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
 # Import for forward reference
-from responses.schemas import ResponseInCraving
+from responses.schemas import ResponseInCraving, ResponseOut
 CravingWithResponses.model_rebuild()
+AcceptResponseResult.model_rebuild()
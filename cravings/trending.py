@@ -0,0 +1,247 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from cravings import models
+from database import SessionLocal
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "12"))
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", "500"))
+TRENDING_REFRESH_SECONDS = float(os.getenv("TRENDING_REFRESH_SECONDS", "30"))
+TRENDING_FLUSH_SECONDS = float(os.getenv("TRENDING_FLUSH_SECONDS", "10"))
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_WEIGHT = 3.0
+VIEW_WEIGHT = 1.0
+
+# Ranks are stored in log space relative to a fixed epoch:
+#   rank = log(sum(weight_i * exp((t_i - EPOCH) / TAU)))
+# Ordering by rank equals ordering by the exponentially decayed score at any
+# common instant, so stored ranks never need to be decayed in place.
+_EPOCH = datetime(2026, 1, 1)
+_TAU = TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+TRENDING_STATUSES = (models.CravingStatus.open, models.CravingStatus.in_progress)
+
+
+def event_rank(weight: float, at: Optional[datetime] = None) -> float:
+    at = at or datetime.utcnow()
+    return math.log(weight) + (at - _EPOCH).total_seconds() / _TAU
+
+
+def combine_ranks(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    """log(exp(a) + exp(b)) without overflow"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def decayed_score(rank: Optional[float], at: Optional[datetime] = None) -> float:
+    """Human-scale score: weighted event count decayed to `at`"""
+    if rank is None:
+        return 0.0
+    at = at or datetime.utcnow()
+    return round(math.exp(rank - (at - _EPOCH).total_seconds() / _TAU), 4)
+
+
+def next_rank(db: Session, craving_id: str, weight: float) -> Optional[float]:
+    """
+    Lock the craving row and return its rank after one more event of `weight`.
+    The caller writes the value back in the same transaction.
+    """
+    current = db.query(models.Craving.trending_rank).filter(
+        models.Craving.id == craving_id
+    ).with_for_update().first()
+    if current is None:
+        return None
+    return combine_ranks(current.trending_rank, event_rank(weight))
+
+
+class TrendingTracker:
+    """
+    In-process top-N of cravings by trending rank.
+
+    The candidate set is reloaded from `cravings.trending_rank` every
+    `refresh_seconds`; between reloads it is updated incrementally from
+    response creation (already persisted) and share-link views (buffered and
+    flushed to the DB in one batch every `flush_seconds` by a thread started
+    with the app, so viewing a share link never waits on the write).
+
+    A min-heap over the candidates finds the weakest one to evict in O(log N)
+    (outdated heap entries are skipped lazily), and reads select the top K
+    with heapq.nlargest, cached until the next change. Database work runs on
+    the tracker's own sessions, never on a request's.
+    """
+
+    def __init__(self, capacity: int, refresh_seconds: float, flush_seconds: float):
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.flush_seconds = flush_seconds
+        self._ranks: dict[str, float] = {}
+        self._floor: list[tuple[float, str]] = []  # Min-heap of (rank, id); may hold outdated entries
+        self._ranking: list[str] = []  # Cached top of the ranking, strongest first
+        self._dirty = False
+        self._pending_views: dict[str, float] = {}
+        self._refreshed_at = float("-inf")
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._ranks.clear()
+            self._floor = []
+            self._ranking = []
+            self._pending_views.clear()
+            self._refreshed_at = float("-inf")
+
+    def _reset_floor(self):
+        self._floor = [(rank, craving_id) for craving_id, rank in self._ranks.items()]
+        heapq.heapify(self._floor)
+
+    def _weakest(self) -> str:
+        while self._floor[0][0] != self._ranks.get(self._floor[0][1]):
+            heapq.heappop(self._floor)
+        return self._floor[0][1]
+
+    def _offer(self, craving_id: str, rank: float):
+        """Insert/update a candidate, keeping at most `capacity` entries"""
+        if craving_id not in self._ranks and len(self._ranks) >= self.capacity:
+            weakest = self._weakest()
+            if self._ranks[weakest] >= rank:
+                return
+            del self._ranks[weakest]
+        self._ranks[craving_id] = rank
+        heapq.heappush(self._floor, (rank, craving_id))
+        if len(self._floor) > 2 * self.capacity:
+            # Mostly outdated entries: rebuild so the heap stays O(capacity)
+            self._reset_floor()
+        self._dirty = True
+
+    def observe(self, craving_id: str, rank: Optional[float]):
+        """Record a rank that has already been persisted (e.g. after a new response)"""
+        if rank is None:
+            return
+        with self._lock:
+            self._offer(craving_id, rank)
+
+    def discard(self, craving_id: str):
+        """Drop a craving that can no longer trend (closed or deleted)"""
+        with self._lock:
+            if self._ranks.pop(craving_id, None) is not None:
+                self._dirty = True
+            self._pending_views.pop(craving_id, None)
+
+    def record_view(self, craving_id: str):
+        rank = event_rank(VIEW_WEIGHT)
+        with self._lock:
+            self._pending_views[craving_id] = combine_ranks(self._pending_views.get(craving_id), rank)
+            self._offer(craving_id, combine_ranks(self._ranks.get(craving_id), rank))
+
+    def flush_views(self, db: Session, force: bool = False) -> int:
+        """Persist buffered view events with one locked read and one batched UPDATE"""
+        with self._lock:
+            if not self._pending_views or (not force and time.monotonic() - self._flushed_at < self.flush_seconds):
+                return 0
+            pending, self._pending_views = self._pending_views, {}
+            self._flushed_at = time.monotonic()
+
+        try:
+            rows = db.query(models.Craving.id, models.Craving.trending_rank).filter(
+                models.Craving.id.in_(list(pending))
+            ).with_for_update().all()
+            if rows:
+                db.execute(
+                    update(models.Craving.__table__)
+                    .where(models.Craving.__table__.c.id == bindparam("_id"))
+                    .values(
+                        trending_rank=bindparam("_rank"),
+                        updated_at=models.Craving.__table__.c.updated_at,
+                    ),
+                    [{"_id": row.id, "_rank": combine_ranks(row.trending_rank, pending[row.id])} for row in rows],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for craving_id, rank in pending.items():
+                    self._pending_views[craving_id] = combine_ranks(self._pending_views.get(craving_id), rank)
+            raise
+        return len(rows)
+
+    def flush_pending(self) -> int:
+        """Flush buffered views on a session of its own; failed views stay buffered for the next run"""
+        try:
+            with SessionLocal() as db:
+                return self.flush_views(db, force=True)
+        except Exception:
+            logger.exception("Flushing trending views failed")
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush_pending()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-views", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write back whatever is still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush_pending()
+
+    def refresh(self, force: bool = False):
+        """Reload the candidates (at most every `refresh_seconds`) on a session of its own"""
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return
+            self._refreshed_at = time.monotonic()
+
+        with SessionLocal() as db:
+            self.flush_views(db, force=True)
+            rows = db.query(models.Craving.id, models.Craving.trending_rank).filter(
+                models.Craving.status.in_(TRENDING_STATUSES),
+                models.Craving.trending_rank.isnot(None),
+            ).order_by(models.Craving.trending_rank.desc()).limit(self.capacity).all()
+
+        with self._lock:
+            self._ranks = {row.id: row.trending_rank for row in rows}
+            self._reset_floor()
+            # Views recorded while we were reading are not in the snapshot yet
+            for craving_id, rank in self._pending_views.items():
+                self._offer(craving_id, combine_ranks(self._ranks.get(craving_id), rank))
+            self._dirty = True
+
+    def top(self, k: int) -> list[tuple[str, float]]:
+        """The `k` strongest candidates, strongest first; O(N log K) after a change, a slice otherwise"""
+        with self._lock:
+            if self._dirty or (k > len(self._ranking) and len(self._ranking) < len(self._ranks)):
+                self._ranking = heapq.nlargest(k, self._ranks, key=self._ranks.get)
+                self._dirty = False
+            return [(craving_id, self._ranks[craving_id]) for craving_id in self._ranking[:k]]
+
+
+trending_tracker = TrendingTracker(
+    capacity=TRENDING_CAPACITY,
+    refresh_seconds=TRENDING_REFRESH_SECONDS,
+    flush_seconds=TRENDING_FLUSH_SECONDS,
+)
@@ -0,0 +1,56 @@
+"""
+Finish queued account deletions (DELETE /auth/users/me).
+
+Accounts are disabled as soon as deletion is requested; this job removes
+their data in bounded batches, children before parents, with a pause between
+batches. Progress is stored per batch in `account_deletions`, so the script
+can be stopped and re-run at any time and resumes where it left off.
+
+Usage: python delete_accounts.py [--user-id ID] [--batch-size 500] [--pause 0.2]
+"""
+import argparse
+
+from database import SessionLocal
+from account_deletion import crud
+from account_deletion.crud import ACCOUNT_DELETION_BATCH_SIZE, ACCOUNT_DELETION_PAUSE_SECONDS
+
+
+def _report(job, stage, deleted):
+    print(f"   {job.user_id}: {stage} -{deleted} ({job.rows_deleted} rows so far)")
+
+
+def delete_accounts(
+    user_id: str = None,
+    batch_size: int = ACCOUNT_DELETION_BATCH_SIZE,
+    pause: float = ACCOUNT_DELETION_PAUSE_SECONDS,
+):
+    db = SessionLocal()
+    completed = 0
+
+    try:
+        user_ids = [user_id] if user_id else crud.get_pending_deletions(db)
+        print(f"🔄 {len(user_ids)} account deletion(s) to process...")
+        for pending_id in user_ids:
+            job = crud.process_account_deletion(db, pending_id, batch_size=batch_size, pause=pause, report=_report)
+            if job is None:
+                print(f"⚠️  No deletion requested for {pending_id}")
+                continue
+            completed += 1
+            print(f"✅ {pending_id}: deleted {job.rows_deleted} rows")
+
+        print(f"✅ Account deletion complete: {completed} account(s) removed")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Account deletion stopped after {completed} account(s): {e}")
+        print("   Re-run the script to resume.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete disabled accounts' data in throttled, resumable batches")
+    parser.add_argument("--user-id", default=None, help="Only process this account")
+    parser.add_argument("--batch-size", type=int, default=ACCOUNT_DELETION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=ACCOUNT_DELETION_PAUSE_SECONDS, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+    delete_accounts(user_id=args.user_id, batch_size=args.batch_size, pause=args.pause)
@@ -0,0 +1,48 @@
+"""
+Deliver notifications still queued in the notification outbox.
+
+The API drains the outbox after every write that queues notifications and
+polls it every NOTIFICATIONS_OUTBOX_POLL_SECONDS; run this to flush it by
+hand (e.g. while no API process is up). Each batch is its own transaction, so
+the script can be stopped and re-run at any time.
+
+Usage: python drain_notification_outbox.py [--batch-size 500]
+"""
+import argparse
+
+from database import SessionLocal
+from authentication.models import User  # noqa: F401 - register mappers
+from cravings.models import Craving  # noqa: F401
+from responses.models import Response  # noqa: F401
+from notifications import crud
+from notifications.outbox import NOTIFICATIONS_OUTBOX_BATCH_SIZE, publish
+
+
+def drain_outbox(batch_size: int = NOTIFICATIONS_OUTBOX_BATCH_SIZE):
+    db = SessionLocal()
+    delivered = 0
+
+    try:
+        while True:
+            claimed, events = crud.deliver_outbox_batch(db, batch_size)
+            # Only streams connected to this process (or via NOTIFICATIONS_REDIS_URL) see these
+            publish(events)
+            delivered += len(events)
+            if claimed < batch_size:
+                break
+            print(f"🔄 Delivered {delivered} notifications...")
+
+        print(f"✅ Outbox drained: {delivered} notifications delivered")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Outbox drain stopped after {delivered} notifications: {e}")
+        print("   Re-run the script to resume.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver queued notifications from the outbox in batches")
+    parser.add_argument("--batch-size", type=int, default=NOTIFICATIONS_OUTBOX_BATCH_SIZE)
+    args = parser.parse_args()
+    drain_outbox(batch_size=args.batch_size)
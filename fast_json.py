@@ -0,0 +1,67 @@
+"""
+Opt-in fast JSON responses.
+
+FastAPI's default path validates the returned dict against `response_model`,
+dumps it to Python objects, walks them again with `jsonable_encoder` and
+finally calls `json.dumps`. Routes that opt in here validate once with a
+cached TypeAdapter and let pydantic-core write the JSON bytes directly. The
+bytes are identical to the default encoding (compact separators, non-ASCII
+left unescaped, aliases applied).
+"""
+import json
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up, falls back to json
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def get_adapter(model_type: Any) -> TypeAdapter:
+    """One TypeAdapter (and its compiled validator/serializer) per response type"""
+    return TypeAdapter(model_type)
+
+
+def render_model(model_type: Any, content: Any) -> bytes:
+    """Validate `content` (dicts and ORM objects) as `model_type` and encode it to JSON bytes"""
+    adapter = get_adapter(model_type)
+    value = adapter.validate_python(content, from_attributes=True)
+    return adapter.dump_json(value, by_alias=True)
+
+
+def fast_response(
+    model_type: Any,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Drop-in replacement for returning `content` from a route declared with `response_model=model_type`"""
+    return Response(
+        content=render_model(model_type, content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for plain dict payloads, encoded with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(content)
+            except TypeError:
+                pass
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
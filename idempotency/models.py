@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, LargeBinary, DateTime
+from database import Base
+
+
+class IdempotencyRecord(Base):
+    """
+    Outcome of a request sent with an Idempotency-Key header. `status_code` is
+    NULL while the first request is still running; `expires_at` is then the end
+    of its lease, and the retention deadline once the response is stored.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)  # sha256 of endpoint scope + client key
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+
+    # Naive UTC, compared against datetime.utcnow() in idempotency.store
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,318 @@
+"""
+Idempotency-Key support for create endpoints.
+
+Mobile clients retry POSTs on flaky networks. When a request carries an
+`Idempotency-Key` header the first one runs normally and its serialized
+response is stored; retries with the same key get those bytes back (marked
+`Idempotent-Replayed: true`) without touching the write path.
+
+Stored responses are kept in a bounded in-process LRU in front of the
+`idempotency_keys` table, which all workers share and which keeps them for
+IDEMPOTENCY_TTL_SECONDS. Concurrent duplicates within a process wait on a
+per-key lock and then replay. A duplicate reaching another worker while the
+first request is still running gets 409; the in-flight row is a lease, so a
+retry can take the key over if the worker holding it died. Reusing a key for
+a different request body is rejected with 422. Requests that fail before
+their write commits store nothing and can be retried with the same key.
+
+The handler's first commit also settles the key in the same transaction, so
+a write that went through can never be repeated: if the handler raises after
+committing, the error it returned is stored and replayed, and if the worker
+dies before the response is stored, retries get 409 instead of a second write.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from fast_json import render_model
+from idempotency.models import IdempotencyRecord
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Expired rows are deleted in batches of this size, at most once per interval
+IDEMPOTENCY_PURGE_BATCH = 500
+IDEMPOTENCY_PURGE_SECONDS = 60
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Stored with the handler's write and replaced once its response is rendered
+_LOST_RESPONSE = (
+    status.HTTP_409_CONFLICT,
+    "The request with this Idempotency-Key was applied but its response was lost",
+)
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: bytes
+    expires_at: datetime
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _error_body(message: Any) -> bytes:
+    """Same shape as the app's HTTPException handler"""
+    return json.dumps({"success": False, "message": message, "data": None}, separators=(",", ":")).encode("utf-8")
+
+
+def request_fingerprint(request: Any) -> str:
+    """Stable hash of the JSON-compatible request parameters"""
+    return _digest(json.dumps(request, sort_keys=True, separators=(",", ":"), default=str))
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float, lease: float, cache_size: int):
+        self.ttl = ttl
+        self.lease = lease
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._locks: dict[str, list] = {}  # key -> [lock, number of requests using it]
+        self._mutex = threading.Lock()
+        self._purged_at = time.monotonic()
+
+    def clear(self):
+        with self._mutex:
+            self._cache.clear()
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        with self._mutex:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            entry[0].release()
+            with self._mutex:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def _cached(self, key: str, now: datetime) -> Optional[StoredResponse]:
+        with self._mutex:
+            stored = self._cache.get(key)
+            if stored is None:
+                return None
+            if stored.expires_at <= now:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return stored
+
+    def _remember(self, key: str, stored: StoredResponse):
+        with self._mutex:
+            self._cache[key] = stored
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _claim(self, db: Session, key: str, request_hash: str, now: datetime) -> Optional[StoredResponse]:
+        """Take the lease on `key` (returns None), or return the response already stored for it"""
+        lease_end = now + timedelta(seconds=self.lease)
+        record = None
+        for _ in range(2):
+            db.add(IdempotencyRecord(key=key, request_hash=request_hash, created_at=now, expires_at=lease_end))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+            record = db.get(IdempotencyRecord, key, populate_existing=True)
+            if record is None:
+                continue  # Purged in between: insert again
+            if record.expires_at > now:
+                break
+            # Expired response or abandoned lease: take it over unless another request just did
+            taken = db.execute(
+                update(IdempotencyRecord)
+                .where(IdempotencyRecord.key == key, IdempotencyRecord.expires_at == record.expires_at)
+                .values(request_hash=request_hash, status_code=None, response_body=None, created_at=now, expires_at=lease_end)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if taken:
+                return None
+            record = db.get(IdempotencyRecord, key, populate_existing=True)
+            break
+
+        if record is None or record.status_code is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+                headers={"Retry-After": "1"},
+            )
+        return StoredResponse(record.request_hash, record.status_code, record.response_body, record.expires_at)
+
+    @staticmethod
+    def _store(db: Session, key: str, stored: StoredResponse):
+        db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.key == key)
+            .values(status_code=stored.status_code, response_body=stored.body, expires_at=stored.expires_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _complete(self, db: Session, key: str, stored: StoredResponse):
+        self._store(db, key, stored)
+        db.commit()
+
+    @contextmanager
+    def _settled_on_commit(self, db: Session, key: str, request_hash: str):
+        """
+        While the handler runs, its commits also mark `key` as answered (with
+        _LOST_RESPONSE until the real one is stored). Yields a list that is
+        non-empty once a commit went through.
+        """
+        committed = []
+
+        def settle(session: Session):
+            if not committed:
+                expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+                status_code, message = _LOST_RESPONSE
+                self._store(session, key, StoredResponse(request_hash, status_code, _error_body(message), expires_at))
+
+        def mark_committed(_session: Session):
+            committed.append(True)
+
+        event.listen(db, "before_commit", settle)
+        event.listen(db, "after_commit", mark_committed)
+        try:
+            yield committed
+        finally:
+            event.remove(db, "before_commit", settle)
+            event.remove(db, "after_commit", mark_committed)
+
+    def _record_failure(self, db: Session, key: str, request_hash: str, error: BaseException) -> Optional[StoredResponse]:
+        """Store the error a handler raised after its write committed, so retries replay it"""
+        if isinstance(error, HTTPException):
+            status_code, message = error.status_code, error.detail
+        else:
+            status_code, message = status.HTTP_500_INTERNAL_SERVER_ERROR, "An unexpected error occurred. Please try again later."
+        stored = StoredResponse(request_hash, status_code, _error_body(message), datetime.utcnow() + timedelta(seconds=self.ttl))
+        try:
+            db.rollback()
+            self._complete(db, key, stored)
+        except Exception:
+            # _LOST_RESPONSE stays stored
+            db.rollback()
+            return None
+        return stored
+
+    def _release(self, db: Session, key: str):
+        """Drop the lease after a failed request so the client can retry with the same key"""
+        try:
+            db.rollback()
+            db.execute(
+                delete(IdempotencyRecord)
+                .where(IdempotencyRecord.key == key, IdempotencyRecord.status_code.is_(None))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            # The lease runs out on its own
+            db.rollback()
+
+    def purge_expired(self, db: Session, batch_size: int = IDEMPOTENCY_PURGE_BATCH) -> int:
+        """Delete up to `batch_size` expired keys"""
+        expired = select(IdempotencyRecord.key).where(
+            IdempotencyRecord.expires_at <= datetime.utcnow()
+        ).limit(batch_size)
+        deleted = db.execute(
+            delete(IdempotencyRecord)
+            .where(IdempotencyRecord.key.in_(expired))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return deleted
+
+    def _purge_if_due(self, db: Session):
+        with self._mutex:
+            if time.monotonic() - self._purged_at < IDEMPOTENCY_PURGE_SECONDS:
+                return
+            self._purged_at = time.monotonic()
+        self.purge_expired(db)
+
+    @staticmethod
+    def _replay(stored: StoredResponse, request_hash: str) -> Response:
+        if stored.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    def run(
+        self,
+        db: Session,
+        idempotency_key: Optional[str],
+        scope: str,
+        request: Any,
+        model_type: Any,
+        handler: Callable[[], Any],
+        status_code: int = status.HTTP_200_OK,
+    ):
+        """
+        Call `handler` at most once per (`scope`, `idempotency_key`) and return its
+        result rendered as `model_type`. `request` holds the parameters that must
+        match on a replay. Without a key this is just `handler()`.
+        """
+        if idempotency_key is None:
+            return handler()
+
+        key = _digest(scope, idempotency_key)
+        request_hash = request_fingerprint(request)
+        with self._key_lock(key):
+            now = datetime.utcnow()
+            stored = self._cached(key, now)
+            if stored is None:
+                self._purge_if_due(db)
+                stored = self._claim(db, key, request_hash, now)
+                if stored is not None:
+                    self._remember(key, stored)
+            if stored is not None:
+                return self._replay(stored, request_hash)
+
+            try:
+                with self._settled_on_commit(db, key, request_hash) as committed:
+                    body = render_model(model_type, handler())
+            except BaseException as error:
+                if not committed:
+                    self._release(db, key)
+                    raise
+                stored = self._record_failure(db, key, request_hash, error)
+                if stored is not None:
+                    self._remember(key, stored)
+                raise
+            stored = StoredResponse(request_hash, status_code, body, datetime.utcnow() + timedelta(seconds=self.ttl))
+            self._complete(db, key, stored)
+            self._remember(key, stored)
+            return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+idempotency_store = IdempotencyStore(
+    ttl=IDEMPOTENCY_TTL_SECONDS,
+    lease=IDEMPOTENCY_LEASE_SECONDS,
+    cache_size=IDEMPOTENCY_CACHE_SIZE,
+)
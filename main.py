@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
@@ -11,6 +12,11 @@ from cravings import routes as cravings_routes
 from responses import routes as responses_routes
 from notifications import routes as notifications_routes
 from public import routes as public_routes
+from reference import routes as reference_routes
+from cravings.feed_cache import feed_cache
+from cravings.trending import trending_tracker
+from notifications.outbox import outbox_worker
+from fast_json import FastJSONResponse
 from database import engine, Base
 # Import all models to ensure they are registered with Base before create_all
 from authentication.models import User
@@ -18,27 +24,45 @@ from user_profile.models import UserProfile
 from vendor_profile.models import VendorProfile
 from cravings.models import Craving
 from responses.models import Response
-from notifications.models import Notification
+from notifications.models import Notification, NotificationOutbox
+from archive.models import ArchivedCraving, ArchivedResponse, ArchivedNotification
+from account_deletion.models import AccountDeletion
+from idempotency.models import IdempotencyRecord
 
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Delivers notifications left in the outbox (e.g. by a crashed worker)
+    outbox_worker.start()
+    # Writes buffered share-link views back to cravings.trending_rank
+    trending_tracker.start()
+    yield
+    trending_tracker.stop()
+    outbox_worker.stop()
+
+
 app = FastAPI(
     title="CraveSeat App",
     description="A platform for posting food cravings and connecting with vendors",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- Exception Handlers ---
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
-        content=jsonable_encoder({
+        content={
             "success": False,
             "message": exc.detail,
             "data": None
-        }),
+        },
+        # Keep Retry-After / WWW-Authenticate and friends
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(RequestValidationError)
@@ -68,13 +92,13 @@ async def general_exception_handler(request: Request, exc: Exception):
     import traceback
     traceback.print_exc()
     
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
-        content=jsonable_encoder({
+        content={
             "success": False,
             "message": "An unexpected error occurred. Please try again later.",
             "data": str(exc) if app.debug else None
-        }),
+        },
     )
 
 # --- Middleware ---
@@ -88,6 +112,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read paging and caching headers
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include all routers
@@ -98,6 +124,7 @@ app.include_router(cravings_routes.router, prefix="/cravings", tags=["Cravings"]
 app.include_router(responses_routes.router, prefix="/responses", tags=["Responses"])
 app.include_router(notifications_routes.router, prefix="/notifications", tags=["Notifications"])
 app.include_router(public_routes.router, prefix="/public", tags=["Public Access"])
+app.include_router(reference_routes.router, prefix="/reference", tags=["Reference Data"])
 
 
 @app.get("/")
@@ -119,6 +146,7 @@ def health_check():
         "message": "System is healthy",
         "data": {
             "status": "healthy",
-            "platform": "render"
+            "platform": "render",
+            "feed_cache": feed_cache.stats()
         }
     }
\ No newline at end of file
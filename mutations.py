@@ -0,0 +1,78 @@
+"""
+Ownership-checked single-statement mutations.
+
+Instead of SELECT (ownership check) -> SELECT (load) -> UPDATE -> SELECT
+(refresh), routes issue one `UPDATE ... WHERE id = :id AND <owner> = :uid
+RETURNING *` (or DELETE). Only when no row matched do we spend a second query
+to tell "not found" (404) from "not yours" (403).
+
+RETURNING is supported by Postgres and SQLite >= 3.35; other dialects fall
+back to UPDATE + SELECT.
+"""
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session
+
+
+def _primary_key(model):
+    return model.__mapper__.primary_key[0]
+
+
+def unchanged(db: Session, columns, version) -> list:
+    """
+    WHERE criteria that only hold while `columns` still have the values in
+    `version` (the row a version query returned for an ETag). Added to an
+    UPDATE or DELETE they make an If-Match check and the write one atomic step.
+    """
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    criteria = []
+    for column, value in zip(columns, version):
+        if value is None:
+            criteria.append(column.is_(None))
+        elif sqlite and isinstance(value, datetime):
+            # SQLite keeps timestamps as text in more than one format (see responses.crud.cursor_filter)
+            criteria.append(
+                func.strftime("%Y-%m-%d %H:%M:%f", column) == func.strftime("%Y-%m-%d %H:%M:%f", value.isoformat(" "))
+            )
+        else:
+            criteria.append(column == value)
+    return criteria
+
+
+def update_owned(db: Session, owner_column, object_id: Any, owner_id: Any, values: dict, criteria: tuple = ()):
+    """
+    Apply `values` to the row `object_id` if `owner_column` equals `owner_id`
+    (and any extra `criteria` hold). Returns the updated ORM object, or None if
+    nothing matched. The caller commits.
+    """
+    model = owner_column.class_
+    stmt = update(model).where(_primary_key(model) == object_id, owner_column == owner_id, *criteria).values(values)
+    if db.get_bind().dialect.update_returning:
+        # The RETURNING row also refreshes any copy already in the identity map
+        return db.scalars(stmt.returning(model), execution_options={"populate_existing": True}).first()
+    if db.execute(stmt.execution_options(synchronize_session=False)).rowcount == 0:
+        return None
+    return db.get(model, object_id, populate_existing=True)
+
+
+def delete_owned(db: Session, owner_column, object_id: Any, owner_id: Any, criteria: tuple = ()) -> bool:
+    """DELETE the row `object_id` if it belongs to `owner_id` (and any extra `criteria` hold). The caller commits."""
+    model = owner_column.class_
+    result = db.execute(
+        delete(model)
+        .where(_primary_key(model) == object_id, owner_column == owner_id, *criteria)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def raise_missing_or_forbidden(db: Session, owner_column, object_id: Any, not_found: str, forbidden: str):
+    """Failure path of an owned mutation: 404 if the row does not exist, 403 otherwise"""
+    model = owner_column.class_
+    exists = db.query(_primary_key(model)).filter(_primary_key(model) == object_id).first()
+    if exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden)
@@ -0,0 +1,147 @@
+"""
+Pub/sub behind the notification stream (SSE / WebSocket /notifications/stream).
+
+Notifications are published by the outbox worker (notifications/outbox.py)
+once they have been committed, so streams never show rows that don't exist.
+
+Every open stream subscribes to its user's channel with a bounded queue. A
+consumer that falls more than NOTIFICATIONS_STREAM_QUEUE_SIZE events behind
+is cut off with a `reset` event instead of buffering without limit; it
+reconnects with its last event id and the gap is replayed from the table.
+
+The default backend delivers within this process. Set NOTIFICATIONS_REDIS_URL
+(needs the `redis` package) to fan out through Redis pub/sub so streams on
+every worker see notifications committed by any of them, or plug in another
+backend with `notification_broker.set_backend`.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Optional
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for multi-worker fan-out
+    redis = None
+
+NOTIFICATIONS_REDIS_URL = os.getenv("NOTIFICATIONS_REDIS_URL")
+NOTIFICATIONS_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATIONS_STREAM_QUEUE_SIZE", "100"))
+NOTIFICATIONS_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATIONS_HEARTBEAT_SECONDS", "15"))
+# Missed notifications replayed on reconnect; beyond this the client gets `reset`
+NOTIFICATIONS_REPLAY_LIMIT = 100
+
+
+class SubscriptionOverflow(Exception):
+    """The consumer fell too far behind and must resync"""
+
+
+class Subscription:
+    """One stream's view of a user channel; created and consumed on the event loop"""
+
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.overflowed = False
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def _put(self, payload: dict):
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def offer(self, payload: dict):
+        """Thread-safe: hand `payload` to the stream's loop"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, payload)
+        except RuntimeError:
+            pass  # Loop already closed; the stream is gone
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Next event, or None if nothing arrived within `timeout` (time for a heartbeat)"""
+        if self.overflowed:
+            raise SubscriptionOverflow()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBackend:
+    """Single-process fan-out"""
+
+    def __init__(self, broker: "NotificationBroker"):
+        self.broker = broker
+
+    def publish(self, user_id: str, payload: dict):
+        self.broker.deliver(user_id, payload)
+
+
+class RedisBackend:
+    """Fan-out through Redis pub/sub; one listener thread per process delivers to local streams"""
+
+    CHANNEL_PREFIX = "notifications:"
+
+    def __init__(self, broker: "NotificationBroker", url: str):
+        if redis is None:
+            raise RuntimeError("NOTIFICATIONS_REDIS_URL is set but the redis package is not installed")
+        self.broker = broker
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{f"{self.CHANNEL_PREFIX}*": self._on_message})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _on_message(self, message):
+        user_id = message["channel"].decode("utf-8")[len(self.CHANNEL_PREFIX):]
+        self.broker.deliver(user_id, json.loads(message["data"]))
+
+    def publish(self, user_id: str, payload: dict):
+        self._client.publish(f"{self.CHANNEL_PREFIX}{user_id}", json.dumps(payload))
+
+
+class NotificationBroker:
+    def __init__(self, queue_size: int, heartbeat: float):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat  # Seconds of silence before a stream sends a keep-alive
+        self.backend = LocalBackend(self)
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """Must be called on the event loop that will consume the subscription"""
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def deliver(self, user_id: str, payload: dict):
+        """Hand `payload` to every local stream of `user_id` (any thread)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.offer(payload)
+
+    def publish(self, user_id: str, payload: dict):
+        self.backend.publish(user_id, payload)
+
+
+notification_broker = NotificationBroker(
+    queue_size=NOTIFICATIONS_STREAM_QUEUE_SIZE,
+    heartbeat=NOTIFICATIONS_HEARTBEAT_SECONDS,
+)
+if NOTIFICATIONS_REDIS_URL:
+    notification_broker.set_backend(RedisBackend(notification_broker, NOTIFICATIONS_REDIS_URL))
@@ -1,124 +1,445 @@
-from sqlalchemy.orm import Session
+from collections import Counter
+from sqlalchemy import and_, delete, func, insert, not_, or_, select, update
+from sqlalchemy.orm import Session, aliased
+from authentication.models import User
 from notifications import models, schemas
+from archive.models import ArchivedNotification
+from responses.crud import cursor_filter, decode_cursor, encode_cursor
 from datetime import datetime
 
 
+def stream_event(notification: models.Notification) -> dict:
+    """Payload pushed to /notifications/stream; `id` doubles as the resume cursor"""
+    return {
+        "id": encode_cursor(notification.created_at, notification.id),
+        "notification": schemas.NotificationResponse.model_validate(notification).model_dump(mode="json"),
+    }
+
+
+def _adjust_unread_counts(db: Session, deltas: dict[str, int]):
+    """
+    Apply per-user unread counter deltas in the caller's transaction. Counters are
+    incremented in SQL so concurrent writers don't lose updates.
+    """
+    for user_id, delta in deltas.items():
+        if delta:
+            db.query(User).filter(User.id == user_id).update({
+                User.unread_notification_count: User.unread_notification_count + delta,
+                # A new notification is not an edit of the account
+                User.updated_at: User.updated_at,
+            }, synchronize_session=False)
+
+
+def read_clause():
+    """
+    SQL for "the owner has read this notification": flagged one by one, or no
+    newer than their notifications_read_through watermark. Reads the watermark
+    through an alias so it can be nested inside statements on `users`.
+    """
+    owner = aliased(User)
+    read_through = select(owner.notifications_read_through).where(
+        owner.id == models.Notification.user_id
+    ).scalar_subquery()
+    return or_(
+        models.Notification.flagged_read == True,
+        and_(read_through.is_not(None), models.Notification.created_at <= read_through),
+    )
+
+
+def unread_clause():
+    return not_(read_clause())
+
+
+def _read_through(db: Session, user_id: str):
+    return db.query(User.notifications_read_through).filter(User.id == user_id).scalar()
+
+
+def _with_read_through(notifications: list, read_through):
+    """Give loaded notifications their owner's watermark so `is_read` reflects it"""
+    for notification in notifications:
+        notification.read_through = read_through
+    return notifications
+
+
+def _unread_count_subquery(*criteria):
+    return select(func.count(models.Notification.id)).where(
+        models.Notification.user_id == User.id,
+        unread_clause(),
+        *criteria,
+    ).correlate(User).scalar_subquery()
+
+
+def discount_unread(db: Session, *criteria):
+    """
+    Take the unread notifications matching `criteria` off their owners' counters,
+    in one UPDATE. Call it in the same transaction, right before a bulk delete
+    (or ON DELETE CASCADE) removes those rows.
+    """
+    db.execute(
+        update(User)
+        .where(User.id.in_(
+            select(models.Notification.user_id).where(unread_clause(), *criteria)
+        ))
+        .values(
+            unread_notification_count=User.unread_notification_count - _unread_count_subquery(*criteria),
+            updated_at=User.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recompute_unread_counts(db: Session, user_ids: list[str], commit: bool = True):
+    """Recompute unread notification counters for the given users in one UPDATE"""
+    result = db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(unread_notification_count=_unread_count_subquery(), updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if commit:
+        db.commit()
+    return result.rowcount
+
+
+_OUTBOX_FIELDS = ("user_id", "notification_type", "title", "message", "craving_id", "response_id")
+
+
+def enqueue_notifications(db: Session, notifications: list[dict]) -> int:
+    """
+    Queue notifications (NotificationCreate fields, plus an optional `actor_name`
+    used when coalescing) in the outbox with one INSERT, as part of the caller's
+    transaction; the caller commits. They are delivered by notifications/outbox.py
+    once that transaction has committed.
+    """
+    if notifications:
+        db.execute(insert(models.NotificationOutbox), notifications)
+    return len(notifications)
+
+
 def create_notification(db: Session, notification: schemas.NotificationCreate):
-    """Create a new notification"""
-    db_notification = models.Notification(
-        user_id=notification.user_id,
-        notification_type=notification.notification_type,
-        title=notification.title,
-        message=notification.message,
-        craving_id=notification.craving_id,
-        response_id=notification.response_id,
+    """Queue one notification in the caller's transaction (see enqueue_notifications)"""
+    return enqueue_notifications(db, [notification.model_dump()])
+
+
+# Notification types folded into the owner's open notification for the same craving
+COALESCED_TYPES = (models.NotificationType.craving_response,)
+# Responder names kept on a coalesced notification, newest first
+NOTIFICATIONS_RECENT_ACTORS = 5
+
+
+def _coalesced_message(latest, count: int) -> str:
+    if count == 1:
+        return latest.message
+    others = count - 1
+    return f"{latest.actor_name or 'Someone'} and {others} other{'s' if others > 1 else ''} responded to your craving!"
+
+
+def _recent_actors(queued: list, previous: list = None) -> list[str]:
+    names = [row.actor_name for row in reversed(queued) if row.actor_name]
+    return (names + list(previous or []))[:NOTIFICATIONS_RECENT_ACTORS]
+
+
+def _open_coalesced(db: Session, groups: dict) -> dict:
+    """Each group's unread notification to fold new events into, keyed like `groups`"""
+    if not groups:
+        return {}
+    candidates = db.scalars(
+        select(models.Notification).where(
+            models.Notification.notification_type.in_({key[2] for key in groups}),
+            models.Notification.user_id.in_({key[0] for key in groups}),
+            models.Notification.craving_id.in_({key[1] for key in groups}),
+            unread_clause(),
+        ).order_by(models.Notification.created_at)
+    ).all()
+    # Newest wins if older duplicates exist
+    return {(n.user_id, n.craving_id, n.notification_type): n for n in candidates}
+
+
+def _coalesce_into(db: Session, notification: models.Notification, queued: list):
+    """
+    Fold `queued` events into `notification` unless it has been read in the
+    meantime (then None is returned and the caller inserts a new one). Bumps
+    created_at so the notification resurfaces at the top of the list and on
+    streams as a newer event.
+    """
+    count = notification.count + len(queued)
+    latest = queued[-1]
+    return db.scalars(
+        update(models.Notification)
+        .where(models.Notification.id == notification.id, unread_clause())
+        .values(
+            count=count,
+            message=_coalesced_message(latest, count),
+            response_id=latest.response_id,
+            recent_actors=_recent_actors(queued, notification.recent_actors),
+            created_at=func.now(),
+        )
+        .returning(models.Notification),
+        execution_options={"populate_existing": True},
+    ).first()
+
+
+def _new_notification_values(queued: list) -> dict:
+    latest = queued[-1]
+    return {
+        **{name: getattr(latest, name) for name in _OUTBOX_FIELDS},
+        "message": _coalesced_message(latest, len(queued)),
+        "count": len(queued),
+        "recent_actors": _recent_actors(queued),
+    }
+
+
+def deliver_outbox_batch(db: Session, batch_size: int) -> tuple[int, list[tuple[str, dict]]]:
+    """
+    Move up to `batch_size` queued notifications into `notifications` in one
+    transaction: a DELETE ... RETURNING claims them (SKIP LOCKED on Postgres, so
+    concurrent workers take different rows), events of a COALESCED_TYPES type
+    are folded into the owner's unread notification for the same craving, the
+    rest are created with one multi-row INSERT and the owners' unread counters
+    go up. Returns how many outbox rows were claimed (coalescing can turn a
+    full batch into fewer events, so callers loop on this) and the
+    (user_id, stream event) pairs to publish now that they are committed.
+    """
+    outbox = models.NotificationOutbox
+    claimed = db.execute(
+        delete(outbox)
+        .where(outbox.id.in_(
+            select(outbox.id).order_by(outbox.id).limit(batch_size).with_for_update(skip_locked=True)
+        ))
+        .returning(outbox.id, outbox.actor_name, *[outbox.__table__.c[name] for name in _OUTBOX_FIELDS])
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not claimed:
+        db.rollback()
+        return 0, []
+
+    queued = sorted(claimed, key=lambda row: row.id)
+    # Lock the owners (in id order) so two workers can't both decide that a
+    # group has no open notification and insert one each
+    db.execute(
+        select(User.id).where(User.id.in_({row.user_id for row in queued})).order_by(User.id).with_for_update()
     )
-    db.add(db_notification)
+
+    groups, new_rows = {}, []
+    for row in queued:
+        if row.notification_type in COALESCED_TYPES and row.craving_id is not None:
+            groups.setdefault((row.user_id, row.craving_id, row.notification_type), []).append(row)
+        else:
+            new_rows.append(_new_notification_values([row]))
+
+    delivered = []
+    open_notifications = _open_coalesced(db, groups)
+    for key, rows in groups.items():
+        existing = open_notifications.get(key)
+        updated = _coalesce_into(db, existing, rows) if existing is not None else None
+        if updated is not None:
+            delivered.append(updated)
+        else:
+            new_rows.append(_new_notification_values(rows))
+
+    if new_rows:
+        inserted = db.scalars(insert(models.Notification).returning(models.Notification), new_rows).all()
+        _adjust_unread_counts(db, Counter(notification.user_id for notification in inserted))
+        delivered.extend(inserted)
+    events = [(notification.user_id, stream_event(notification)) for notification in delivered]
     db.commit()
-    db.refresh(db_notification)
-    return db_notification
+    return len(claimed), events
+
+
+def get_notifications_after(db: Session, user_id: str, cursor: str, limit: int):
+    """
+    Notifications created after the stream event id `cursor`, oldest first.
+    Ids don't follow creation order, so every other notification sharing the
+    cursor's timestamp is replayed too; clients replace ones they already have by id.
+    """
+    created_at, last_id = decode_cursor(cursor)
+    notifications = db.query(models.Notification).filter(
+        models.Notification.user_id == user_id,
+        or_(
+            # Includes the cursor's own notification if coalescing has moved it since
+            cursor_filter(db, cursor, models.Notification, newer=True),
+            and_(
+                cursor_filter(db, encode_cursor(created_at, ""), models.Notification, newer=True),
+                models.Notification.id != last_id,
+            ),
+        ),
+    ).order_by(models.Notification.created_at, models.Notification.id).limit(limit).all()
+    return _with_read_through(notifications, _read_through(db, user_id))
 
 
 def get_user_notifications(db: Session, user_id: str, skip: int = 0, limit: int = 50, unread_only: bool = False):
     """Get notifications for a user"""
+    read_through = _read_through(db, user_id)
     query = db.query(models.Notification).filter(models.Notification.user_id == user_id)
     
     if unread_only:
-        query = query.filter(models.Notification.is_read == False)
+        query = query.filter(models.Notification.flagged_read == False)
+        if read_through is not None:
+            query = query.filter(models.Notification.created_at > read_through)
     
-    return query.order_by(models.Notification.created_at.desc()).offset(skip).limit(limit).all()
+    notifications = query.order_by(models.Notification.created_at.desc()).offset(skip).limit(limit).all()
+    return _with_read_through(notifications, read_through)
+
+
+def get_user_notifications_export_queries(db: Session, user_id: str) -> list:
+    """
+    Unmaterialized queries over all of a user's notifications, oldest first (see
+    exports.py): the archived ones, which are older, then the live ones. Live
+    rows select plain columns with `is_read` computed in SQL; archived rows
+    stored it when they were moved.
+    """
+    archived = ArchivedNotification
+    columns = [column for column in models.Notification.__table__.c if column.name != "is_read"]
+    return [
+        db.query(archived).filter(archived.user_id == user_id).order_by(archived.created_at, archived.id),
+        db.query(*columns, read_clause().label("is_read")).filter(
+            models.Notification.user_id == user_id
+        ).order_by(models.Notification.created_at, models.Notification.id),
+    ]
+
+
+def get_notifications_version(db: Session, user_id: str):
+    """Aggregate validator for a user's notification list (used for ETags)"""
+    return db.query(
+        func.count(models.Notification.id),
+        func.max(models.Notification.created_at),
+        func.max(models.Notification.read_at),
+        # Coalescing changes a row without adding one
+        func.sum(models.Notification.count),
+        select(User.notifications_read_through).where(User.id == user_id).scalar_subquery(),
+    ).filter(models.Notification.user_id == user_id).one()
+
+
+def _mark_read(db: Session, user_id: str, *criteria) -> int:
+    """
+    Flag the user's unread notifications matching `criteria` as read with a single
+    UPDATE, without loading them, and take them off the unread counter in the
+    same transaction. Returns how many were newly marked.
+    """
+    result = db.execute(
+        update(models.Notification)
+        .where(models.Notification.user_id == user_id, unread_clause(), *criteria)
+        .values({models.Notification.flagged_read: True, models.Notification.read_at: datetime.utcnow()})
+        .execution_options(synchronize_session=False)
+    )
+    _adjust_unread_counts(db, {user_id: -result.rowcount})
+    db.commit()
+    return result.rowcount
 
 
 def mark_notifications_as_read(db: Session, notification_ids: list[str], user_id: str):
     """Mark notifications as read"""
-    notifications = db.query(models.Notification).filter(
-        models.Notification.id.in_(notification_ids),
-        models.Notification.user_id == user_id
-    ).all()
-    
-    for notification in notifications:
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-    
-    db.commit()
-    return len(notifications)
+    return _mark_read(db, user_id, models.Notification.id.in_(notification_ids))
 
 
 def mark_all_as_read(db: Session, user_id: str):
-    """Mark all notifications as read for a user"""
-    notifications = db.query(models.Notification).filter(
-        models.Notification.user_id == user_id,
-        models.Notification.is_read == False
-    ).all()
-    
-    for notification in notifications:
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-    
+    """
+    Mark all notifications as read for a user by moving their read-through
+    watermark up to the newest notification; no notification row is written.
+    A single UPDATE counts what that newly covers (an index range scan above
+    the old watermark) and takes it off the unread counter, so the decrement
+    always matches the rows the watermark moved over. Returns that count.
+    """
+    # Lock the user row so the counter RETURNING reports differs from this
+    # one only by our own decrement
+    counted = db.execute(
+        select(User.unread_notification_count).where(User.id == user_id).with_for_update()
+    ).scalar()
+    if counted is None:
+        return 0
+    newest = select(func.max(models.Notification.created_at)).where(
+        models.Notification.user_id == user_id
+    ).scalar_subquery()
+
+    # Only ever moves forward; a concurrent mark-all that got there first wins
+    remaining = db.execute(
+        update(User)
+        .where(
+            User.id == user_id,
+            newest.is_not(None),
+            or_(User.notifications_read_through.is_(None), User.notifications_read_through < newest),
+        )
+        .values(
+            notifications_read_through=newest,
+            unread_notification_count=User.unread_notification_count - _unread_count_subquery(
+                models.Notification.created_at <= newest
+            ),
+            updated_at=User.updated_at,
+        )
+        .returning(User.unread_notification_count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
     db.commit()
-    return len(notifications)
+    return 0 if remaining is None else counted - remaining
 
 
 def get_unread_count(db: Session, user_id: str):
-    """Get count of unread notifications"""
-    return db.query(models.Notification).filter(
-        models.Notification.user_id == user_id,
-        models.Notification.is_read == False
-    ).count()
+    """Count of unread notifications, from the user's denormalized counter"""
+    return db.query(User.unread_notification_count).filter(User.id == user_id).scalar() or 0
 
 
 def delete_notification(db: Session, notification_id: str, user_id: str):
-    """Delete a notification"""
-    notification = db.query(models.Notification).filter(
-        models.Notification.id == notification_id,
-        models.Notification.user_id == user_id
-    ).first()
-    
-    if notification:
-        db.delete(notification)
-        db.commit()
-        return True
-    return False
+    """Delete a notification; keyed on id alone since created_at is part of the primary key"""
+    criteria = (models.Notification.id == notification_id, models.Notification.user_id == user_id)
+    discount_unread(db, *criteria)
+    result = db.execute(delete(models.Notification).where(*criteria).execution_options(synchronize_session=False))
+    if not result.rowcount:
+        db.rollback()
+        return False
+    db.commit()
+    return True
 
 
 # Helper function to create common notifications
 def notify_craving_response(db: Session, craving_owner_id: str, craving_id: str, response_id: str, responder_name: str = "Someone"):
-    """Notify craving owner that someone responded"""
-    return create_notification(db, schemas.NotificationCreate(
-        user_id=craving_owner_id,
-        notification_type=schemas.NotificationType.craving_response,
-        title="New Response to Your Craving",
-        message=f"{responder_name} responded to your craving!",
-        craving_id=craving_id,
-        response_id=response_id
-    ))
+    """Notify craving owner that someone responded (queued; the caller commits)"""
+    return enqueue_notifications(db, [{
+        "user_id": craving_owner_id,
+        "notification_type": schemas.NotificationType.craving_response,
+        "title": "New Response to Your Craving",
+        "message": f"{responder_name} responded to your craving!",
+        "craving_id": craving_id,
+        "response_id": response_id,
+        "actor_name": responder_name,
+    }])
 
 
-def notify_response_status_change(db: Session, responder_id: str, craving_id: str, response_id: str, new_status: str):
-    """Notify responder that their response status changed"""
-    title_map = {
-        "accepted": "Response Accepted",
-        "rejected": "Response Declined",
-        "completed": "Response Completed"
-    }
-    
-    message_map = {
-        "accepted": "Your response to a craving was accepted!",
-        "rejected": "Your response to a craving was declined.",
-        "completed": "The craving you responded to has been completed!"
-    }
-    
-    notification_type_map = {
-        "accepted": schemas.NotificationType.response_accepted,
-        "rejected": schemas.NotificationType.response_rejected,
-        "completed": schemas.NotificationType.craving_fulfilled
+# new status -> (notification type, title, message)
+_STATUS_CHANGE_TEMPLATES = {
+    "accepted": (schemas.NotificationType.response_accepted, "Response Accepted", "Your response to a craving was accepted!"),
+    "rejected": (schemas.NotificationType.response_rejected, "Response Declined", "Your response to a craving was declined."),
+    "completed": (schemas.NotificationType.craving_fulfilled, "Response Completed", "The craving you responded to has been completed!"),
+}
+_STATUS_CHANGE_FALLBACK = (schemas.NotificationType.system, "Response Status Updated", "Your response status has been updated.")
+
+
+def _status_change_values(responder_id: str, craving_id: str, response_id: str, new_status: str) -> dict:
+    notification_type, title, message = _STATUS_CHANGE_TEMPLATES.get(new_status, _STATUS_CHANGE_FALLBACK)
+    return {
+        "user_id": responder_id,
+        "notification_type": notification_type,
+        "title": title,
+        "message": message,
+        "craving_id": craving_id,
+        "response_id": response_id,
     }
-    
+
+
+def notify_response_status_change(db: Session, responder_id: str, craving_id: str, response_id: str, new_status: str):
+    """Notify responder that their response status changed (queued; the caller commits)"""
     return create_notification(db, schemas.NotificationCreate(
-        user_id=responder_id,
-        notification_type=notification_type_map.get(new_status, schemas.NotificationType.system),
-        title=title_map.get(new_status, "Response Status Updated"),
-        message=message_map.get(new_status, "Your response status has been updated."),
-        craving_id=craving_id,
-        response_id=response_id
-    ))
\ No newline at end of file
+        **_status_change_values(responder_id, craving_id, response_id, new_status)
+    ))
+
+
+def notify_response_status_changes(db: Session, craving_id: str, changes: list[tuple]):
+    """
+    Set-based notify_response_status_change: one outbox INSERT for every
+    (responder_id, response_id, new_status) in `changes`. Anonymous responses
+    (no responder_id) have no one to notify. The caller commits.
+    """
+    return enqueue_notifications(db, [
+        _status_change_values(responder_id, craving_id, response_id, new_status)
+        for responder_id, response_id, new_status in changes
+        if responder_id is not None
+    ])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Enum as SAEnum, Boolean, func
+from sqlalchemy import Column, Integer, JSON, String, Text, ForeignKey, DateTime, Enum as SAEnum, Boolean, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 import shortuuid
@@ -16,25 +16,67 @@ class NotificationType(PyEnum):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    # Load created_at at flush time so notifications can be published before the commit returns
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Unread counts and pages above the owner's read-through watermark
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=shortuuid.uuid, index=True)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     notification_type = Column(SAEnum(NotificationType), nullable=False)
     title = Column(String(200), nullable=False)
     message = Column(Text, nullable=False)
     
     # Related entities (optional)
-    craving_id = Column(String, ForeignKey("cravings.id"), nullable=True)
-    response_id = Column(String, ForeignKey("responses.id"), nullable=True)
+    craving_id = Column(String, ForeignKey("cravings.id", ondelete="CASCADE"), nullable=True)
+    response_id = Column(String, ForeignKey("responses.id", ondelete="SET NULL"), nullable=True)  # Keep the craving-level notice
+
+    # Coalescing (notifications/crud.py): events folded into this row, latest responder names
+    count = Column(Integer, default=1, server_default="1", nullable=False)
+    recent_actors = Column(JSON, nullable=True)
     
-    # Status
-    is_read = Column(Boolean, default=False, nullable=False)
+    # Status: marked read one by one; "mark all read" moves users.notifications_read_through instead
+    flagged_read = Column("is_read", Boolean, default=False, nullable=False)
     read_at = Column(DateTime(timezone=True), nullable=True)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Time of the latest event folded into this row. Part of the primary key because
+    # Postgres partitions the table by month on it (migration b6d2f9a4c153); SQLite
+    # keeps the id-only key, which is stricter.
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, primary_key=True)
     
     # Relationships
     user = relationship("User", back_populates="notifications")
     craving = relationship("Craving")
-    response = relationship("Response")
\ No newline at end of file
+    response = relationship("Response")
+
+    # Owner's notifications_read_through, set by notifications/crud.py when it loads rows (not a column)
+    read_through = None
+
+    @property
+    def is_read(self) -> bool:
+        """Flagged read, or no newer than the owner's read-through watermark"""
+        return self.flagged_read or (self.read_through is not None and self.created_at <= self.read_through)
+
+
+class NotificationOutbox(Base):
+    """
+    Notifications committed together with the write that caused them and not yet
+    delivered; notifications/outbox.py moves them into `notifications` in batches.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Delivery order
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    notification_type = Column(SAEnum(NotificationType), nullable=False)
+    title = Column(String(200), nullable=False)
+    message = Column(Text, nullable=False)
+
+    craving_id = Column(String, ForeignKey("cravings.id", ondelete="CASCADE"), nullable=True)
+    response_id = Column(String, ForeignKey("responses.id", ondelete="SET NULL"), nullable=True)
+    actor_name = Column(String(100), nullable=True)  # Who caused it, for coalesced messages
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
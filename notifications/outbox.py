@@ -0,0 +1,83 @@
+"""
+Delivery half of the notification outbox.
+
+Writers queue notifications in `notification_outbox` inside their own
+transaction (notifications/crud.py), so a notification is delivered exactly
+when the write that caused it committed, and a crash between the two can't
+lose it. `OutboxWorker.drain` moves queued rows into `notifications` one
+batch per transaction and then publishes them to open streams.
+
+Routes that queue notifications schedule `outbox_worker.drain` as a
+background task, so delivery follows the response right away without being
+on its critical path. A poller thread started with the app (and
+`python drain_notification_outbox.py`) picks up anything a crashed process
+left behind.
+"""
+import logging
+import os
+import threading
+
+from database import SessionLocal
+from notifications import crud
+from notifications.broker import notification_broker
+
+NOTIFICATIONS_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATIONS_OUTBOX_BATCH_SIZE", "500"))
+NOTIFICATIONS_OUTBOX_POLL_SECONDS = float(os.getenv("NOTIFICATIONS_OUTBOX_POLL_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+def publish(events: list[tuple[str, dict]]):
+    for user_id, payload in events:
+        try:
+            notification_broker.publish(user_id, payload)
+        except Exception as e:
+            # Streams resync from the table on reconnect; the notification itself is stored
+            logger.warning("Notification publish failed: %s", e)
+
+
+class OutboxWorker:
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def drain(self) -> int:
+        """Deliver everything queued, one batch per transaction; returns how many were delivered"""
+        delivered = 0
+        try:
+            with SessionLocal() as db:
+                while True:
+                    claimed, events = crud.deliver_outbox_batch(db, self.batch_size)
+                    publish(events)
+                    delivered += len(events)
+                    if claimed < self.batch_size:
+                        break
+        except Exception:
+            # Whatever wasn't delivered is still queued for the next drain
+            logger.exception("Notification outbox drain failed after %d notifications", delivered)
+        return delivered
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.drain()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+outbox_worker = OutboxWorker(
+    batch_size=NOTIFICATIONS_OUTBOX_BATCH_SIZE,
+    poll_interval=NOTIFICATIONS_OUTBOX_POLL_SECONDS,
+)
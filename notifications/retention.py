@@ -0,0 +1,160 @@
+"""
+Retention for the notifications table.
+
+Read notifications older than NOTIFICATIONS_READ_RETENTION_DAYS and any
+notification older than NOTIFICATIONS_RETENTION_DAYS are pruned by
+`python prune_notifications.py` (run it nightly), one batch per transaction
+with a pause in between so the primary is never saturated. Unread counters
+drop for every unread notification removed.
+
+On Postgres `notifications` is partitioned by month on created_at (migration
+b6d2f9a4c153): months entirely past NOTIFICATIONS_RETENTION_DAYS are dropped
+as whole partitions, which is O(1) however many rows they hold, and
+partitions for the coming months are created before rows need them (rows
+that landed in the DEFAULT partition meanwhile are moved into them). Read
+rows past NOTIFICATIONS_READ_RETENTION_DAYS share partitions with unread
+ones, so they (and everything on SQLite) go through batched deletes.
+"""
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, or_, select, text
+from sqlalchemy.orm import Session
+
+from notifications import models
+from notifications.crud import discount_unread, read_clause
+
+NOTIFICATIONS_READ_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_READ_RETENTION_DAYS", "90"))
+NOTIFICATIONS_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_RETENTION_DAYS", "365"))
+NOTIFICATIONS_PRUNE_BATCH_SIZE = int(os.getenv("NOTIFICATIONS_PRUNE_BATCH_SIZE", "1000"))
+NOTIFICATIONS_PRUNE_PAUSE_SECONDS = float(os.getenv("NOTIFICATIONS_PRUNE_PAUSE_SECONDS", "0.2"))
+# Monthly partitions created ahead of time (Postgres)
+NOTIFICATIONS_PARTITIONS_AHEAD = 3
+
+_PARTITION_NAME = re.compile(r"^notifications_p(\d{4})_(\d{2})$")
+
+
+def retention_cutoffs(now: Optional[datetime] = None) -> tuple[datetime, datetime]:
+    """(read_before, any_before): read rows older than the first and all rows older than the second expire"""
+    now = now or datetime.utcnow()
+    return (
+        now - timedelta(days=NOTIFICATIONS_READ_RETENTION_DAYS),
+        now - timedelta(days=NOTIFICATIONS_RETENTION_DAYS),
+    )
+
+
+def expired_clause(read_before: datetime, any_before: datetime):
+    return or_(
+        models.Notification.created_at < any_before,
+        and_(models.Notification.created_at < read_before, read_clause()),
+    )
+
+
+def prune_batch(db: Session, read_before: datetime, any_before: datetime, batch_size: int) -> int:
+    """Delete up to `batch_size` expired notifications in one transaction; returns how many"""
+    ids = db.execute(
+        select(models.Notification.id).where(expired_clause(read_before, any_before)).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    expired = models.Notification.id.in_(ids)
+    discount_unread(db, expired)
+    db.execute(delete(models.Notification).where(expired).execution_options(synchronize_session=False))
+    db.commit()
+    return len(ids)
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('notifications'))"
+    )).scalar()
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partitions(db: Session) -> list[tuple[date, str]]:
+    """Monthly partitions as (first day of the month, table name), oldest first; DEFAULT is skipped"""
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('notifications')"
+    )).scalars().all()
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(months)
+
+
+def _default_partition(db: Session) -> Optional[str]:
+    return db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('notifications') AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT'"
+    )).scalar()
+
+
+def _create_partition(db: Session, month: date, default: Optional[str]):
+    """
+    Postgres refuses to create a partition while the DEFAULT partition holds
+    rows in its range. If it does, detach DEFAULT, create the partition, move
+    those rows into it and attach DEFAULT back, all in the caller's
+    transaction (DETACH locks the parent until the commit).
+    """
+    name = f"notifications_p{month:%Y_%m}"
+    start, end = month.isoformat(), _add_months(month, 1).isoformat()
+    in_range = f"created_at >= '{start}' AND created_at < '{end}'"
+    stranded = default is not None and db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})")
+    ).scalar()
+    if stranded:
+        db.execute(text(f"ALTER TABLE notifications DETACH PARTITION {default}"))
+    db.execute(text(f"CREATE TABLE {name} PARTITION OF notifications FOR VALUES FROM ('{start}') TO ('{end}')"))
+    if stranded:
+        db.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}"))
+        db.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+        db.execute(text(f"ALTER TABLE notifications ATTACH PARTITION {default} DEFAULT"))
+
+
+def ensure_partitions(db: Session, months_ahead: int = NOTIFICATIONS_PARTITIONS_AHEAD, today: Optional[date] = None) -> int:
+    """
+    Create missing partitions from this month to `months_ahead` months out,
+    moving any rows the DEFAULT partition holds for those months into them;
+    returns how many were created
+    """
+    existing = {month for month, _ in _partitions(db)}
+    default = _default_partition(db)
+    this_month = (today or date.today()).replace(day=1)
+    created = 0
+    for offset in range(months_ahead + 1):
+        month = _add_months(this_month, offset)
+        if month in existing:
+            continue
+        _create_partition(db, month, default)
+        created += 1
+    db.commit()
+    return created
+
+
+def drop_expired_partitions(db: Session, any_before: datetime) -> list[str]:
+    """
+    Drop monthly partitions whose whole range is older than `any_before`, one
+    transaction each (the owners' unread counters are discounted first).
+    Returns the dropped table names.
+    """
+    dropped = []
+    for month, name in _partitions(db):
+        end = _add_months(month, 1)
+        if datetime.combine(end, datetime.min.time()) > any_before:
+            break
+        discount_unread(db, models.Notification.created_at >= month, models.Notification.created_at < end)
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        dropped.append(name)
+    return dropped
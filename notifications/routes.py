@@ -1,16 +1,171 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from authentication.auth import get_current_active_user
+from typing import AsyncIterator, List, Optional
+from authentication.auth import get_current_active_user, user_from_token
 from authentication import models as auth_models, schemas as auth_schemas
-from database import get_db
+from database import SessionLocal, get_db
 from notifications import crud, schemas
+from notifications.broker import NOTIFICATIONS_REPLAY_LIMIT, SubscriptionOverflow, notification_broker
+from responses.crud import decode_cursor
+from http_cache import weak_etag, not_modified_response
+from fast_json import fast_response
+from exports import ExportFormat, stream_export
 
 router = APIRouter()
 
+NotificationListResponse = auth_schemas.StandardResponse[List[schemas.NotificationResponse]]
 
-@router.get("/", response_model=auth_schemas.StandardResponse[List[schemas.NotificationResponse]])
+
+def _valid_event_id(last_event_id: Optional[str]) -> bool:
+    if not last_event_id:
+        return True
+    try:
+        decode_cursor(last_event_id)
+    except ValueError:
+        return False
+    return True
+
+
+def _replay_state(user_id: str, last_event_id: Optional[str]) -> tuple[int, list]:
+    """Unread count and missed notifications, read on a session of its own"""
+    with SessionLocal() as db:
+        unread_count = crud.get_unread_count(db, user_id)
+        if not last_event_id:
+            return unread_count, []
+        missed = crud.get_notifications_after(db, user_id, last_event_id, NOTIFICATIONS_REPLAY_LIMIT + 1)
+        return unread_count, [crud.stream_event(notification) for notification in missed]
+
+
+def _authenticate(token: str) -> Optional[auth_models.User]:
+    with SessionLocal() as db:
+        return user_from_token(db, token)
+
+
+async def _stream_events(user_id: str, last_event_id: Optional[str]) -> AsyncIterator[tuple]:
+    """
+    Events for one stream as (event, data, id). Subscribes before replaying what
+    the client missed, so nothing published in between is lost; live events that
+    were already replayed are skipped. The stream outlives any request-scoped
+    session, so the replay opens (and closes) its own.
+    """
+    subscription = notification_broker.subscribe(user_id)
+    try:
+        unread_count, backlog = await run_in_threadpool(_replay_state, user_id, last_event_id)
+
+        yield "ready", {"unread_count": unread_count}, None
+        if len(backlog) > NOTIFICATIONS_REPLAY_LIMIT:
+            yield "reset", {"reason": "too_many_missed"}, None
+            return
+        replayed = set()
+        for event in backlog:
+            replayed.add(event["id"])
+            yield "notification", event["notification"], event["id"]
+
+        while True:
+            try:
+                event = await subscription.get(notification_broker.heartbeat)
+            except SubscriptionOverflow:
+                # Too slow to keep up: the client refetches (or reconnects with its last id)
+                yield "reset", {"reason": "slow_consumer"}, None
+                return
+            if event is None:
+                yield "ping", None, None
+            elif event["id"] not in replayed:
+                yield "notification", event["notification"], event["id"]
+    finally:
+        notification_broker.unsubscribe(subscription)
+
+
+def _sse_frame(event: str, data, event_id: Optional[str]) -> bytes:
+    if event == "ping":
+        return b": ping\n\n"
+    frame = f"id: {event_id}\n" if event_id else ""
+    frame += f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+    return frame.encode("utf-8")
+
+
+async def _sse_body(events: AsyncIterator[tuple]) -> AsyncIterator[bytes]:
+    try:
+        async for event in events:
+            yield _sse_frame(*event)
+    finally:
+        await events.aclose()
+
+
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: Optional[str] = Header(None),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """
+    Server-sent events replacing unread-count/list polling: `ready` with the unread
+    count, one `notification` event per new notification, `: ping` heartbeats and
+    `reset` when the client should refetch the list. Send Last-Event-ID when
+    reconnecting to replay what was missed. A WebSocket on the same path sends the
+    same events as JSON.
+    """
+    if not _valid_event_id(last_event_id):
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        _sse_body(_stream_events(current_user.id, last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _send_events(websocket: WebSocket, user_id: str, last_event_id: Optional[str]):
+    events = _stream_events(user_id, last_event_id)
+    try:
+        async for event, data, event_id in events:
+            await websocket.send_json({"event": event, "id": event_id, "data": data})
+    finally:
+        await events.aclose()
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Clients never send on this socket; reading is how an idle stream notices they left"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/stream")
+async def stream_notifications_ws(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(None),
+):
+    """
+    WebSocket variant of GET /stream: messages are {"event", "id", "data"}.
+    Browsers can't set headers here, so the access token may be passed as ?token=.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[len("bearer "):]
+    user = await run_in_threadpool(_authenticate, token) if token else None
+    if user is None or user.disabled or not _valid_event_id(last_event_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    sender = asyncio.ensure_future(_send_events(websocket, user.id, last_event_id))
+    receiver = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if sender in done and sender.exception() is None:
+        # The stream ended with a `reset`: the client reconnects or refetches
+        await websocket.close()
+
+
+@router.get("/", response_model=NotificationListResponse)
 def get_notifications(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     unread_only: bool = Query(False),
@@ -18,6 +173,11 @@ def get_notifications(
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Get current user's notifications"""
+    etag = weak_etag("notifications", current_user.id, *crud.get_notifications_version(db, current_user.id))
+    cached = not_modified_response(request, response, etag)
+    if cached:
+        return cached
+
     notifications = crud.get_user_notifications(
         db, 
         current_user.id, 
@@ -25,11 +185,22 @@ def get_notifications(
         limit=limit, 
         unread_only=unread_only
     )
-    return {
+    return fast_response(NotificationListResponse, {
         "success": True,
         "message": "Notifications retrieved successfully",
         "data": notifications
-    }
+    }, headers={"ETag": etag})
+
+
+@router.get("/export")
+def export_notifications(
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Download all of the current user's notifications as NDJSON or CSV"""
+    queries = crud.get_user_notifications_export_queries(db, current_user.id)
+    return stream_export(db, queries, schemas.NotificationResponse, format, "notifications")
 
 
 @router.get("/unread-count", response_model=auth_schemas.GenericResponse)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -31,6 +31,8 @@ class NotificationResponse(NotificationBase):
     is_read: bool
     read_at: Optional[datetime] = None
     created_at: datetime
+    count: int = 1  # Events coalesced into this notification
+    recent_actors: Optional[List[str]] = None
 
     class Config:
         from_attributes = True
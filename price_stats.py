@@ -0,0 +1,284 @@
+"""
+Per-category price statistics ("typical price" hints).
+
+Each category keeps a small t-digest (merging variant, k1 scale) for
+quantiles and Welford running mean/variance. Creates feed values in
+incrementally; edits, deletes and category moves can't be subtracted from a
+digest, so they only count towards the next rebuild. A rebuild streams the
+price column in batches (the loaders use yield_per) into fresh digests, so
+its memory is bounded by the digests, not by the number of prices. Prices
+recorded while a rebuild runs are replayed into the new digests before they
+are swapped in.
+
+Only the very first build runs on a request. Later rebuilds run on a
+background thread with a session of their own while reads keep serving the
+previous snapshot.
+
+State is per process: other workers pick up writes at their next rebuild.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+PRICE_STATS_COMPRESSION = int(os.getenv("PRICE_STATS_COMPRESSION", "100"))
+PRICE_STATS_REBUILD_SECONDS = float(os.getenv("PRICE_STATS_REBUILD_SECONDS", "3600"))
+# Rebuild early once this many edits/deletes could have skewed the digests
+PRICE_STATS_MAX_STALE_WRITES = int(os.getenv("PRICE_STATS_MAX_STALE_WRITES", "200"))
+PRICE_STATS_SCAN_BATCH = 5000
+
+QUANTILES = {"p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9}
+
+logger = logging.getLogger(__name__)
+
+
+def _k_scale(q, compression):
+    """t-digest k1 scale: centroids are small near the tails and large around the median"""
+    q = min(max(q, 0.0), 1.0)
+    return compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+
+class TDigest:
+    def __init__(self, compression: int = PRICE_STATS_COMPRESSION):
+        self.compression = compression
+        self.means: list[float] = []
+        self.weights: list[float] = []
+        self._buffer: list[float] = []
+        self.count = 0
+
+    @classmethod
+    def from_values(cls, values, compression: int = PRICE_STATS_COMPRESSION) -> "TDigest":
+        """Build a digest from raw values in one pass over them in sorted order"""
+        digest = cls(compression)
+        n = len(values)
+        if not n:
+            return digest
+        digest.count = n
+        ordered = sorted(float(value) for value in values)
+        offset = compression / 4
+        current, total, weight = None, 0.0, 0
+        for index, value in enumerate(ordered):
+            bucket = math.floor(_k_scale((index + 0.5) / n, compression) + offset)
+            if bucket != current and weight:
+                digest.means.append(total / weight)
+                digest.weights.append(weight)
+                total, weight = 0.0, 0
+            current = bucket
+            total += value
+            weight += 1
+        digest.means.append(total / weight)
+        digest.weights.append(weight)
+        return digest
+
+    def add(self, value: float):
+        self._buffer.append(float(value))
+        self.count += 1
+        if len(self._buffer) >= self.compression:
+            self._merge()
+
+    def _merge(self):
+        if not self._buffer:
+            return
+        points = sorted(zip(self.means + self._buffer, self.weights + [1.0] * len(self._buffer)))
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        means, weights = [], []
+        seen = 0.0
+        mean, weight = points[0]
+        limit = _k_scale(0.0, self.compression) + 1
+        for next_mean, next_weight in points[1:]:
+            if _k_scale((seen + weight + next_weight) / total, self.compression) <= limit:
+                mean = (mean * weight + next_mean * next_weight) / (weight + next_weight)
+                weight += next_weight
+                continue
+            means.append(mean)
+            weights.append(weight)
+            seen += weight
+            limit = _k_scale(seen / total, self.compression) + 1
+            mean, weight = next_mean, next_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._merge()
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+        # Interpolate between centroid centres (cumulative weight at each centroid's midpoint)
+        centres, running = [], 0.0
+        for weight in self.weights:
+            centres.append(running + weight / 2)
+            running += weight
+        target = q * running
+        if target <= centres[0]:
+            return self.means[0]
+        if target >= centres[-1]:
+            return self.means[-1]
+        index = bisect_left(centres, target)
+        left, right = centres[index - 1], centres[index]
+        fraction = (target - left) / (right - left)
+        return self.means[index - 1] + fraction * (self.means[index] - self.means[index - 1])
+
+
+class RunningStats:
+    """Welford's online mean/variance plus min/max"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+def _add(categories: dict, category: Hashable, price: Any):
+    digest, stats = categories.setdefault(category, (TDigest(), RunningStats()))
+    digest.add(price)
+    stats.add(price)
+
+
+class PriceStats:
+    """
+    Category -> (digest, running stats). `loader(db)` yields (category, price)
+    rows for a rebuild; reads never touch the database unless there is no
+    snapshot yet. Background rebuilds open their session with `session_factory`.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Any], Iterable[tuple[Hashable, Any]]],
+        rebuild_seconds: float,
+        max_stale_writes: int,
+        session_factory: Callable[[], Any],
+    ):
+        self.loader = loader
+        self.rebuild_seconds = rebuild_seconds
+        self.max_stale_writes = max_stale_writes
+        self.session_factory = session_factory
+        self._categories: dict[Hashable, tuple[TDigest, RunningStats]] = {}
+        self._built_at: Optional[float] = None
+        self._stale_writes = 0
+        self._replay: Optional[list[tuple[Hashable, Any]]] = None  # Prices recorded during a rebuild
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+
+    def clear(self):
+        with self._lock:
+            self._categories = {}
+            self._built_at = None
+            self._stale_writes = 0
+
+    def record(self, category: Hashable, price: Any):
+        """A new price was written"""
+        if price is None or category is None:
+            return
+        with self._lock:
+            if self._replay is not None:
+                # The rebuild's scan may have started before this write committed
+                self._replay.append((category, price))
+            if self._built_at is None:
+                return  # Picked up by the first rebuild
+            _add(self._categories, category, price)
+
+    def mark_stale(self, count: int = 1):
+        """Prices were edited, removed or moved category; digests can't subtract, so count them towards a rebuild"""
+        with self._lock:
+            self._stale_writes += count
+
+    def _rebuild_due(self) -> bool:
+        return (
+            self._built_at is None
+            or time.monotonic() - self._built_at >= self.rebuild_seconds
+            or self._stale_writes >= self.max_stale_writes
+        )
+
+    def rebuild(self, db):
+        """
+        Stream every price into new digests and swap them in. A price recorded
+        in the instant between its commit and the scan starting can be counted
+        twice until the next rebuild; none is lost.
+        """
+        with self._lock:
+            # Writes marked stale during the scan count towards the next rebuild
+            stale_writes = self._stale_writes
+            self._replay = []
+        categories: dict[Hashable, tuple[TDigest, RunningStats]] = {}
+        try:
+            for category, price in self.loader(db):
+                _add(categories, category, price)
+        except BaseException:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            for category, price in self._replay:
+                _add(categories, category, price)
+            self._replay = None
+            self._categories = categories
+            self._built_at = time.monotonic()
+            self._stale_writes -= stale_writes
+
+    def _background_rebuild(self):
+        try:
+            with self.session_factory() as db:
+                self.rebuild(db)
+        except Exception:
+            # Keep serving the previous snapshot; the next read retries
+            logger.exception("Price stats rebuild failed")
+        finally:
+            self._rebuild_lock.release()
+
+    def _ensure_fresh(self, db):
+        if not self._rebuild_due():
+            return
+        if self._built_at is None:
+            # Nothing to serve yet: the first build runs on the request
+            with self._rebuild_lock:
+                if self._built_at is None:
+                    self.rebuild(db)
+            return
+        # Already rebuilding: serve the current numbers
+        if self._rebuild_lock.acquire(blocking=False):
+            self._rebuild_thread = threading.Thread(target=self._background_rebuild, daemon=True)
+            self._rebuild_thread.start()
+
+    def wait_for_rebuild(self, timeout: Optional[float] = None):
+        """Block until a background rebuild in progress has finished"""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def summary(self, db, category: Hashable) -> dict:
+        self._ensure_fresh(db)
+        with self._lock:
+            digest, stats = self._categories.get(category, (None, None))
+            if not stats or not stats.count:
+                return {"count": 0}
+            return {
+                "count": stats.count,
+                "mean": round(stats.mean, 2),
+                "stddev": round(stats.stddev, 2),
+                "min": round(stats.min, 2),
+                "max": round(stats.max, 2),
+                **{name: round(digest.quantile(q), 2) for name, q in QUANTILES.items()},
+            }
+
@@ -0,0 +1,63 @@
+"""
+Enforce the notification retention policy (see notifications/retention.py):
+read notifications older than NOTIFICATIONS_READ_RETENTION_DAYS and all
+notifications older than NOTIFICATIONS_RETENTION_DAYS are removed.
+
+On Postgres expired months are dropped as whole partitions and upcoming
+partitions are created first; everything else is deleted in throttled
+batches, one transaction each. Safe to stop and re-run at any time.
+
+Usage: python prune_notifications.py [--batch-size 1000] [--pause 0.2] [--max-batches N]
+"""
+import argparse
+import time
+
+from database import SessionLocal
+from authentication.models import User  # noqa: F401 - register mappers
+from cravings.models import Craving  # noqa: F401
+from responses.models import Response  # noqa: F401
+from notifications import retention
+
+
+def prune_notifications(
+    batch_size: int = retention.NOTIFICATIONS_PRUNE_BATCH_SIZE,
+    pause: float = retention.NOTIFICATIONS_PRUNE_PAUSE_SECONDS,
+    max_batches: int = None,
+):
+    db = SessionLocal()
+    read_before, any_before = retention.retention_cutoffs()
+    pruned = 0
+    batches = 0
+
+    try:
+        if retention.is_partitioned(db):
+            created = retention.ensure_partitions(db)
+            print(f"🔄 Created {created} upcoming notification partitions")
+            for name in retention.drop_expired_partitions(db, any_before):
+                print(f"   dropped partition {name}")
+
+        print(f"🔄 Pruning read notifications before {read_before.isoformat()} and all before {any_before.isoformat()}...")
+        while max_batches is None or batches < max_batches:
+            deleted = retention.prune_batch(db, read_before, any_before, batch_size)
+            if not deleted:
+                break
+            pruned += deleted
+            batches += 1
+            print(f"   batch {batches}: {deleted} notifications deleted ({pruned} total)")
+            time.sleep(pause)
+
+        print(f"✅ Pruning complete: {pruned} notifications deleted in {batches} batches")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Pruning failed after {pruned} notifications: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete expired notifications in throttled batches")
+    parser.add_argument("--batch-size", type=int, default=retention.NOTIFICATIONS_PRUNE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=retention.NOTIFICATIONS_PRUNE_PAUSE_SECONDS, help="Seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    prune_notifications(batch_size=args.batch_size, pause=args.pause, max_batches=args.max_batches)
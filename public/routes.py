@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, status, Query, Request, Response
+from typing import Optional
 from sqlalchemy.orm import Session
 from database import get_db
 from cravings import crud as cravings_crud, schemas as cravings_schemas
+from cravings.trending import trending_tracker
 from responses import crud as responses_crud, schemas as responses_schemas
 from user_profile import crud as profile_crud
-from notifications import crud as notifications_crud
+from notifications.outbox import outbox_worker
 from authentication import schemas as auth_schemas
+from http_cache import weak_etag, not_modified_response
+from idempotency.store import IDEMPOTENCY_KEY_MAX_LENGTH, idempotency_store
+from rate_limit import PUBLIC_RESPOND_PER_CLIENT, PUBLIC_RESPOND_PER_CRAVING, client_ip, rate_limiter
 
 router = APIRouter()
 
@@ -14,12 +19,43 @@ def _status_value(status):
     return status.value if hasattr(status, "value") else status
 
 
+def limit_public_responses(share_token: str, request: Request):
+    """Throttle anonymous responses per client and per craving before any DB work"""
+    rate_limiter.check([
+        (f"respond:client:{client_ip(request)}:{share_token}", PUBLIC_RESPOND_PER_CLIENT),
+        (f"respond:craving:{share_token}", PUBLIC_RESPOND_PER_CRAVING),
+    ])
+
+
 @router.get("/craving/{share_token}", response_model=auth_schemas.StandardResponse[cravings_schemas.CravingWithResponses])
-def view_shared_craving(share_token: str, db: Session = Depends(get_db)):
+def view_shared_craving(
+    share_token: str,
+    request: Request,
+    http_response: Response,
+    responses_limit: int = Query(cravings_crud.DETAIL_RESPONSES_LIMIT, ge=1, le=100),
+    responses_cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """View a craving via share link (no authentication required)"""
-    craving = db.query(cravings_crud.models.Craving).filter(
-        cravings_crud.models.Craving.share_token == share_token
-    ).first()
+    version = cravings_crud.get_craving_version(db, share_token=share_token)
+    if not version:
+        raise HTTPException(status_code=404, detail="Craving not found")
+    # Revalidations are views too; the tracker's flusher thread writes them back in batches
+    trending_tracker.record_view(version[0])
+
+    cached = not_modified_response(request, http_response, weak_etag("craving", *version))
+    if cached:
+        return cached
+
+    try:
+        craving = cravings_crud.get_craving_detail(
+            db,
+            share_token=share_token,
+            responses_limit=responses_limit,
+            responses_cursor=responses_cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not craving:
         raise HTTPException(status_code=404, detail="Craving not found")
@@ -31,52 +67,68 @@ def view_shared_craving(share_token: str, db: Session = Depends(get_db)):
     }
 
 
-@router.post("/craving/{share_token}/respond", response_model=auth_schemas.StandardResponse[responses_schemas.ResponseOut])
+@router.post(
+    "/craving/{share_token}/respond",
+    response_model=auth_schemas.StandardResponse[responses_schemas.ResponseOut],
+    # Route-level dependencies run before the endpoint's, so throttled calls never open a session
+    dependencies=[Depends(limit_public_responses)],
+)
 def respond_to_shared_craving(
     share_token: str,
     response: responses_schemas.ResponseCreate,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
     db: Session = Depends(get_db)
 ):
-    """Respond to a craving anonymously (no authentication required)"""
-    # Find craving by share token
-    craving = db.query(cravings_crud.models.Craving).filter(
-        cravings_crud.models.Craving.share_token == share_token
-    ).first()
-    
-    if not craving:
-        raise HTTPException(status_code=404, detail="Craving not found")
-    
-    # Check if craving is still open
-    if _status_value(craving.status) != "open":
-        raise HTTPException(status_code=400, detail="Craving is no longer accepting responses")
-    
-    # Validate anonymous response requirements
-    if response.is_anonymous and not response.anonymous_name:
-        response.anonymous_name = "Anonymous"
-    
-    # Create anonymous response (user_id is None)
-    db_response = responses_crud.create_response(
-        db=db,
-        craving_id=craving.id,
-        response=response,
-        user_id=None  # Anonymous
-    )
-    
-    # Create notification for craving owner
-    responder_name = response.anonymous_name if response.is_anonymous else "Someone"
-    notifications_crud.notify_craving_response(
-        db=db,
-        craving_owner_id=craving.user_id,
-        craving_id=craving.id,
-        response_id=db_response.id,
-        responder_name=responder_name
+    """
+    Respond to a craving anonymously (no authentication required).
+    Retries sent with the same Idempotency-Key header replay the first result.
+    """
+    def respond():
+        # Find craving by share token
+        craving = db.query(cravings_crud.models.Craving).filter(
+            cravings_crud.models.Craving.share_token == share_token
+        ).first()
+
+        if not craving:
+            raise HTTPException(status_code=404, detail="Craving not found")
+
+        # Check if craving is still open
+        if _status_value(craving.status) != "open":
+            raise HTTPException(status_code=400, detail="Craving is no longer accepting responses")
+
+        # Validate anonymous response requirements
+        if response.is_anonymous and not response.anonymous_name:
+            response.anonymous_name = "Anonymous"
+
+        # Create anonymous response (user_id is None) and queue the owner's notification
+        db_response = responses_crud.create_response(
+            db=db,
+            craving_id=craving.id,
+            response=response,
+            user_id=None,  # Anonymous
+            craving_owner_id=craving.user_id,
+            responder_name=response.anonymous_name if response.is_anonymous else "Someone",
+        )
+
+        return {
+            "success": True,
+            "message": "Response submitted successfully",
+            "data": db_response
+        }
+
+    # Deliver the queued notification once the response has been sent
+    background_tasks.add_task(outbox_worker.drain)
+    return idempotency_store.run(
+        db,
+        idempotency_key,
+        scope=f"public:respond:{share_token}",
+        request=response.model_dump(mode="json"),
+        model_type=auth_schemas.StandardResponse[responses_schemas.ResponseOut],
+        handler=respond,
+        # Same status as the route's, so first calls and replays agree
+        status_code=status.HTTP_200_OK,
     )
-    
-    return {
-        "success": True,
-        "message": "Response submitted successfully",
-        "data": db_response
-    }
 
 
 @router.get("/profile/{user_id}", response_model=auth_schemas.GenericResponse)
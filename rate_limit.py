@@ -0,0 +1,180 @@
+"""
+Sliding-window rate limiting.
+
+Each key keeps hit counts for the current and the previous fixed window; the
+previous count is weighted by how much of it still overlaps the sliding
+window ("sliding window counter"). That is O(1) state per key and, unlike
+plain fixed windows, does not let a client burst 2x across a window boundary.
+
+Limits are checked in route dependencies that FastAPI resolves before the
+route's own parameters, so a rejected request never opens a DB session.
+The in-memory backend counts per process; set RATE_LIMIT_REDIS_URL (needs
+the `redis` package) to share counters between workers, or plug in any
+backend with `rate_limiter.set_backend`.
+"""
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException, Request, status
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for the shared backend
+    redis = None
+
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Number of reverse proxies in front of the app that append to X-Forwarded-For
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+
+PUBLIC_RESPOND_WINDOW_SECONDS = float(os.getenv("PUBLIC_RESPOND_WINDOW_SECONDS", "60"))
+PUBLIC_RESPOND_CLIENT_LIMIT = int(os.getenv("PUBLIC_RESPOND_CLIENT_LIMIT", "5"))
+PUBLIC_RESPOND_CRAVING_LIMIT = int(os.getenv("PUBLIC_RESPOND_CRAVING_LIMIT", "30"))
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    window: float  # seconds
+
+
+# Anonymous responds: per client IP + share token, and per craving overall
+PUBLIC_RESPOND_PER_CLIENT = RateLimit(PUBLIC_RESPOND_CLIENT_LIMIT, PUBLIC_RESPOND_WINDOW_SECONDS)
+PUBLIC_RESPOND_PER_CRAVING = RateLimit(PUBLIC_RESPOND_CRAVING_LIMIT, PUBLIC_RESPOND_WINDOW_SECONDS)
+
+
+def _retry_after(previous: float, current: float, elapsed: float, rule: RateLimit) -> float:
+    """Seconds until one more hit fits, given the counts of the previous and current windows"""
+    if current + 1 > rule.limit:
+        # Wait for the next window, then for this window's weight to decay enough
+        return rule.window - elapsed + rule.window * (1 - (rule.limit - 1) / current)
+    return rule.window * (1 - (rule.limit - 1 - current) / previous) - elapsed
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def hit(self, rules: Sequence[tuple[str, RateLimit]], now: float) -> float:
+        """
+        Count one hit on every (key, rule) if all of them fit; otherwise count
+        none. Returns 0 if allowed, else seconds until every rule has room.
+        """
+
+
+def _window(rule: RateLimit, now: float) -> tuple[int, float]:
+    """(window index, seconds into that window)"""
+    index = int(now // rule.window)
+    return index, now - index * rule.window
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process counters, least recently used keys dropped beyond `max_keys`"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, tuple[int, int, int]]" = OrderedDict()  # key -> (window index, previous, current)
+        self._lock = threading.Lock()
+
+    def hit(self, rules: Sequence[tuple[str, RateLimit]], now: float) -> float:
+        with self._lock:
+            wait = 0.0
+            counts = []
+            for key, rule in rules:
+                index, elapsed = _window(rule, now)
+                start, previous, current = self._counters.get(key, (index, 0, 0))
+                if start != index:
+                    previous, current = (current if start == index - 1 else 0), 0
+                if previous * (1 - elapsed / rule.window) + current + 1 > rule.limit:
+                    wait = max(wait, _retry_after(previous, current, elapsed, rule))
+                counts.append((key, index, previous, current))
+            for key, index, previous, current in counts:
+                self._counters[key] = (index, previous, current if wait else current + 1)
+                self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return wait
+
+
+class RedisBackend(RateLimitBackend):
+    """Counters shared by every worker; each window is a Redis key that expires after two windows"""
+
+    # Check every rule, then increment all of them or none, atomically.
+    # KEYS are (current, previous) window pairs and ARGV (weight, limit, ttl)
+    # triples, one per rule; returns {rule number, previous, current} per exhausted rule.
+    _SCRIPT = """
+    local rules = #KEYS / 2
+    local exhausted = {}
+    for i = 1, rules do
+        local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+        local previous = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+        if previous * tonumber(ARGV[3 * i - 2]) + current + 1 > tonumber(ARGV[3 * i - 1]) then
+            table.insert(exhausted, i)
+            table.insert(exhausted, previous)
+            table.insert(exhausted, current)
+        end
+    end
+    if #exhausted == 0 then
+        for i = 1, rules do
+            redis.call('INCR', KEYS[2 * i - 1])
+            redis.call('EXPIRE', KEYS[2 * i - 1], ARGV[3 * i])
+        end
+    end
+    return exhausted
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    def hit(self, rules: Sequence[tuple[str, RateLimit]], now: float) -> float:
+        keys, args = [], []
+        for key, rule in rules:
+            index, elapsed = _window(rule, now)
+            keys += [f"ratelimit:{key}:{index}", f"ratelimit:{key}:{index - 1}"]
+            args += [1 - elapsed / rule.window, rule.limit, math.ceil(2 * rule.window)]
+        exhausted = self._script(keys=keys, args=args)
+        wait = 0.0
+        for i in range(0, len(exhausted), 3):
+            rule = rules[exhausted[i] - 1][1]
+            wait = max(wait, _retry_after(exhausted[i + 1], exhausted[i + 2], _window(rule, now)[1], rule))
+        return wait
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    def set_backend(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    def check(self, rules: Iterable[tuple[str, RateLimit]], now: Optional[float] = None):
+        """
+        Count the request against every (key, rule), or 429 if any of them is
+        exhausted. A rejected request counts against none of them, so a
+        client is not charged for a request the per-craving limit turned away.
+        """
+        now = time.time() if now is None else now
+        wait = self.backend.hit(list(rules), now)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+
+def client_ip(request: Request) -> str:
+    """Client address, taken from X-Forwarded-For only as far as our own proxies appended it"""
+    if RATE_LIMIT_PROXY_HOPS:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= RATE_LIMIT_PROXY_HOPS:
+            return forwarded[-RATE_LIMIT_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+rate_limiter = RateLimiter(RedisBackend(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryBackend())
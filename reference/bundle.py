@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from enum import Enum
+from typing import Optional, Type
+
+from sqlalchemy.orm import Session
+
+from authentication import schemas as auth_schemas
+from cravings import schemas as cravings_schemas
+from fast_json import render_model
+from notifications import schemas as notifications_schemas
+from responses import schemas as responses_schemas
+from vendor_profile import crud as vendor_crud, schemas as vendor_schemas
+
+# How often (seconds) to check service_categories for changes made by other processes
+REFERENCE_RECHECK_SECONDS = float(os.getenv("REFERENCE_RECHECK_SECONDS", "60"))
+
+
+def _enum_options(enum_cls: Type[Enum]) -> list[dict]:
+    return [{"id": member.value, "name": member.value.replace("_", " ").title()} for member in enum_cls]
+
+
+class ReferenceBundle:
+    """
+    Process-wide, pre-serialized bundle of dropdown/reference data.
+
+    The bundle is built once and identified by a hash of its content. It is only
+    rebuilt when the service_categories validator changes (checked at most every
+    `recheck_seconds`) or when `invalidate()` is called after an in-process write.
+    """
+
+    def __init__(self, recheck_seconds: float):
+        self.recheck_seconds = recheck_seconds
+        self.version: Optional[str] = None
+        self.payload: Optional[bytes] = None
+        self._validator = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._validator = None
+            self._checked_at = 0.0
+
+    def _is_current(self) -> bool:
+        return self.payload is not None and time.monotonic() - self._checked_at < self.recheck_seconds
+
+    def get(self, db: Session) -> tuple[str, bytes]:
+        """Return (version, serialized payload), rebuilding if service categories changed"""
+        if self._is_current():
+            return self.version, self.payload
+
+        with self._lock:
+            if not self._is_current():
+                validator = tuple(vendor_crud.get_service_categories_version(db))
+                if validator != self._validator or self.payload is None:
+                    self._build(db)
+                    self._validator = validator
+                self._checked_at = time.monotonic()
+            return self.version, self.payload
+
+    def _build(self, db: Session):
+        service_categories = [
+            vendor_schemas.ServiceCategoryResponse.model_validate(category).model_dump(mode="json")
+            for category in vendor_crud.get_service_categories(db)
+        ]
+        data = {
+            "craving_categories": cravings_schemas.CRAVING_CATEGORY_OPTIONS,
+            "service_categories": service_categories,
+            "craving_statuses": _enum_options(cravings_schemas.CravingStatus),
+            "response_statuses": _enum_options(responses_schemas.ResponseStatus),
+            "vendor_statuses": _enum_options(vendor_schemas.VendorStatus),
+            "verification_statuses": _enum_options(vendor_schemas.VerificationStatus),
+            "availability_statuses": _enum_options(vendor_schemas.AvailabilityStatus),
+            "notification_types": _enum_options(notifications_schemas.NotificationType),
+        }
+        canonical = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        version = hashlib.sha256(canonical).hexdigest()[:16]
+
+        self.payload = render_model(auth_schemas.GenericResponse, {
+            "success": True,
+            "message": "Reference data retrieved successfully",
+            "data": {"version": version, "url": f"/reference/{version}", **data},
+        })
+        self.version = version
+
+
+reference_bundle = ReferenceBundle(recheck_seconds=REFERENCE_RECHECK_SECONDS)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
+from authentication import schemas as auth_schemas
+from database import get_db
+from http_cache import etag_matches
+from reference.bundle import reference_bundle
+
+router = APIRouter()
+
+# The versioned URL changes whenever the content does, so it can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _bundle_response(request: Request, version: str, payload: bytes, cache_control: str) -> Response:
+    headers = {"ETag": f'"{version}"', "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get("", response_model=auth_schemas.GenericResponse)
+def get_reference_data(request: Request, db: Session = Depends(get_db)):
+    """
+    Get all dropdown/reference data in one call (categories and status enums).
+    `data.url` is a content-addressed URL for the same bundle that can be cached forever.
+    """
+    version, payload = reference_bundle.get(db)
+    return _bundle_response(request, version, payload, "no-cache")
+
+
+@router.get("/{version}", response_model=auth_schemas.GenericResponse)
+def get_versioned_reference_data(version: str, request: Request, db: Session = Depends(get_db)):
+    """Get the reference bundle for a specific content version"""
+    current_version, payload = reference_bundle.get(db)
+    if version != current_version:
+        # Outdated (or unknown) version: point the client at the current bundle
+        return RedirectResponse(url=f"/reference/{current_version}", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    return _bundle_response(request, current_version, payload, IMMUTABLE_CACHE_CONTROL)
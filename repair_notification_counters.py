@@ -0,0 +1,53 @@
+"""
+Recompute the denormalized unread notification counters on users
+(unread_notification_count).
+
+Counters are maintained transactionally by notifications/crud.py; run this
+after the migration that adds them, or whenever drift is suspected. Users are
+processed in id order, one short transaction per batch.
+
+Usage: python repair_notification_counters.py [--batch-size 500] [--pause 0.1]
+"""
+import argparse
+import time
+
+from database import SessionLocal
+from authentication.models import User
+from cravings.models import Craving  # noqa: F401 - register mappers
+from responses.models import Response  # noqa: F401
+from notifications import crud
+
+
+def repair_counters(batch_size: int = 500, pause: float = 0.1):
+    db = SessionLocal()
+    last_id = None
+    repaired = 0
+
+    try:
+        while True:
+            query = db.query(User.id).order_by(User.id)
+            if last_id is not None:
+                query = query.filter(User.id > last_id)
+            batch = [row.id for row in query.limit(batch_size)]
+            if not batch:
+                break
+
+            repaired += crud.recompute_unread_counts(db, batch)
+            last_id = batch[-1]
+            print(f"🔄 Repaired {repaired} users (last id {last_id})")
+            time.sleep(pause)
+
+        print(f"✅ Counter repair complete: {repaired} users updated")
+    except Exception as e:
+        print(f"❌ Counter repair failed after {repaired} users: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute unread notification counters in batches")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+    repair_counters(batch_size=args.batch_size, pause=args.pause)
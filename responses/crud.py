@@ -1,14 +1,71 @@
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.orm import Session, contains_eager
 from responses import models, schemas
+from cravings.models import Craving
+from cravings import trending
+from cravings.feed_cache import feed_cache
+from archive.models import ArchivedResponse
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a row"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _adjust_craving_counters(
+    db: Session,
+    craving_id: str,
+    total: int = 0,
+    pending: int = 0,
+    last_response_at=None,
+    trending_rank: float = None,
+):
+    """
+    Apply counter deltas to the parent craving with a single UPDATE in the caller's
+    transaction. Counters are incremented in SQL so concurrent writers don't lose updates.
+    """
+    values = {
+        Craving.response_count: Craving.response_count + total,
+        Craving.pending_response_count: Craving.pending_response_count + pending,
+        # Response activity is not an edit of the craving itself
+        Craving.updated_at: Craving.updated_at,
+    }
+    if last_response_at is not None:
+        values[Craving.last_response_at] = last_response_at
+    if trending_rank is not None:
+        values[Craving.trending_rank] = trending_rank
+    db.query(Craving).filter(Craving.id == craving_id).update(values, synchronize_session=False)
+
+
+def _is_pending(status) -> bool:
+    return status in (None, models.ResponseStatus.pending, schemas.ResponseStatus.pending.value)
 
 
 def create_response(
     db: Session, 
     craving_id: str, 
     response: schemas.ResponseCreate,
-    user_id: str = None  # Now optional
+    user_id: str = None,  # Now optional
+    craving_owner_id: str = None,
+    responder_name: str = "Someone",
 ):
-    """Create a response (authenticated or anonymous)"""
+    """
+    Create a response (authenticated or anonymous). With `craving_owner_id` the
+    owner's notification is queued in the notification outbox in the same
+    transaction, so creating a response takes a single commit.
+    """
     db_response = models.Response(
         craving_id=craving_id,
         user_id=user_id,  # Will be None for anonymous
@@ -18,7 +75,22 @@ def create_response(
         anonymous_contact=response.anonymous_contact
     )
     db.add(db_response)
+    rank = trending.next_rank(db, craving_id, trending.RESPONSE_WEIGHT)
+    _adjust_craving_counters(
+        db, craving_id, total=1, pending=1, last_response_at=func.now(), trending_rank=rank
+    )
+    if craving_owner_id is not None:
+        from notifications import crud as notifications_crud
+
+        # Insert after the craving UPDATE (same lock order as before) to learn the response id
+        db.flush()
+        notifications_crud.notify_craving_response(
+            db, craving_owner_id, craving_id, db_response.id, responder_name=responder_name
+        )
     db.commit()
+    # Feed pages carry response counts
+    feed_cache.bump_version()
+    trending.trending_tracker.observe(craving_id, rank)
     db.refresh(db_response)
     return db_response
 
@@ -33,29 +105,208 @@ def get_craving_responses(db: Session, craving_id: str):
     ).order_by(models.Response.created_at.desc()).all()
 
 
-def get_user_responses(db: Session, user_id: str, skip: int = 0, limit: int = 50):
-    return db.query(models.Response).filter(
-        models.Response.user_id == user_id
-    ).order_by(models.Response.created_at.desc()).offset(skip).limit(limit).all()
+def _keyset(column, value, id_column, last_id, newer: bool):
+    if newer:
+        return or_(column > value, and_(column == value, id_column > last_id))
+    return or_(column < value, and_(column == value, id_column < last_id))
 
 
-def update_response(db: Session, response_id: str, response_update: schemas.ResponseUpdate):
-    db_response = get_response(db, response_id)
-    if not db_response:
-        return None
+def cursor_filter(db: Session, cursor: str, model=models.Response, newer: bool = False):
+    """
+    Keyset predicate for rows older than `cursor` in (created_at, id) order, or
+    newer than it with `newer`. Works for any model with `created_at` and `id`.
+    """
+    created_at, last_id = decode_cursor(cursor)
+    if db.get_bind().dialect.name != "sqlite":
+        return _keyset(model.created_at, created_at, model.id, last_id, newer)
+    # SQLite keeps timestamps as text: CURRENT_TIMESTAMP defaults have no fractional
+    # part while bound datetimes always do, so normalise both sides before comparing.
+    # The wrapped column can't use the index, so also bound the raw column (one
+    # second of slack covers both formats) to keep an index range scan.
+    slack = timedelta(seconds=1)
+    return and_(
+        model.created_at >= created_at - slack if newer else model.created_at <= created_at + slack,
+        _keyset(
+            func.strftime("%Y-%m-%d %H:%M:%f", model.created_at),
+            func.strftime("%Y-%m-%d %H:%M:%f", created_at.isoformat(" ")),
+            model.id,
+            last_id,
+            newer,
+        ),
+    )
+
+
+def get_craving_responses_page(
+    db: Session,
+    craving_id: str,
+    limit: int = 20,
+    cursor: str = None,
+    model=models.Response,
+    status=None,
+):
+    """
+    Newest-first page of a craving's responses using keyset pagination on (created_at, id),
+    optionally restricted to one `status`. Returns (responses, next_cursor); next_cursor
+    is None on the last page. `model` may be swapped for the archive table, which has
+    the same columns.
+    """
+    query = db.query(model).filter(model.craving_id == craving_id)
+    if status is not None:
+        query = query.filter(model.status == status)
+
+    if cursor:
+        query = query.filter(cursor_filter(db, cursor, model))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(
+        model.created_at.desc(), model.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, None
+
+
+def get_user_responses_page(
+    db: Session,
+    user_id: str,
+    limit: int = 50,
+    cursor: str = None,
+    status=None,
+    expand_craving: bool = False,
+    skip: int = 0,
+):
+    """
+    Newest-first keyset page of a user's responses, optionally restricted to one
+    `status`. With `expand_craving` the craving summary (and its owner's username)
+    is loaded by the same query through a join. `skip` is the legacy offset,
+    used instead of `cursor`. Returns (responses, next_cursor).
+    """
+    query = db.query(models.Response).filter(models.Response.user_id == user_id)
+    if status is not None:
+        query = query.filter(models.Response.status == status)
+    if expand_craving:
+        from authentication.models import User
+        query = query.join(models.Response.craving).join(Craving.user).options(
+            contains_eager(models.Response.craving).load_only(
+                Craving.name, Craving.category, Craving.status, Craving.price_estimate, Craving.user_id
+            ),
+            contains_eager(models.Response.craving, Craving.user).load_only(User.username),
+        )
+
+    if cursor:
+        query = query.filter(cursor_filter(db, cursor))
+
+    rows = query.order_by(
+        models.Response.created_at.desc(), models.Response.id.desc()
+    ).offset(skip).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, None
+
+
+def get_user_responses_export_queries(db: Session, user_id: str) -> list:
+    """
+    Unmaterialized queries over all of a user's responses, oldest first (see
+    exports.py): the archived ones, which are older, then the live ones.
+    """
+    return [
+        db.query(model).filter(model.user_id == user_id).order_by(model.created_at, model.id)
+        for model in (ArchivedResponse, models.Response)
+    ]
+
+
+def _was_pending(response_id: str):
+    """1 if the response is currently pending, else 0 (evaluated inside the caller's UPDATE)"""
+    return select(
+        case((models.Response.status == models.ResponseStatus.pending, 1), else_=0)
+    ).where(models.Response.id == response_id).scalar_subquery()
+
+
+def _response_write_filter(response_id: str, user_id: str, fields) -> list:
+    """
+    Only the responder may edit the message and only the craving owner may change
+    the status; both rules are expressed as WHERE criteria on the response row.
+    """
+    criteria = [models.Response.id == response_id]
+    if "message" in fields:
+        criteria.append(models.Response.user_id == user_id)
+    if "status" in fields:
+        criteria.append(models.Response.craving_id.in_(
+            select(Craving.id).where(Craving.user_id == user_id)
+        ))
+    return criteria
+
+
+def update_response(db: Session, response_id: str, user_id: str, response_update: schemas.ResponseUpdate):
+    """
+    Update a response with one UPDATE on the parent craving's counters and one
+    UPDATE ... RETURNING on the response. Returns None if the response doesn't
+    exist or `user_id` may not make this change.
+    """
+    data = response_update.model_dump(exclude_unset=True)
+    if not data:
+        # Nothing to change: return the row only to its responder or the craving owner
+        return db.query(models.Response).filter(
+            models.Response.id == response_id,
+            or_(
+                models.Response.user_id == user_id,
+                models.Response.craving_id.in_(select(Craving.id).where(Craving.user_id == user_id)),
+            ),
+        ).first()
+    criteria = _response_write_filter(response_id, user_id, data)
     
-    for key, value in response_update.model_dump(exclude_unset=True).items():
-        setattr(db_response, key, value)
+    # Counters first: the pending delta needs the status from before the update
+    pending = 0
+    if "status" in data:
+        pending = (1 if _is_pending(data["status"]) else 0) - _was_pending(response_id)
+    craving_id = select(models.Response.craving_id).where(*criteria).scalar_subquery()
+    # Edits aren't new responses (last_response_at stays), but craving validators (ETags) must change
+    touched = db.query(Craving).filter(Craving.id == craving_id).update({
+        Craving.pending_response_count: Craving.pending_response_count + pending,
+        Craving.responses_revision: Craving.responses_revision + 1,
+        Craving.updated_at: Craving.updated_at,
+    }, synchronize_session=False)
+    if not touched:
+        db.rollback()
+        return None
     
+    values = {getattr(models.Response, key): value for key, value in data.items()}
+    db_response = db.scalars(
+        update(models.Response).where(*criteria).values(values).returning(models.Response),
+        execution_options={"populate_existing": True},
+    ).first()
+    if db_response is None:
+        # Deleted or changed hands between the two statements
+        db.rollback()
+        return None
+    db.expunge(db_response)
     db.commit()
-    db.refresh(db_response)
+    feed_cache.bump_version()
     return db_response
 
 
-def delete_response(db: Session, response_id: str):
-    db_response = get_response(db, response_id)
-    if db_response:
-        db.delete(db_response)
-        db.commit()
-        return True
-    return False
+def delete_response(db: Session, response_id: str, user_id: str) -> bool:
+    """Delete a response written by `user_id`, adjusting the craving counters in the same transaction"""
+    owned = [models.Response.id == response_id, models.Response.user_id == user_id]
+    craving_id = select(models.Response.craving_id).where(*owned).scalar_subquery()
+    last_response_at = select(func.max(models.Response.created_at)).where(
+        models.Response.craving_id == Craving.id,
+        models.Response.id != response_id,
+    ).correlate(Craving).scalar_subquery()
+    touched = db.query(Craving).filter(Craving.id == craving_id).update({
+        Craving.response_count: Craving.response_count - 1,
+        Craving.pending_response_count: Craving.pending_response_count - _was_pending(response_id),
+        Craving.last_response_at: last_response_at,
+        Craving.updated_at: Craving.updated_at,
+    }, synchronize_session=False)
+    if not touched:
+        db.rollback()
+        return False
+    db.execute(delete(models.Response).where(*owned).execution_options(synchronize_session=False))
+    db.commit()
+    feed_cache.bump_version()
+    return True
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Enum as SAEnum, Boolean, func
+from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Enum as SAEnum, Boolean, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 import shortuuid
@@ -14,9 +14,18 @@ class ResponseStatus(PyEnum):
 
 class Response(Base):
     __tablename__ = "responses"
+    __table_args__ = (
+        # Serve newest-first keyset pages of a craving's responses (all, or one status) without a sort
+        Index("ix_responses_craving_id_created_at", "craving_id", "created_at", "id"),
+        Index("ix_responses_craving_id_status_created_at", "craving_id", "status", "created_at", "id"),
+        # Same for a responder's own responses (GET /responses/my-responses)
+        Index("ix_responses_user_id_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=shortuuid.uuid, index=True)
-    craving_id = Column(String, ForeignKey("cravings.id"), nullable=False, index=True)
+    craving_id = Column(String, ForeignKey("cravings.id", ondelete="CASCADE"), nullable=False, index=True)
+    # No ON DELETE CASCADE: removing responses must also fix their cravings' counters,
+    # so account_deletion deletes them before the user row
     user_id = Column(String, ForeignKey("users.id"), nullable=True, index=True)  # Now NULLABLE for anonymous
     
     message = Column(Text, nullable=False)
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from authentication.auth import get_current_active_user
 from authentication import models as auth_models, schemas as auth_schemas
 from database import get_db
-from responses import crud, schemas
+from responses import crud, models, schemas
 from cravings import crud as cravings_crud
+from exports import ExportFormat, stream_export
+from fast_json import fast_response
+from mutations import raise_missing_or_forbidden
+from idempotency.store import IDEMPOTENCY_KEY_MAX_LENGTH, idempotency_store
+from notifications.outbox import outbox_worker
 
 router = APIRouter()
 
@@ -18,78 +23,155 @@ def _status_value(status):
 def create_response(
     craving_id: str,
     response: schemas.ResponseCreate,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
-    """Create a response to a craving (authenticated user, optionally anonymous)"""
-    # Check if craving exists
-    db_craving = cravings_crud.get_craving(db, craving_id)
-    if not db_craving:
-        raise HTTPException(status_code=404, detail="Craving not found")
-    
-    # Don't allow users to respond to their own cravings
-    if db_craving.user_id == current_user.id:
-        raise HTTPException(status_code=400, detail="Cannot respond to your own craving")
-    
-    # Check if craving is still open
-    if _status_value(db_craving.status) != "open":
-        raise HTTPException(status_code=400, detail="Craving is no longer accepting responses")
-    
-    # Create response (user_id is provided but can be hidden if is_anonymous=True)
-    db_response = crud.create_response(db, craving_id, response, current_user.id)
-    
-    # Create notification
-    from notifications import crud as notifications_crud
-    responder_name = response.anonymous_name if response.is_anonymous else current_user.username
-    notifications_crud.notify_craving_response(
-        db=db,
-        craving_owner_id=db_craving.user_id,
-        craving_id=craving_id,
-        response_id=db_response.id,
-        responder_name=responder_name
+    """
+    Create a response to a craving (authenticated user, optionally anonymous).
+    Retries sent with the same Idempotency-Key header replay the first result.
+    """
+    user_id, username = current_user.id, current_user.username
+
+    def create():
+        # Check if craving exists
+        db_craving = cravings_crud.get_craving(db, craving_id)
+        if not db_craving:
+            raise HTTPException(status_code=404, detail="Craving not found")
+
+        # Don't allow users to respond to their own cravings
+        if db_craving.user_id == user_id:
+            raise HTTPException(status_code=400, detail="Cannot respond to your own craving")
+
+        # Check if craving is still open
+        if _status_value(db_craving.status) != "open":
+            raise HTTPException(status_code=400, detail="Craving is no longer accepting responses")
+
+        # Create response (user_id is provided but can be hidden if is_anonymous=True),
+        # queueing the owner's notification in the same commit
+        db_response = crud.create_response(
+            db,
+            craving_id,
+            response,
+            user_id,
+            craving_owner_id=db_craving.user_id,
+            responder_name=response.anonymous_name if response.is_anonymous else username,
+        )
+
+        return {
+            "success": True,
+            "message": "Response created successfully",
+            "data": db_response
+        }
+
+    # Deliver the queued notification once the response has been sent
+    background_tasks.add_task(outbox_worker.drain)
+    return idempotency_store.run(
+        db,
+        idempotency_key,
+        scope=f"responses:create:{user_id}",
+        request={"craving_id": craving_id, "response": response.model_dump(mode="json")},
+        model_type=auth_schemas.StandardResponse[schemas.ResponseOut],
+        handler=create,
+        status_code=status.HTTP_201_CREATED,
     )
-    
-    return {
-        "success": True,
-        "message": "Response created successfully",
-        "data": db_response
-    }
 
 
-@router.get("/craving/{craving_id}", response_model=auth_schemas.StandardResponse[List[schemas.ResponseOut]])
+@router.get("/craving/{craving_id}", response_model=auth_schemas.PagedResponse[List[schemas.ResponseOut]])
 def list_craving_responses(
     craving_id: str,
+    http_response: Response,
+    limit: int = Query(50, ge=1, le=100, description="Page size; responses beyond it are on later pages"),
+    cursor: Optional[str] = None,
+    response_status: Optional[schemas.ResponseStatus] = Query(None, alias="status"),
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
-    """Get all responses for a specific craving"""
+    """
+    Get a page of responses for a specific craving, newest first: at most
+    `limit` (default 50, max 100) per request, so crawl with the cursor to get
+    them all. Pass a page's `next_cursor` (also sent as the X-Next-Cursor
+    header) as `cursor` to fetch the next one; it is null on the last page.
+    """
     # Check if craving exists
     db_craving = cravings_crud.get_craving(db, craving_id)
     if not db_craving:
         raise HTTPException(status_code=404, detail="Craving not found")
     
-    responses = crud.get_craving_responses(db, craving_id)
+    try:
+        responses, next_cursor = crud.get_craving_responses_page(
+            db, craving_id, limit=limit, cursor=cursor, status=response_status.value if response_status else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        http_response.headers["X-Next-Cursor"] = next_cursor
     return {
         "success": True,
         "message": "Craving responses retrieved successfully",
-        "data": responses
+        "data": responses,
+        "next_cursor": next_cursor,
     }
 
 
-@router.get("/my-responses", response_model=auth_schemas.StandardResponse[List[schemas.ResponseOut]])
+@router.get("/my-responses", response_model=auth_schemas.PagedResponse[List[schemas.ResponseWithCraving]])
 def list_my_responses(
-    skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Offset paging, replaced by `cursor`"),
+    response_status: Optional[schemas.ResponseStatus] = Query(None, alias="status"),
+    expand: Optional[Literal["craving"]] = None,
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
-    """Get current user's responses"""
-    my_responses = crud.get_user_responses(db, current_user.id, skip=skip, limit=limit)
-    return {
-        "success": True,
-        "message": "Your responses retrieved successfully",
-        "data": my_responses
-    }
+    """
+    Get a page of the current user's responses, newest first.
+    `expand=craving` embeds a summary of each craving (joined in the same query).
+    Pass a page's `next_cursor` (also sent as the X-Next-Cursor header) as
+    `cursor` to fetch the next one. The deprecated `skip` offset still works on
+    its own but can't be combined with `cursor`.
+    Only live responses are listed: responses to cravings moved to the archive
+    tables (see archive_cravings.py) are left out here but included in
+    GET /responses/export.
+    """
+    if skip and cursor:
+        raise HTTPException(status_code=400, detail="Use either skip or cursor, not both")
+    try:
+        my_responses, next_cursor = crud.get_user_responses_page(
+            db,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            skip=skip or 0,
+            status=response_status.value if response_status else None,
+            expand_craving=expand == "craving",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Without expand the rows keep the plain ResponseOut shape
+    item_type = schemas.ResponseWithCraving if expand else schemas.ResponseOut
+    return fast_response(
+        auth_schemas.PagedResponse[List[item_type]],
+        {
+            "success": True,
+            "message": "Your responses retrieved successfully",
+            "data": my_responses,
+            "next_cursor": next_cursor,
+        },
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+    )
+
+
+@router.get("/export")
+def export_my_responses(
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Download all of the current user's responses as NDJSON or CSV"""
+    queries = crud.get_user_responses_export_queries(db, current_user.id)
+    return stream_export(db, queries, schemas.ResponseOut, format, "responses")
 
 
 @router.get("/{response_id}", response_model=auth_schemas.StandardResponse[schemas.ResponseOut])
@@ -117,21 +199,17 @@ def update_response(
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Update a response (only the responder or craving owner can update)"""
-    db_response = crud.get_response(db, response_id)
-    if not db_response:
-        raise HTTPException(status_code=404, detail="Response not found")
-    
-    # Get the craving to check ownership
-    db_craving = cravings_crud.get_craving(db, db_response.craving_id)
-    
-    # Only the response creator can edit message, craving owner can change status
-    if response_update.message is not None and db_response.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to edit this response message")
-    
-    if response_update.status is not None and db_craving.user_id != current_user.id:
+    updated_response = crud.update_response(db, response_id, current_user.id, response_update)
+    if not updated_response:
+        # Failure path only: work out which rule rejected the update
+        db_response = crud.get_response(db, response_id)
+        if not db_response:
+            raise HTTPException(status_code=404, detail="Response not found")
+        
+        # Only the response creator can edit message, craving owner can change status
+        if response_update.message is not None and db_response.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to edit this response message")
         raise HTTPException(status_code=403, detail="Only craving owner can change response status")
-    
-    updated_response = crud.update_response(db, response_id, response_update)
     return {
         "success": True,
         "message": "Response updated successfully",
@@ -146,16 +224,12 @@ def delete_response(
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Delete a response (only the responder can delete)"""
-    db_response = crud.get_response(db, response_id)
-    if not db_response:
-        raise HTTPException(status_code=404, detail="Response not found")
-    
-    if db_response.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this response")
-    
-    success = crud.delete_response(db, response_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete response")
+    if not crud.delete_response(db, response_id, current_user.id):
+        raise_missing_or_forbidden(
+            db, models.Response.user_id, response_id,
+            not_found="Response not found",
+            forbidden="Not authorized to delete this response",
+        )
     return {
         "success": True,
         "message": "Response deleted successfully"
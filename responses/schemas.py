@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from decimal import Decimal
 from enum import Enum
+from cravings.models import CravingCategory, CravingStatus
 
 
 class ResponseStatus(str, Enum):
@@ -40,6 +42,33 @@ class ResponseOut(ResponseBase):
         from_attributes = True
 
 
+class CravingOwner(BaseModel):
+    id: str
+    username: str
+
+    class Config:
+        from_attributes = True
+
+
+class CravingSummary(BaseModel):
+    id: str
+    name: str
+    category: CravingCategory
+    status: CravingStatus
+    price_estimate: Optional[Decimal] = None
+    owner: CravingOwner = Field(validation_alias="user")
+
+    class Config:
+        from_attributes = True
+
+
+class ResponseWithCraving(ResponseOut):
+    craving: Optional[CravingSummary] = None  # Only with expand=craving
+
+    class Config:
+        from_attributes = True
+
+
 # For nested display in cravings
 class ResponseInCraving(BaseModel):
     id: str
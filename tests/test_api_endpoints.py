@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
@@ -11,11 +12,21 @@ from sqlalchemy.pool import StaticPool
 os.environ["DATABASE_URL"] = "sqlite://"
 os.environ["GOOGLE_CLIENT_ID"] = "test-google-client-id"
 
-from database import Base, get_db  # noqa: E402
+from database import Base, enable_sqlite_foreign_keys, get_db  # noqa: E402
 from main import app  # noqa: E402
 from vendor_profile.models import ServiceCategory  # noqa: E402
 import authentication.auth as auth_routes  # noqa: E402
 import cravings.routes as cravings_routes  # noqa: E402
+import cravings.trending as trending_module  # noqa: E402
+import notifications.outbox as notifications_outbox  # noqa: E402
+import notifications.routes as notifications_routes  # noqa: E402
+from cravings.feed_cache import feed_cache  # noqa: E402
+from cravings.trending import trending_tracker  # noqa: E402
+from cravings.crud import craving_price_stats  # noqa: E402
+from vendor_profile.crud import item_price_stats  # noqa: E402
+from idempotency.store import idempotency_store  # noqa: E402
+from rate_limit import MemoryBackend, rate_limiter  # noqa: E402
+from reference.bundle import reference_bundle  # noqa: E402
 import user_profile.routes as user_profile_routes  # noqa: E402
 import vendor_profile.routes as vendor_profile_routes  # noqa: E402
 
@@ -63,6 +74,7 @@ def client(monkeypatch: pytest.MonkeyPatch):
     @event.listens_for(test_engine, "connect")
     def _register_sqlite_functions(dbapi_connection, _connection_record):
         dbapi_connection.create_function("now", 0, lambda: datetime.utcnow().isoformat(" "))
+        enable_sqlite_foreign_keys(dbapi_connection, _connection_record)
 
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
     Base.metadata.create_all(bind=test_engine)
@@ -91,9 +103,22 @@ def client(monkeypatch: pytest.MonkeyPatch):
         }
 
     app.dependency_overrides[get_db] = override_get_db
+    feed_cache.clear()
+    trending_tracker.clear()
+    craving_price_stats.clear()
+    item_price_stats.clear()
+    idempotency_store.clear()
+    rate_limiter.set_backend(MemoryBackend())
+    reference_bundle.invalidate()
     monkeypatch.setattr(user_profile_routes, "upload_image", fake_upload_image)
     monkeypatch.setattr(vendor_profile_routes, "upload_image", fake_upload_image)
     monkeypatch.setattr(cravings_routes, "upload_image", fake_upload_image)
+    monkeypatch.setattr(notifications_routes, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(notifications_outbox, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(trending_module, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(auth_routes, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(craving_price_stats, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(item_price_stats, "session_factory", TestingSessionLocal)
     monkeypatch.setattr(auth_routes, "_verify_google_id_token", fake_verify_google_token)
 
     with TestClient(app) as test_client:
@@ -102,7 +127,7 @@ def client(monkeypatch: pytest.MonkeyPatch):
     app.dependency_overrides.clear()
 
 
-def test_all_endpoints_smoke(client: TestClient):
+def test_all_endpoints_smoke(client: TestClient, monkeypatch: pytest.MonkeyPatch):
     assert client.get("/").status_code == 200
     assert client.get("/health").status_code == 200
 
@@ -207,6 +232,28 @@ def test_all_endpoints_smoke(client: TestClient):
     assert update_vendor_profile.status_code == 200
     assert update_vendor_profile.json()["data"]["business_name"] == "Owner Foods Updated"
 
+    # If-Match is re-checked by the UPDATE: a change after the check ends in 412
+    vendor_etag = client.get("/vendor/", headers=_auth_header(token_1)).headers["etag"]
+    original_update_vendor_profile = vendor_profile_routes.crud.update_vendor_profile
+
+    def racing_vendor_update(db, vendor_id, *args):
+        item = vendor_profile_routes.schemas.VendorItemCreate(item_name="Racing item", item_price=100)
+        vendor_profile_routes.crud.add_vendor_item(db, vendor_id, item)
+        return original_update_vendor_profile(db, vendor_id, *args)
+
+    monkeypatch.setattr(vendor_profile_routes.crud, "update_vendor_profile", racing_vendor_update)
+    raced_vendor_update = client.put(
+        "/vendor/",
+        json={"business_name": "Owner Foods Raced"},
+        headers={**_auth_header(token_1), "If-Match": vendor_etag},
+    )
+    assert raced_vendor_update.status_code == 412
+    monkeypatch.setattr(vendor_profile_routes.crud, "update_vendor_profile", original_update_vendor_profile)
+    vendor_profile_now = client.get("/vendor/", headers=_auth_header(token_1)).json()["data"]
+    assert vendor_profile_now["business_name"] == "Owner Foods Updated"
+    for raced_item in client.get("/vendor/items", headers=_auth_header(token_1)).json()["data"]:
+        assert client.delete(f"/vendor/items/{raced_item['id']}", headers=_auth_header(token_1)).status_code == 200
+
     upload_logo = client.post(
         "/vendor/upload-logo",
         headers=_auth_header(token_1),
@@ -240,6 +287,24 @@ def test_all_endpoints_smoke(client: TestClient):
     assert list_items.status_code == 200
     assert len(list_items.json()["data"]) == 1
 
+    export_items = client.get("/vendor/items/export?format=csv", headers=_auth_header(token_1))
+    assert export_items.status_code == 200
+    assert export_items.text.splitlines()[0].startswith("item_name,")
+    assert "Jollof Rice" in export_items.text
+
+    item_prices = client.get(f"/vendor/items/price-stats?service_category_id={category_id}", headers=_auth_header(token_1))
+    assert item_prices.status_code == 200, item_prices.text
+    assert item_prices.json()["data"]["count"] == 1
+    assert item_prices.json()["data"]["p50"] == 18.5
+
+    # Leaving the category moves the vendor's items out of its stats at the next rebuild
+    stale = []
+    monkeypatch.setattr(item_price_stats, "mark_stale", lambda: stale.append(True))
+    client.put("/vendor/", json={"business_name": "Owner Foods Updated"}, headers=_auth_header(token_1))
+    moved = client.put("/vendor/", json={"service_category_id": None}, headers=_auth_header(token_1))
+    assert moved.status_code == 200, moved.text
+    assert stale == [True]
+
     upload_item_image = client.post(
         f"/vendor/items/{item_id}/upload-image",
         headers=_auth_header(token_1),
@@ -412,3 +477,1121 @@ def test_all_endpoints_smoke(client: TestClient):
 
     # Ensure both users created at the beginning are still retrievable.
     assert client.get(f"/public/profile/{user_2_id}").status_code == 200
+
+
+def _move_notification(db, notification_id: str, created_at):
+    """created_at is part of the notifications primary key; move it with a statement keyed on id"""
+    from sqlalchemy import update
+    from notifications.models import Notification
+
+    db.execute(update(Notification).where(Notification.id == notification_id).values(created_at=created_at))
+
+
+def _create_craving(client: TestClient, token: str, name: str = "Need Suya") -> dict:
+    response = client.post(
+        "/cravings/",
+        json={"name": name, "category": "food", "price_estimate": 2500},
+        headers=_auth_header(token),
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["data"]
+
+
+def test_craving_detail_embeds_bounded_response_page(client: TestClient):
+    owner_token, _ = _signup(client, "detailowner", "detail.owner@example.com", "+12345678911")
+    responder_token, _ = _signup(client, "detailresponder", "detail.responder@example.com", "+12345678912")
+    craving = _create_craving(client, owner_token)
+
+    for i in range(5):
+        created = client.post(
+            f"/responses/?craving_id={craving['id']}",
+            json={"message": f"Offer {i}"},
+            headers=_auth_header(responder_token),
+        )
+        assert created.status_code == 201, created.text
+
+    listed = client.get("/cravings/my-cravings", headers=_auth_header(owner_token)).json()["data"][0]
+    assert listed["response_count"] == 5
+    assert listed["pending_response_count"] == 5
+    assert listed["last_response_at"] is not None
+
+    seen = []
+    cursor = None
+    for _ in range(3):
+        params = {"responses_limit": 2}
+        if cursor:
+            params["responses_cursor"] = cursor
+        detail = client.get(f"/cravings/{craving['id']}", params=params, headers=_auth_header(owner_token))
+        assert detail.status_code == 200, detail.text
+        data = detail.json()["data"]
+        assert data["response_count"] == 5
+        assert len(data["responses"]) <= 2
+        seen.extend(r["id"] for r in data["responses"])
+        cursor = data["responses_next_cursor"]
+    assert cursor is None
+    assert len(seen) == len(set(seen)) == 5
+
+    shared = client.get(f"/public/craving/{craving['share_token']}", params={"responses_limit": 1})
+    assert shared.status_code == 200
+    assert len(shared.json()["data"]["responses"]) == 1
+    assert shared.json()["data"]["responses_next_cursor"] is not None
+
+    bad_cursor = client.get(
+        f"/cravings/{craving['id']}",
+        params={"responses_cursor": "not-a-cursor"},
+        headers=_auth_header(owner_token),
+    )
+    assert bad_cursor.status_code == 400
+
+
+def test_craving_responses_list_is_paginated_and_filterable(client: TestClient):
+    owner_token, _ = _signup(client, "pageowner", "page.owner@example.com", "+12345678931")
+    responder_token, _ = _signup(client, "pageresponder", "page.responder@example.com", "+12345678932")
+    craving = _create_craving(client, owner_token)
+
+    response_ids = []
+    for i in range(5):
+        created = client.post(
+            f"/responses/?craving_id={craving['id']}",
+            json={"message": f"Offer {i}"},
+            headers=_auth_header(responder_token),
+        )
+        response_ids.append(created.json()["data"]["id"])
+    client.put(f"/responses/{response_ids[1]}", json={"status": "rejected"}, headers=_auth_header(owner_token))
+    client.put(f"/responses/{response_ids[3]}", json={"status": "rejected"}, headers=_auth_header(owner_token))
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        page = client.get(f"/responses/craving/{craving['id']}", params=params, headers=_auth_header(owner_token))
+        assert page.status_code == 200, page.text
+        assert len(page.json()["data"]) <= 2
+        seen.extend(r["id"] for r in page.json()["data"])
+        assert page.json()["next_cursor"] == page.headers.get("X-Next-Cursor")
+        if page.json()["next_cursor"] is None:
+            break
+        params["cursor"] = page.json()["next_cursor"]
+    assert len(seen) == len(set(seen)) == 5
+    assert set(seen) == set(response_ids)
+
+    # Browser clients may read the paging header
+    cross_origin = client.get(
+        f"/responses/craving/{craving['id']}",
+        params={"limit": 2},
+        headers={**_auth_header(owner_token), "Origin": "http://localhost:3000"},
+    )
+    assert "X-Next-Cursor" in cross_origin.headers["Access-Control-Expose-Headers"]
+
+    rejected = []
+    params = {"status": "rejected", "limit": 1}
+    while True:
+        page = client.get(f"/responses/craving/{craving['id']}", params=params, headers=_auth_header(owner_token))
+        assert all(r["status"] == "rejected" for r in page.json()["data"])
+        rejected.extend(r["id"] for r in page.json()["data"])
+        if "X-Next-Cursor" not in page.headers:
+            break
+        params["cursor"] = page.headers["X-Next-Cursor"]
+    assert sorted(rejected) == sorted([response_ids[1], response_ids[3]])
+
+    bad_cursor = client.get(
+        f"/responses/craving/{craving['id']}",
+        params={"cursor": "not-a-cursor"},
+        headers=_auth_header(owner_token),
+    )
+    assert bad_cursor.status_code == 400
+
+
+def test_response_counters_follow_status_changes_and_deletes(client: TestClient):
+    owner_token, _ = _signup(client, "counterowner", "counter.owner@example.com", "+12345678913")
+    responder_token, _ = _signup(client, "counterresponder", "counter.responder@example.com", "+12345678914")
+    craving = _create_craving(client, owner_token)
+
+    def feed_counts():
+        feed = client.get("/cravings/", headers=_auth_header(owner_token)).json()["data"]
+        return next((item["response_count"], item["pending_response_count"]) for item in feed if item["id"] == craving["id"])
+
+    assert feed_counts() == (0, 0)  # Now cached
+
+    response_ids = []
+    for i in range(3):
+        created = client.post(
+            f"/responses/?craving_id={craving['id']}",
+            json={"message": f"Offer {i}"},
+            headers=_auth_header(responder_token),
+        )
+        response_ids.append(created.json()["data"]["id"])
+    # Response writes invalidate the cached feed pages
+    assert feed_counts() == (3, 3)
+
+    client.put(f"/responses/{response_ids[0]}", json={"status": "rejected"}, headers=_auth_header(owner_token))
+    assert feed_counts() == (3, 2)
+    client.delete(f"/responses/{response_ids[1]}", headers=_auth_header(responder_token))
+    assert feed_counts() == (2, 1)
+
+    data = client.get(f"/cravings/{craving['id']}", headers=_auth_header(owner_token)).json()["data"]
+    assert data["response_count"] == 2
+    assert data["pending_response_count"] == 1
+    assert len(data["responses"]) == 2
+
+
+def test_conditional_get_and_if_match(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    owner_token, _ = _signup(client, "etagowner", "etag.owner@example.com", "+12345678915")
+    headers = _auth_header(owner_token)
+    craving = _create_craving(client, owner_token)
+
+    first = client.get(f"/cravings/{craving['id']}", headers=headers)
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    repeat = client.get(f"/cravings/{craving['id']}", headers={**headers, "If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+
+    shared = client.get(f"/public/craving/{craving['share_token']}", headers={"If-None-Match": etag})
+    assert shared.status_code == 304
+
+    my_etag = client.get("/cravings/my-cravings", headers=headers).headers["etag"]
+    assert client.get("/cravings/my-cravings", headers={**headers, "If-None-Match": my_etag}).status_code == 304
+
+    notifications_etag = client.get("/notifications/", headers=headers).headers["etag"]
+    assert client.get("/notifications/", headers={**headers, "If-None-Match": notifications_etag}).status_code == 304
+
+    updated = client.put(
+        f"/cravings/{craving['id']}",
+        json={"name": "Need Kilishi"},
+        headers={**headers, "If-Match": etag},
+    )
+    assert updated.status_code == 200, updated.text
+
+    stale_update = client.put(
+        f"/cravings/{craving['id']}",
+        json={"name": "Need Chapman"},
+        headers={**headers, "If-Match": 'W/"stale"'},
+    )
+    assert stale_update.status_code == 412
+
+    # The If-Match check is repeated by the UPDATE itself: a write landing
+    # between the check and the UPDATE still ends in 412
+    current = client.get(f"/cravings/{craving['id']}", headers=headers).headers["etag"]
+    original_update = cravings_routes.crud.update_craving
+
+    def racing_update(db, *args, **kwargs):
+        from cravings.models import Craving
+        db.query(Craving).filter(Craving.id == craving["id"]).update({Craving.responses_revision: Craving.responses_revision + 1})
+        db.commit()
+        return original_update(db, *args, **kwargs)
+
+    monkeypatch.setattr(cravings_routes.crud, "update_craving", racing_update)
+    raced = client.put(f"/cravings/{craving['id']}", json={"name": "Need Chapman"}, headers={**headers, "If-Match": current})
+    assert raced.status_code == 412
+    monkeypatch.setattr(cravings_routes.crud, "update_craving", original_update)
+    assert client.get(f"/cravings/{craving['id']}", headers=headers).json()["data"]["name"] == "Need Kilishi"
+
+    # Counter changes invalidate validators even within the same timestamp tick
+    responder_token, _ = _signup(client, "etagresponder", "etag.responder@example.com", "+12345678916")
+    created = client.post(
+        f"/responses/?craving_id={craving['id']}",
+        json={"message": "On my way"},
+        headers=_auth_header(responder_token),
+    )
+    refreshed = client.get(f"/cravings/{craving['id']}", headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["data"]["name"] == "Need Kilishi"
+    assert client.get("/cravings/my-cravings", headers={**headers, "If-None-Match": my_etag}).status_code == 200
+
+    # Editing a response changes the validator without pretending a new response arrived
+    edited = client.put(
+        f"/responses/{created.json()['data']['id']}", json={"message": "Almost there"}, headers=_auth_header(responder_token)
+    )
+    assert edited.status_code == 200, edited.text
+    after_edit = client.get(f"/cravings/{craving['id']}", headers={**headers, "If-None-Match": refreshed.headers["etag"]})
+    assert after_edit.status_code == 200
+    assert after_edit.json()["data"]["last_response_at"] == refreshed.json()["data"]["last_response_at"]
+
+    # Accepting/rejecting keeps updated_at but still changes the list validator
+    listed_etag = client.get("/cravings/my-cravings", headers=headers).headers["etag"]
+    rejected = client.put(f"/responses/{created.json()['data']['id']}", json={"status": "rejected"}, headers=headers)
+    assert rejected.status_code == 200, rejected.text
+    relisted = client.get("/cravings/my-cravings", headers={**headers, "If-None-Match": listed_etag})
+    assert relisted.status_code == 200
+    assert relisted.json()["data"][0]["pending_response_count"] == 0
+
+
+def test_reference_bundle_is_content_addressed(client: TestClient):
+    bundle = client.get("/reference")
+    assert bundle.status_code == 200
+    assert bundle.headers["cache-control"] == "no-cache"
+    data = bundle.json()["data"]
+    assert {"id": "beauty_health", "name": "Beauty Health"} in data["craving_categories"]
+    assert data["service_categories"][0]["name"] == "Food"
+    assert {"id": "pending", "name": "Pending"} in data["response_statuses"]
+    assert {"id": "out_of_stock", "name": "Out Of Stock"} in data["availability_statuses"]
+    assert {"id": "craving_response", "name": "Craving Response"} in data["notification_types"]
+
+    versioned = client.get(data["url"])
+    assert versioned.status_code == 200
+    assert versioned.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert versioned.content == bundle.content
+
+    assert client.get(data["url"], headers={"If-None-Match": versioned.headers["etag"]}).status_code == 304
+
+    outdated = client.get("/reference/0000000000000000", follow_redirects=False)
+    assert outdated.status_code == 307
+    assert outdated.headers["location"] == data["url"]
+
+
+def test_archived_cravings_remain_readable(client: TestClient):
+    import csv
+    import io
+    import json
+    from datetime import timedelta
+    from archive import crud as archive_crud
+
+    owner_token, _ = _signup(client, "archiveowner", "archive.owner@example.com", "+12345678917")
+    responder_token, _ = _signup(client, "archiveresponder", "archive.responder@example.com", "+12345678918")
+    headers = _auth_header(owner_token)
+    closed = _create_craving(client, owner_token, name="Old craving")
+    still_open = _create_craving(client, owner_token, name="Fresh craving")
+    client.post(
+        f"/responses/?craving_id={closed['id']}",
+        json={"message": "Delivered yesterday"},
+        headers=_auth_header(responder_token),
+    )
+    client.put(f"/cravings/{closed['id']}", json={"status": "fulfilled"}, headers=headers)
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        moved = archive_crud.archive_closed_cravings_batch(db, datetime.utcnow() + timedelta(days=1))
+    finally:
+        db.close()
+    assert moved == 1
+
+    my_cravings = client.get("/cravings/my-cravings", headers=headers).json()["data"]
+    assert [c["id"] for c in my_cravings] == [still_open["id"]]
+
+    archived = client.get(f"/cravings/{closed['id']}", headers=headers)
+    assert archived.status_code == 200, archived.text
+    data = archived.json()["data"]
+    assert data["status"] == "fulfilled"
+    assert data["name"] == "Old craving"
+    assert [r["message"] for r in data["responses"]] == ["Delivered yesterday"]
+    assert "etag" in archived.headers
+
+    shared = client.get(f"/public/craving/{closed['share_token']}")
+    assert shared.status_code == 200
+    assert shared.json()["data"]["response_count"] == 1
+
+    # Exports still cover everything a user has, archived rows included
+    exported = client.get("/cravings/export", headers=headers)
+    assert [row["id"] for row in map(json.loads, exported.text.splitlines())] == [closed["id"], still_open["id"]]
+    responses_export = client.get("/responses/export?format=csv", headers=_auth_header(responder_token))
+    assert ["Delivered yesterday"] == [row["message"] for row in csv.DictReader(io.StringIO(responses_export.text))]
+    notifications_export = [json.loads(line) for line in client.get("/notifications/export", headers=headers).text.splitlines()]
+    assert [(n["craving_id"], n["count"]) for n in notifications_export] == [(closed["id"], 1)]
+    # my-responses lists live responses only
+    assert client.get("/responses/my-responses", headers=_auth_header(responder_token)).json()["data"] == []
+
+
+def test_trending_ranks_by_responses_and_share_views(client: TestClient):
+    owner_token, _ = _signup(client, "trendowner", "trend.owner@example.com", "+12345678919")
+    responder_token, _ = _signup(client, "trendresponder", "trend.responder@example.com", "+12345678920")
+    headers = _auth_header(owner_token)
+    quiet = _create_craving(client, owner_token, name="Quiet craving")
+    viewed = _create_craving(client, owner_token, name="Viewed craving")
+    busy = _create_craving(client, owner_token, name="Busy craving")
+
+    for i in range(2):
+        client.post(
+            f"/responses/?craving_id={busy['id']}",
+            json={"message": f"Offer {i}"},
+            headers=_auth_header(responder_token),
+        )
+    client.get(f"/public/craving/{viewed['share_token']}")
+    # The view is buffered off the request path until the flusher writes it back
+    from cravings.models import Craving
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        assert db.get(Craving, viewed["id"]).trending_rank is None
+    finally:
+        db.close()
+    assert trending_tracker.flush_pending() == 1
+
+    trending = client.get("/cravings/trending", headers=headers)
+    assert trending.status_code == 200, trending.text
+    data = trending.json()["data"]
+    assert [c["id"] for c in data] == [busy["id"], viewed["id"]]
+    assert data[0]["trending_score"] > data[1]["trending_score"] > 0
+    assert quiet["id"] not in [c["id"] for c in data]
+
+    # Ranks survive a reload from the database, including buffered views
+    trending_tracker.clear()
+    trending_tracker.refresh(force=True)
+    reloaded = client.get("/cravings/trending?limit=1", headers=headers).json()["data"]
+    assert [c["id"] for c in reloaded] == [busy["id"]]
+
+    client.put(f"/cravings/{busy['id']}", json={"status": "fulfilled"}, headers=headers)
+    after_close = client.get("/cravings/trending", headers=headers).json()["data"]
+    assert [c["id"] for c in after_close] == [viewed["id"]]
+
+
+def test_streaming_exports(client: TestClient):
+    import csv
+    import io
+    import json
+
+    owner_token, _ = _signup(client, "exportowner", "export.owner@example.com", "+12345678921")
+    responder_token, _ = _signup(client, "exportresponder", "export.responder@example.com", "+12345678922")
+    headers = _auth_header(owner_token)
+    first = _create_craving(client, owner_token, name="=Export one")
+    second = _create_craving(client, owner_token, name="Export two")
+    client.post(
+        f"/responses/?craving_id={first['id']}",
+        json={"message": "I can bring it"},
+        headers=_auth_header(responder_token),
+    )
+
+    ndjson = client.get("/cravings/export", headers=headers)
+    assert ndjson.status_code == 200, ndjson.text
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    assert "attachment" in ndjson.headers["content-disposition"]
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert {row["id"] for row in rows} == {first["id"], second["id"]}
+    assert next(row for row in rows if row["id"] == first["id"])["response_count"] == 1
+
+    exported_csv = client.get("/cravings/export?format=csv", headers=headers)
+    assert exported_csv.headers["content-type"].startswith("text/csv")
+    records = list(csv.DictReader(io.StringIO(exported_csv.text)))
+    assert len(records) == 2
+    # Formula-looking cells are neutralised for spreadsheet apps
+    assert "'=Export one" in {record["name"] for record in records}
+
+    responses = client.get("/responses/export", headers=_auth_header(responder_token))
+    assert [json.loads(line)["message"] for line in responses.text.splitlines()] == ["I can bring it"]
+
+    notifications = client.get("/notifications/export?format=csv", headers=headers)
+    assert notifications.status_code == 200
+    assert len(list(csv.DictReader(io.StringIO(notifications.text)))) == 1
+
+    assert client.get("/cravings/export?format=xml", headers=headers).status_code == 422
+
+
+def test_owned_mutations_are_single_statement(client: TestClient):
+    from sqlalchemy import event
+
+    owner_token, _ = _signup(client, "mutateowner", "mutate.owner@example.com", "+12345678923")
+    other_token, _ = _signup(client, "mutateother", "mutate.other@example.com", "+12345678924")
+    craving = _create_craving(client, owner_token)
+    response_id = client.post(
+        f"/responses/?craving_id={craving['id']}",
+        json={"message": "Offer"},
+        headers=_auth_header(other_token),
+    ).json()["data"]["id"]
+
+    db = next(app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    db.close()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.strip())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        updated = client.put(
+            f"/cravings/{craving['id']}",
+            json={"status": "fulfilled"},
+            headers=_auth_header(owner_token),
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["data"]["status"] == "fulfilled"
+    assert updated.json()["data"]["fulfilled_at"] is not None
+    craving_statements = [s for s in statements if "cravings" in s]
+    assert len(craving_statements) == 1
+    assert craving_statements[0].upper().startswith("UPDATE") and "RETURNING" in craving_statements[0].upper()
+
+    # Not found and forbidden are only told apart on the failure path
+    assert client.put("/cravings/missing", json={"notes": "x"}, headers=_auth_header(owner_token)).status_code == 404
+    assert client.put(
+        f"/cravings/{craving['id']}", json={"notes": "x"}, headers=_auth_header(other_token)
+    ).status_code == 403
+    assert client.delete(f"/responses/{response_id}", headers=_auth_header(owner_token)).status_code == 403
+    assert client.put(
+        f"/responses/{response_id}", json={"status": "accepted"}, headers=_auth_header(other_token)
+    ).status_code == 403
+    # An empty update still checks who is asking
+    third_token, _ = _signup(client, "mutatethird", "mutate.third@example.com", "+12345678951")
+    assert client.put(f"/responses/{response_id}", json={}, headers=_auth_header(third_token)).status_code == 403
+    unchanged = client.put(f"/responses/{response_id}", json={}, headers=_auth_header(other_token))
+    assert unchanged.status_code == 200
+    assert unchanged.json()["data"]["message"] == "Offer"
+    assert client.put("/responses/missing", json={}, headers=_auth_header(other_token)).status_code == 404
+
+    accepted = client.put(
+        f"/responses/{response_id}", json={"status": "accepted"}, headers=_auth_header(owner_token)
+    )
+    assert accepted.status_code == 200
+    assert accepted.json()["data"]["status"] == "accepted"
+    detail = client.get(f"/cravings/{craving['id']}", headers=_auth_header(owner_token)).json()["data"]
+    assert (detail["response_count"], detail["pending_response_count"]) == (1, 0)
+
+    assert client.delete(f"/responses/{response_id}", headers=_auth_header(other_token)).status_code == 200
+    assert client.delete(f"/responses/{response_id}", headers=_auth_header(other_token)).status_code == 404
+    assert client.delete(f"/cravings/{craving['id']}", headers=_auth_header(other_token)).status_code == 403
+    assert client.delete(f"/cravings/{craving['id']}", headers=_auth_header(owner_token)).status_code == 200
+    assert client.get(f"/cravings/{craving['id']}", headers=_auth_header(owner_token)).status_code == 404
+
+
+def test_deletes_cascade_in_the_database(client: TestClient):
+    from sqlalchemy.exc import IntegrityError
+    from account_deletion import crud as deletion_crud
+    from authentication.models import User
+    from cravings.models import Craving
+    from notifications.models import Notification
+    from responses.models import Response as ResponseModel
+
+    owner_token, owner_id = _signup(client, "cascadeowner", "cascade.owner@example.com", "+12345678925")
+    responder_token, responder_id = _signup(client, "cascaderesp", "cascade.resp@example.com", "+12345678926")
+    doomed = _create_craving(client, owner_token, name="Doomed")
+    kept = _create_craving(client, owner_token, name="Kept")
+    for craving in (doomed, kept):
+        client.post(
+            f"/responses/?craving_id={craving['id']}",
+            json={"message": "Offer"},
+            headers=_auth_header(responder_token),
+        )
+
+    assert client.delete(f"/cravings/{doomed['id']}", headers=_auth_header(owner_token)).status_code == 200
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        assert db.query(ResponseModel).filter(ResponseModel.craving_id == doomed["id"]).count() == 0
+        assert db.query(Notification).filter(Notification.craving_id == doomed["id"]).count() == 0
+        assert db.query(Notification).filter(Notification.user_id == owner_id).count() == 1
+
+        # Responses don't follow a deleted user in the database (their cravings'
+        # counters would go stale); the account deletion job removes them first
+        with pytest.raises(IntegrityError):
+            db.query(User).filter(User.id == responder_id).delete(synchronize_session=False)
+            db.commit()
+        db.rollback()
+        deletion_crud.request_account_deletion(db, db.get(User, responder_id))
+        deletion_crud.process_account_deletion(db, responder_id, pause=0)
+        assert db.get(User, responder_id) is None
+        assert db.query(ResponseModel).count() == 0
+        assert db.query(Notification).filter(Notification.response_id.isnot(None)).count() == 0
+        assert db.get(Craving, kept["id"]).response_count == 0
+    finally:
+        db.close()
+
+
+def test_account_deletion_runs_in_resumable_batches(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    from datetime import timedelta
+    from account_deletion import crud as deletion_crud
+    from account_deletion.models import AccountDeletion
+    from archive import crud as archive_crud
+    from archive.models import ArchivedCraving
+    from authentication.models import User
+    from responses.models import Response as ResponseModel
+
+    monkeypatch.setattr(deletion_crud, "ACCOUNT_DELETION_PAUSE_SECONDS", 0)
+    leaving_token, leaving_id = _signup(client, "leaving", "leaving@example.com", "+12345678927")
+    staying_token, _ = _signup(client, "staying", "staying@example.com", "+12345678928")
+    staying_craving = _create_craving(client, staying_token, name="Staying craving")
+    client.post(
+        f"/responses/?craving_id={staying_craving['id']}",
+        json={"message": "From the leaving user"},
+        headers=_auth_header(leaving_token),
+    )
+    old = _create_craving(client, leaving_token, name="Old")
+    leaving_ids = [_create_craving(client, leaving_token, name=f"Craving {i}")["id"] for i in range(3)]
+    client.put(f"/cravings/{old['id']}", json={"status": "fulfilled"}, headers=_auth_header(leaving_token))
+    for craving_id in leaving_ids + [staying_craving["id"]]:
+        trending_tracker.observe(craving_id, 1.0)
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        archive_crud.archive_closed_cravings_batch(db, datetime.utcnow() + timedelta(days=1))
+        # Simulate a crash: request deletion, then run only part of the job
+        user = db.get(User, leaving_id)
+        deletion_crud.request_account_deletion(db, user)
+        progress = []
+        original_sleep = deletion_crud.time.sleep
+
+        def crash_after_two_batches(_seconds):
+            if len(progress) >= 2:
+                raise RuntimeError("worker died")
+            original_sleep(0)
+
+        monkeypatch.setattr(deletion_crud.time, "sleep", crash_after_two_batches)
+        with pytest.raises(RuntimeError):
+            deletion_crud.process_account_deletion(
+                db, leaving_id, batch_size=2, pause=0,
+                report=lambda job, stage, deleted: progress.append((stage, deleted)),
+            )
+        db.rollback()
+        job = db.get(AccountDeletion, leaving_id)
+        assert job.status == deletion_crud.PENDING and job.rows_deleted > 0
+    finally:
+        db.close()
+
+    # Disabled immediately: the token no longer works
+    assert client.get("/auth/users/me", headers=_auth_header(leaving_token)).status_code in (400, 401, 403)
+
+    monkeypatch.setattr(deletion_crud.time, "sleep", lambda _seconds: None)
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        stale_before = craving_price_stats._stale_writes
+        job = deletion_crud.process_account_deletion(db, leaving_id, batch_size=2)
+        assert job.status == deletion_crud.COMPLETED
+        # Deleted cravings leave trending and count towards the next price stats rebuild
+        assert [craving_id for craving_id, _ in trending_tracker.top(10)] == [staying_craving["id"]]
+        assert craving_price_stats._stale_writes >= stale_before + len(leaving_ids)
+        assert db.get(User, leaving_id) is None
+        assert db.query(ArchivedCraving).filter(ArchivedCraving.user_id == leaving_id).count() == 0
+        assert db.query(ResponseModel).filter(ResponseModel.user_id == leaving_id).count() == 0
+    finally:
+        db.close()
+
+    counts = client.get(f"/cravings/{staying_craving['id']}", headers=_auth_header(staying_token)).json()["data"]
+    assert (counts["response_count"], counts["pending_response_count"]) == (0, 0)
+
+
+def test_delete_account_endpoint(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    from account_deletion import crud as deletion_crud
+    from authentication.models import User
+
+    monkeypatch.setattr(deletion_crud.time, "sleep", lambda _seconds: None)
+    token, user_id = _signup(client, "quitter", "quitter@example.com", "+12345678929")
+    _create_craving(client, token)
+
+    deleted = client.delete("/auth/users/me", headers=_auth_header(token))
+    assert deleted.status_code == 202, deleted.text
+    assert deleted.json()["data"]["status"] == "pending"
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        # TestClient runs background tasks before returning
+        assert db.get(User, user_id) is None
+    finally:
+        db.close()
+
+
+def test_price_stats_by_category(client: TestClient):
+    token, _ = _signup(client, "priceowner", "price.owner@example.com", "+12345678930")
+    headers = _auth_header(token)
+    for price in (1000, 2000, 3000):
+        client.post("/cravings/", json={"name": "Jollof", "category": "food", "price_estimate": price}, headers=headers)
+
+    stats = client.get("/cravings/price-stats?category=food", headers=headers)
+    assert stats.status_code == 200, stats.text
+    data = stats.json()["data"]
+    assert data["category"] == "food"
+    assert (data["count"], data["mean"], data["min"], data["max"]) == (3, 2000.0, 1000.0, 3000.0)
+    assert data["p50"] == 2000.0
+
+    # Served from memory once built; new cravings are folded in incrementally
+    client.post("/cravings/", json={"name": "Suya", "category": "food", "price_estimate": 6000}, headers=headers)
+    assert client.get("/cravings/price-stats?category=food", headers=headers).json()["data"]["count"] == 4
+    assert client.get("/cravings/price-stats?category=drinks", headers=headers).json()["data"]["count"] == 0
+    assert client.get("/cravings/price-stats?category=nope", headers=headers).status_code == 422
+
+
+def test_idempotency_key_replays_creates(client: TestClient):
+    owner_token, _ = _signup(client, "idemowner", "idem.owner@example.com", "+12345678933")
+    responder_token, _ = _signup(client, "idemresponder", "idem.responder@example.com", "+12345678934")
+    owner = _auth_header(owner_token)
+
+    craving_body = {"name": "Retry tacos", "category": "food", "price_estimate": 1500}
+    first = client.post("/cravings/", json=craving_body, headers={**owner, "Idempotency-Key": "craving-1"})
+    retry = client.post("/cravings/", json=craving_body, headers={**owner, "Idempotency-Key": "craving-1"})
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get("/cravings/my-cravings", headers=owner).json()["data"]) == 1
+    craving = first.json()["data"]
+
+    reused = client.post(
+        "/cravings/",
+        json={**craving_body, "name": "Something else"},
+        headers={**owner, "Idempotency-Key": "craving-1"},
+    )
+    assert reused.status_code == 422
+
+    responder = {**_auth_header(responder_token), "Idempotency-Key": "response-1"}
+    first = client.post(f"/responses/?craving_id={craving['id']}", json={"message": "On my way"}, headers=responder)
+    # Replays also survive losing the in-process cache (served from the table)
+    idempotency_store.clear()
+    retry = client.post(f"/responses/?craving_id={craving['id']}", json={"message": "On my way"}, headers=responder)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+
+    anonymous = {"message": "Anon offer", "is_anonymous": True, "anonymous_name": "Sam"}
+    # Replays keep the original status
+    for attempt in range(2):
+        shared = client.post(
+            f"/public/craving/{craving['share_token']}/respond",
+            json=anonymous,
+            headers={"Idempotency-Key": "anon-1"},
+        )
+        assert shared.status_code == 200, shared.text
+        assert ("Idempotent-Replayed" in shared.headers) == (attempt > 0)
+
+    detail = client.get(f"/cravings/{craving['id']}", headers=owner).json()["data"]
+    assert detail["response_count"] == 2
+    notifications = client.get("/notifications/", headers=owner).json()["data"]
+    assert [n["count"] for n in notifications] == [2]
+
+    # Failed requests are not stored, so the key can be retried
+    missing = client.post("/responses/?craving_id=nope", json={"message": "Hi"}, headers={**responder, "Idempotency-Key": "response-2"})
+    assert missing.status_code == 404
+    created = client.post(f"/responses/?craving_id={craving['id']}", json={"message": "Hi"}, headers={**responder, "Idempotency-Key": "response-2"})
+    assert created.status_code == 201, created.text
+
+
+def test_idempotency_key_is_settled_with_the_write(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    owner_token, _ = _signup(client, "settleowner", "settle.owner@example.com", "+12345678943")
+    responder_token, _ = _signup(client, "settleresponder", "settle.responder@example.com", "+12345678944")
+    craving = _create_craving(client, owner_token)
+    responder = {**_auth_header(responder_token), "Idempotency-Key": "settle-1"}
+
+    def fail_after_commit(*_args):
+        raise HTTPException(status_code=503, detail="Trending is unavailable")
+
+    # create_response commits and then updates the trending tracker
+    monkeypatch.setattr(trending_tracker, "observe", fail_after_commit)
+    url = f"/responses/?craving_id={craving['id']}"
+    first = client.post(url, json={"message": "Once"}, headers=responder)
+    assert first.status_code == 503
+
+    # The response exists, so retries replay the error instead of writing again
+    idempotency_store.clear()
+    retry = client.post(url, json={"message": "Once"}, headers=responder)
+    assert retry.status_code == 503
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    detail = client.get(f"/cravings/{craving['id']}", headers=_auth_header(owner_token)).json()["data"]
+    assert detail["response_count"] == 1
+
+
+def test_public_respond_is_rate_limited_before_db_work(client: TestClient):
+    owner_token, _ = _signup(client, "limitowner", "limit.owner@example.com", "+12345678935")
+    craving = _create_craving(client, owner_token)
+    url = f"/public/craving/{craving['share_token']}/respond"
+
+    for i in range(5):
+        accepted = client.post(url, json={"message": f"Offer {i}", "is_anonymous": True})
+        assert accepted.status_code == 200, accepted.text
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = next(app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    db.close()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        throttled = client.post(url, json={"message": "One too many", "is_anonymous": True})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert throttled.status_code == 429
+    assert int(throttled.headers["Retry-After"]) >= 1
+    assert statements == []
+
+    detail = client.get(f"/cravings/{craving['id']}", headers=_auth_header(owner_token)).json()["data"]
+    assert detail["response_count"] == 5
+
+
+def test_accept_response_rejects_the_rest_in_one_transaction(client: TestClient):
+    owner_token, _ = _signup(client, "acceptowner", "accept.owner@example.com", "+12345678936")
+    responder_token, _ = _signup(client, "acceptresponder", "accept.responder@example.com", "+12345678937")
+    owner, responder = _auth_header(owner_token), _auth_header(responder_token)
+    craving = _create_craving(client, owner_token)
+
+    response_ids = [
+        client.post(f"/responses/?craving_id={craving['id']}", json={"message": f"Offer {i}"}, headers=responder).json()["data"]["id"]
+        for i in range(3)
+    ]
+    anonymous_id = client.post(
+        f"/public/craving/{craving['share_token']}/respond", json={"message": "Anon offer", "is_anonymous": True}
+    ).json()["data"]["id"]
+
+    forbidden = client.post(f"/cravings/{craving['id']}/accept/{response_ids[0]}", headers=responder)
+    assert forbidden.status_code == 403
+
+    accepted = client.post(f"/cravings/{craving['id']}/accept/{response_ids[1]}", headers=owner)
+    assert accepted.status_code == 200, accepted.text
+    data = accepted.json()["data"]
+    assert data["craving"]["status"] == "in_progress"
+    assert data["craving"]["pending_response_count"] == 0
+    assert data["accepted_response"]["id"] == response_ids[1]
+    assert data["accepted_response"]["status"] == "accepted"
+    assert data["rejected_count"] == 3
+
+    statuses = {
+        r["id"]: r["status"]
+        for r in client.get(f"/responses/craving/{craving['id']}", headers=owner).json()["data"]
+    }
+    assert statuses == {
+        response_ids[0]: "rejected",
+        response_ids[1]: "accepted",
+        response_ids[2]: "rejected",
+        anonymous_id: "rejected",
+    }
+
+    notifications = client.get("/notifications/", headers=responder).json()["data"]
+    assert sorted(n["notification_type"] for n in notifications) == [
+        "response_accepted", "response_rejected", "response_rejected",
+    ]
+
+    again = client.post(f"/cravings/{craving['id']}/accept/{response_ids[0]}", headers=owner)
+    assert again.status_code == 400
+
+
+def test_my_responses_expand_craving_in_one_query(client: TestClient):
+    owner_token, _ = _signup(client, "inboxowner", "inbox.owner@example.com", "+12345678938")
+    vendor_token, vendor_id = _signup(client, "inboxvendor", "inbox.vendor@example.com", "+12345678939")
+    vendor = _auth_header(vendor_token)
+    cravings = [_create_craving(client, owner_token, name=f"Craving {i}") for i in range(3)]
+    response_ids = [
+        client.post(f"/responses/?craving_id={craving['id']}", json={"message": "Offer"}, headers=vendor).json()["data"]["id"]
+        for craving in cravings
+    ]
+    client.put(f"/responses/{response_ids[0]}", json={"status": "rejected"}, headers=_auth_header(owner_token))
+
+    plain = client.get("/responses/my-responses", headers=vendor)
+    assert plain.status_code == 200, plain.text
+    assert len(plain.json()["data"]) == 3
+    assert "craving" not in plain.json()["data"][0]
+    # Deprecated offset paging keeps working on its own, but not together with a cursor
+    all_ids = [r["id"] for r in plain.json()["data"]]
+    offset_page = client.get("/responses/my-responses?skip=1&limit=1", headers=vendor)
+    assert offset_page.status_code == 200, offset_page.text
+    assert [r["id"] for r in offset_page.json()["data"]] == all_ids[1:2]
+    cursor = offset_page.json()["next_cursor"]
+    assert [r["id"] for r in client.get(f"/responses/my-responses?cursor={cursor}", headers=vendor).json()["data"]] == all_ids[2:]
+    assert client.get(f"/responses/my-responses?skip=1&cursor={cursor}", headers=vendor).status_code == 400
+
+    db = next(app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    db.close()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "responses" in statement:
+            statements.append(statement)
+
+    seen = []
+    params = {"expand": "craving", "limit": 2}
+    while True:
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            page = client.get("/responses/my-responses", params=params, headers=vendor)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert page.status_code == 200, page.text
+        for row in page.json()["data"]:
+            assert row["user_id"] == vendor_id
+            assert row["craving"]["owner"]["username"] == "inboxowner"
+            assert row["craving"]["status"] == "open"
+            seen.append((row["id"], row["craving"]["name"]))
+        assert page.json()["next_cursor"] == page.headers.get("X-Next-Cursor")
+        if page.json()["next_cursor"] is None:
+            break
+        params["cursor"] = page.json()["next_cursor"]
+    # One SELECT over responses per page, no per-row craving loads
+    assert len(statements) == 2
+    assert sorted(seen) == sorted(zip(response_ids, [c["name"] for c in cravings]))
+
+    rejected = client.get(
+        "/responses/my-responses", params={"status": "rejected", "expand": "craving"}, headers=vendor
+    ).json()["data"]
+    assert [r["id"] for r in rejected] == [response_ids[0]]
+    assert rejected[0]["craving"]["name"] == cravings[0]["name"]
+
+
+def test_notification_stream_pushes_and_resumes(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    from notifications.broker import notification_broker
+
+    owner_token, _ = _signup(client, "streamowner", "stream.owner@example.com", "+12345678940")
+    craving = _create_craving(client, owner_token)
+
+    def respond(message):
+        created = client.post(
+            f"/public/craving/{craving['share_token']}/respond", json={"message": message, "is_anonymous": True}
+        )
+        assert created.status_code == 200, created.text
+        return created.json()["data"]["id"]
+
+    with pytest.raises(Exception):
+        with client.websocket_connect("/notifications/stream?token=not-a-token") as ws:
+            ws.receive_json()
+
+    monkeypatch.setattr(notification_broker, "heartbeat", 0.05)
+    with client.websocket_connect(f"/notifications/stream?token={owner_token}") as ws:
+        assert ws.receive_json() == {"event": "ready", "id": None, "data": {"unread_count": 0}}
+        response_id = respond("First")
+        message = ws.receive_json()
+        while message["event"] == "ping":
+            message = ws.receive_json()
+        assert message["event"] == "notification"
+        assert message["data"]["response_id"] == response_id
+        assert message["data"]["is_read"] is False
+        last_event_id = message["id"]
+
+    # Missed while disconnected: folded into the same notification, which is
+    # replayed on reconnect with its new position
+    missed = [respond("Second"), respond("Third")]
+    # SQLite timestamps have one-second resolution; make the coalesced update clearly newer than the cursor
+    from datetime import timedelta
+    from notifications.models import Notification
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        notification = db.query(Notification).filter(Notification.id == message["data"]["id"]).one()
+        _move_notification(db, notification.id, notification.created_at + timedelta(seconds=10))
+        db.commit()
+    finally:
+        db.close()
+    with client.websocket_connect(f"/notifications/stream?token={owner_token}&last_event_id={last_event_id}") as ws:
+        assert ws.receive_json()["data"] == {"unread_count": 1}
+        replayed = ws.receive_json()
+        while replayed["event"] == "ping":
+            replayed = ws.receive_json()
+        assert replayed["event"] == "notification"
+        assert replayed["id"] != last_event_id
+        assert replayed["data"]["id"] == message["data"]["id"]
+        assert replayed["data"]["count"] == 3
+        assert replayed["data"]["response_id"] == missed[-1]
+
+
+
+def test_unread_counter_follows_reads_deletes_and_cascades(client: TestClient):
+    owner_token, owner_id = _signup(client, "unreadowner", "unread.owner@example.com", "+12345678941")
+    responder_token, responder_id = _signup(client, "unreadresponder", "unread.responder@example.com", "+12345678942")
+    owner, responder = _auth_header(owner_token), _auth_header(responder_token)
+    # One craving per response: responses to the same craving share a notification
+    cravings = [_create_craving(client, owner_token) for _ in range(4)]
+
+    def unread(headers):
+        return client.get("/notifications/unread-count", headers=headers).json()["data"]["unread_count"]
+
+    response_ids = [
+        client.post(
+            f"/responses/?craving_id={craving['id']}", json={"message": f"Offer {i}"}, headers=responder
+        ).json()["data"]["id"]
+        for i, craving in enumerate(cravings)
+    ]
+    assert unread(owner) == 4
+
+    notification_ids = [n["id"] for n in client.get("/notifications/", headers=owner).json()["data"]]
+    client.post("/notifications/mark-read", json={"notification_ids": notification_ids[:1]}, headers=owner)
+    client.post("/notifications/mark-read", json={"notification_ids": notification_ids[:2]}, headers=owner)
+    assert unread(owner) == 2
+    client.delete(f"/notifications/{notification_ids[2]}", headers=owner)
+    client.delete(f"/notifications/{notification_ids[0]}", headers=owner)  # Already read
+    assert unread(owner) == 1
+    client.post("/notifications/mark-all-read", headers=owner)
+    assert unread(owner) == 0
+
+    accepted = client.post(f"/cravings/{cravings[0]['id']}/accept/{response_ids[0]}", headers=owner)
+    assert accepted.status_code == 200, accepted.text
+    assert unread(responder) == 1
+    # Deleting the craving cascades to the responder's notification about it
+    assert client.delete(f"/cravings/{cravings[0]['id']}", headers=owner).status_code == 200
+    assert unread(responder) == 0
+
+    from notifications import crud as notifications_crud
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        assert notifications_crud.recompute_unread_counts(db, [owner_id, responder_id]) == 2
+        assert notifications_crud.get_unread_count(db, owner_id) == 0
+        assert notifications_crud.get_unread_count(db, responder_id) == 0
+    finally:
+        db.close()
+
+
+def test_mark_all_read_moves_the_read_watermark(client: TestClient):
+    import json
+
+    owner_token, _ = _signup(client, "watermarkowner", "watermark.owner@example.com", "+12345678943")
+    responder_token, _ = _signup(client, "watermarkresponder", "watermark.responder@example.com", "+12345678944")
+    owner = _auth_header(owner_token)
+    craving = _create_craving(client, owner_token)
+
+    def respond():
+        client.post(
+            f"/responses/?craving_id={craving['id']}", json={"message": "Offer"}, headers=_auth_header(responder_token)
+        )
+
+    for _ in range(3):
+        respond()
+    etag = client.get("/notifications/", headers=owner).headers["etag"]
+
+    marked = client.post("/notifications/mark-all-read", headers=owner).json()["data"]
+    assert marked == {"marked_read": 1}  # The three responses share one notification
+    assert client.post("/notifications/mark-all-read", headers=owner).json()["data"] == {"marked_read": 0}
+    listed = client.get("/notifications/", headers={**owner, "If-None-Match": etag})
+    assert listed.status_code == 200
+    assert all(n["is_read"] for n in listed.json()["data"])
+    assert all(n["read_at"] is None for n in listed.json()["data"])
+    assert client.get("/notifications/?unread_only=true", headers=owner).json()["data"] == []
+
+    # Already covered by the watermark: marking it again changes nothing, and new
+    # responses start a new notification instead of folding into a read one
+    first_id = listed.json()["data"][0]["id"]
+    marked = client.post("/notifications/mark-read", json={"notification_ids": [first_id]}, headers=owner)
+    assert marked.json()["data"] == {"marked_read": 0}
+
+    respond()
+    # SQLite timestamps have one-second resolution; make the new one clearly newer than the watermark
+    from datetime import timedelta
+    from notifications.models import Notification
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        newest = db.query(Notification).filter(Notification.id.notin_([n["id"] for n in listed.json()["data"]])).one()
+        newest_id = newest.id
+        _move_notification(db, newest_id, newest.created_at + timedelta(seconds=10))
+        db.commit()
+    finally:
+        db.close()
+    assert client.get("/notifications/unread-count", headers=owner).json()["data"]["unread_count"] == 1
+    unread = client.get("/notifications/?unread_only=true", headers=owner).json()["data"]
+    assert [(n["id"], n["is_read"]) for n in unread] == [(newest_id, False)]
+
+    exported = client.get("/notifications/export", headers=owner)
+    assert [json.loads(line)["is_read"] for line in exported.text.splitlines()] == [True, False]
+
+
+def test_craving_response_notifications_coalesce(client: TestClient):
+    owner_token, _ = _signup(client, "coalesceowner", "coalesce.owner@example.com", "+12345678947")
+    responder_token, _ = _signup(client, "coalesceresponder", "coalesce.responder@example.com", "+12345678948")
+    owner, responder = _auth_header(owner_token), _auth_header(responder_token)
+    craving, other = _create_craving(client, owner_token), _create_craving(client, owner_token)
+
+    def respond(name, target=craving):
+        created = client.post(
+            f"/responses/?craving_id={target['id']}",
+            json={"message": "Offer", "is_anonymous": True, "anonymous_name": name},
+            headers=responder,
+        )
+        assert created.status_code == 201, created.text
+        return created.json()["data"]["id"]
+
+    names = [f"Vendor{i}" for i in range(7)]
+    response_ids = [respond(name) for name in names[:6]]
+    etag = client.get("/notifications/", headers=owner).headers["etag"]
+    response_ids.append(respond(names[6]))
+    respond("Elsewhere", other)
+
+    listed = client.get("/notifications/", headers={**owner, "If-None-Match": etag})
+    assert listed.status_code == 200
+    by_craving = {n["craving_id"]: n for n in listed.json()["data"]}
+    assert len(listed.json()["data"]) == 2
+    coalesced = by_craving[craving["id"]]
+    assert coalesced["count"] == 7
+    assert coalesced["message"] == "Vendor6 and 6 others responded to your craving!"
+    assert coalesced["recent_actors"] == names[::-1][:5]
+    assert coalesced["response_id"] == response_ids[-1]
+    assert by_craving[other["id"]]["count"] == 1
+    assert by_craving[other["id"]]["message"] == "Elsewhere responded to your craving!"
+    assert client.get("/notifications/unread-count", headers=owner).json()["data"]["unread_count"] == 2
+
+    # Once read, the next response starts a new notification
+    client.post("/notifications/mark-read", json={"notification_ids": [coalesced["id"]]}, headers=owner)
+    respond("Latecomer")
+    fresh = [
+        n for n in client.get("/notifications/?unread_only=true", headers=owner).json()["data"]
+        if n["craving_id"] == craving["id"]
+    ]
+    assert [(n["count"], n["recent_actors"]) for n in fresh] == [(1, ["Latecomer"])]
+    assert fresh[0]["id"] != coalesced["id"]
+
+
+def test_response_and_its_notification_commit_together_via_outbox(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    from sqlalchemy.orm import Session
+    from notifications.models import NotificationOutbox
+
+    owner_token, _ = _signup(client, "outboxowner", "outbox.owner@example.com", "+12345678945")
+    responder_token, _ = _signup(client, "outboxresponder", "outbox.responder@example.com", "+12345678946")
+    owner = _auth_header(owner_token)
+    craving = _create_craving(client, owner_token)
+
+    # Simulate the process dying before the background delivery runs
+    worker = notifications_outbox.outbox_worker
+    monkeypatch.setattr(worker, "drain", lambda: 0)
+    commits = []
+    record_commit = lambda session: commits.append(session)  # noqa: E731
+    event.listen(Session, "after_commit", record_commit)
+    try:
+        created = client.post(
+            f"/responses/?craving_id={craving['id']}", json={"message": "Offer"}, headers=_auth_header(responder_token)
+        )
+    finally:
+        event.remove(Session, "after_commit", record_commit)
+    assert created.status_code == 201, created.text
+    assert len(commits) == 1
+
+    assert client.get("/notifications/unread-count", headers=owner).json()["data"]["unread_count"] == 0
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        assert db.query(NotificationOutbox).count() == 1
+    finally:
+        db.close()
+
+    # The poller (or drain_notification_outbox.py) delivers it later
+    monkeypatch.delattr(worker, "drain")
+    assert worker.drain() == 1
+    assert worker.drain() == 0
+    listed = client.get("/notifications/", headers=owner).json()["data"]
+    assert [n["response_id"] for n in listed] == [created.json()["data"]["id"]]
+    assert client.get("/notifications/unread-count", headers=owner).json()["data"]["unread_count"] == 1
+
+    # A full batch that coalesces into fewer notifications doesn't end the drain early
+    monkeypatch.setattr(worker, "drain", lambda: 0)
+    for i in range(3):
+        client.post(f"/responses/?craving_id={craving['id']}", json={"message": f"More {i}"}, headers=_auth_header(responder_token))
+    monkeypatch.delattr(worker, "drain")
+    monkeypatch.setattr(worker, "batch_size", 2)
+    worker.drain()
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        assert db.query(NotificationOutbox).count() == 0
+    finally:
+        db.close()
+    assert [n["count"] for n in client.get("/notifications/", headers=owner).json()["data"]] == [4]
+
+
+def test_prune_notifications_applies_retention_in_batches(client: TestClient):
+    from datetime import timedelta
+    from sqlalchemy import select
+    from notifications import retention
+    from notifications.models import Notification
+
+    owner_token, _ = _signup(client, "pruneowner", "prune.owner@example.com", "+12345678949")
+    responder_token, _ = _signup(client, "pruneresponder", "prune.responder@example.com", "+12345678950")
+    owner = _auth_header(owner_token)
+    for _ in range(4):
+        craving = _create_craving(client, owner_token)
+        client.post(f"/responses/?craving_id={craving['id']}", json={"message": "Offer"}, headers=_auth_header(responder_token))
+    ids = [n["id"] for n in client.get("/notifications/", headers=owner).json()["data"]]
+    client.post("/notifications/mark-read", json={"notification_ids": [ids[1], ids[3]]}, headers=owner)
+
+    # (age in days, read): past the one-year limit, read past 90 days, unread past 90 days, recent read
+    now = datetime.utcnow()
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        for notification_id, days in zip(ids, [400, 100, 100, 10]):
+            _move_notification(db, notification_id, now - timedelta(days=days))
+        db.commit()
+
+        read_before, any_before = retention.retention_cutoffs(now)
+        assert retention.is_partitioned(db) is False
+        assert [retention.prune_batch(db, read_before, any_before, batch_size=1) for _ in range(3)] == [1, 1, 0]
+        assert sorted(db.scalars(select(Notification.id))) == sorted([ids[2], ids[3]])
+    finally:
+        db.close()
+    assert client.get("/notifications/unread-count", headers=owner).json()["data"]["unread_count"] == 1
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from authentication.schemas import StandardResponse
+from cravings.schemas import CravingResponse
+from fast_json import FastJSONResponse, get_adapter, render_model
+from notifications.schemas import NotificationResponse
+from vendor_profile.schemas import VendorProfileResponse
+
+NOW = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def _default_encoding(model_type, content) -> bytes:
+    """What FastAPI produces for `return content` with `response_model=model_type`"""
+    field = create_response_field(name="Response_test", type_=model_type)
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(serialized).body
+
+
+def _craving(i: int):
+    return SimpleNamespace(
+        id=f"c{i}", user_id="u1", name=f"Jollof ñ \"{i}\"", description=None, category="food",
+        price_estimate=Decimal("1500.50"), delivery_address="Ikeja", recommended_vendor=None,
+        vendor_link="https://vendor.example/x", notes="Extra pepper 🌶", status="open", image_url=None,
+        share_token=f"s{i}", created_at=NOW, updated_at=datetime(2026, 3, 1), fulfilled_at=None,
+        response_count=i, pending_response_count=0, last_response_at=None,
+    )
+
+
+def _notification(i: int):
+    return SimpleNamespace(
+        id=f"n{i}", user_id="u1", notification_type="craving_response", title="New Response",
+        message="Someone responded", craving_id="c1", response_id=None, is_read=bool(i % 2),
+        read_at=NOW if i % 2 else None, created_at=NOW,
+    )
+
+
+def _vendor_profile():
+    category = SimpleNamespace(id=1, name="Food", description=None, created_at=NOW, updated_at=NOW)
+    item = SimpleNamespace(
+        id="i1", vendor_id="v1", item_name="Suya", item_description=None, item_price=Decimal("18.50"),
+        item_image_url=None, availability_status="available", created_at=NOW, updated_at=None,
+    )
+    return SimpleNamespace(
+        vendor_id="v1", business_name="Owner Foods", service_category_id=1, vendor_address=None,
+        vendor_phone="+12345678901", vendor_email=None, logo_url=None, banner_url=None,
+        rating=Decimal("4.50"), is_verified=False, status="active", verification_status="pending",
+        created_at=NOW, updated_at=NOW, category=category, items=[item],
+    )
+
+
+def test_render_model_matches_default_fastapi_encoding():
+    cases = [
+        (StandardResponse[List[CravingResponse]], [_craving(i) for i in range(3)]),
+        (StandardResponse[List[NotificationResponse]], [_notification(i) for i in range(3)]),
+        (StandardResponse[VendorProfileResponse], _vendor_profile()),
+        (StandardResponse[List[CravingResponse]], []),
+    ]
+    for model_type, data in cases:
+        content = {"success": True, "message": "ok", "data": data}
+        assert render_model(model_type, content) == _default_encoding(model_type, content)
+
+
+def test_adapters_are_cached_per_type():
+    model_type = StandardResponse[List[NotificationResponse]]
+    assert get_adapter(model_type) is get_adapter(model_type)
+
+
+def test_fast_json_response_matches_json_response():
+    content = {"success": False, "message": "Craving not found – ñ", "data": None}
+    assert FastJSONResponse(content).body == JSONResponse(content).body
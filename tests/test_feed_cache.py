@@ -0,0 +1,75 @@
+import threading
+import time
+
+from cravings.feed_cache import FeedCache, LocalVersion
+
+
+def test_feed_cache_hits_until_version_bump():
+    cache = FeedCache(ttl=60, stale_ttl=0, max_entries=8)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return f"page-{len(builds)}".encode()
+
+    assert cache.get_or_build(("open", None, 0, 50), build) == b"page-1"
+    assert cache.get_or_build(("open", None, 0, 50), build) == b"page-1"
+
+    cache.bump_version()
+    assert cache.get_or_build(("open", None, 0, 50), build) == b"page-2"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_ratio"] == round(1 / 3, 4)
+
+
+def test_feed_cache_serves_stale_while_single_rebuild_runs():
+    cache = FeedCache(ttl=60, stale_ttl=60, max_entries=8)
+    key = (None, None, 0, 50)
+    cache.get_or_build(key, lambda: b"old")
+    cache.bump_version()
+
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def slow_build():
+        builds.append(1)
+        started.set()
+        release.wait(5)
+        return b"new"
+
+    rebuilder = threading.Thread(target=cache.get_or_build, args=(key, slow_build))
+    rebuilder.start()
+    started.wait(5)
+
+    # Concurrent readers during the rebuild get the stale page, not a DB query
+    assert [cache.get_or_build(key, slow_build) for _ in range(5)] == [b"old"] * 5
+
+    release.set()
+    rebuilder.join(5)
+    assert cache.get_or_build(key, slow_build) == b"new"
+    assert len(builds) == 1
+    assert cache.stats()["stale_hits"] == 5
+
+
+def test_feed_cache_evicts_least_recently_used():
+    cache = FeedCache(ttl=60, stale_ttl=0, max_entries=2)
+    for page in range(3):
+        cache.get_or_build(page, lambda: str(time.monotonic()).encode())
+    assert cache.stats()["entries"] == 2
+
+
+def test_feed_cache_version_is_shared_between_workers():
+    # Two workers' caches on one counter, as with FEED_CACHE_REDIS_URL
+    versions = LocalVersion()
+    worker_a = FeedCache(ttl=60, stale_ttl=0, max_entries=8)
+    worker_b = FeedCache(ttl=60, stale_ttl=0, max_entries=8)
+    worker_a.set_versions(versions)
+    worker_b.set_versions(versions)
+
+    assert worker_a.get_or_build("page", lambda: b"a-old") == b"a-old"
+    worker_b.bump_version()
+    assert worker_a.get_or_build("page", lambda: b"a-new") == b"a-new"
+    assert worker_a.stats()["version"] == worker_b.stats()["version"] == 1
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+from notifications.broker import NotificationBroker, SubscriptionOverflow
+from notifications.routes import _sse_frame
+
+
+def test_events_published_from_other_threads_reach_subscribers():
+    broker = NotificationBroker(queue_size=10, heartbeat=1)
+
+    async def scenario():
+        subscription = broker.subscribe("user-1")
+        other = broker.subscribe("user-2")
+        publisher = threading.Thread(target=broker.publish, args=("user-1", {"id": "e1"}))
+        publisher.start()
+        publisher.join()
+        assert await subscription.get(timeout=1) == {"id": "e1"}
+        # Nothing for other users; an idle stream times out into a heartbeat
+        assert await other.get(timeout=0.01) is None
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(other)
+        broker.publish("user-1", {"id": "e2"})
+
+    asyncio.run(scenario())
+    assert broker._subscriptions == {}
+
+
+def test_slow_consumers_overflow_instead_of_buffering():
+    broker = NotificationBroker(queue_size=3, heartbeat=1)
+
+    async def scenario():
+        subscription = broker.subscribe("user-1")
+        for i in range(5):
+            broker.publish("user-1", {"id": i})
+        await asyncio.sleep(0)  # Let the loop run the queued deliveries
+        with pytest.raises(SubscriptionOverflow):
+            await subscription.get(timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_sse_frames():
+    assert _sse_frame("ping", None, None) == b": ping\n\n"
+    assert _sse_frame("notification", {"a": 1}, "abc") == b'id: abc\nevent: notification\ndata: {"a":1}\n\n'
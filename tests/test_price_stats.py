@@ -0,0 +1,71 @@
+import random
+import statistics
+import threading
+from contextlib import nullcontext
+
+from price_stats import PriceStats, RunningStats, TDigest
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def test_digest_quantiles_track_exact_values():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(8, 0.6) for _ in range(20000)]
+    spread = _exact_quantile(values, 0.9) - _exact_quantile(values, 0.1)
+
+    incremental = TDigest(compression=100)
+    for value in values:
+        incremental.add(value)
+    rebuilt = TDigest.from_values(values, compression=100)
+
+    for digest in (incremental, rebuilt):
+        assert len(digest.means) <= 100
+        for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+            assert abs(digest.quantile(q) - _exact_quantile(values, q)) < 0.02 * spread
+
+
+def test_running_stats_match_statistics_module():
+    values = [1200.0, 1500.0, 2500.0, 900.0, 3100.0]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert stats.count == 5
+    assert round(stats.mean, 6) == round(statistics.mean(values), 6)
+    assert round(stats.stddev, 6) == round(statistics.stdev(values), 6)
+    assert (stats.min, stats.max) == (900.0, 3100.0)
+
+
+def test_price_stats_rebuilds_after_stale_writes():
+    rows = [("food", 1000), ("food", 3000), ("drinks", 500)]
+    loads = []
+    scan = threading.Event()
+
+    def loader(_db):
+        loads.append(1)
+        if len(loads) > 1:
+            scan.wait(5)
+        return list(rows)
+
+    stats = PriceStats(loader, rebuild_seconds=3600, max_stale_writes=2, session_factory=nullcontext)
+    assert stats.summary(None, "food")["p50"] == 2000
+    stats.record("food", 5000)
+    assert stats.summary(None, "food")["count"] == 3
+    assert stats.summary(None, "snacks") == {"count": 0}
+    assert len(loads) == 1
+
+    rows.remove(("food", 1000))
+    stats.mark_stale()
+    stats.mark_stale()
+    # The rebuild runs in the background; reads meanwhile get the previous snapshot
+    assert stats.summary(None, "food")["count"] == 3
+    assert stats.summary(None, "food")["count"] == 3
+    # Recorded while the scan runs: replayed into the rebuilt digest, not lost in the swap
+    stats.record("food", 7000)
+    scan.set()
+    stats.wait_for_rebuild(timeout=5)
+    rebuilt = stats.summary(None, "food")
+    assert (rebuilt["count"], rebuilt["min"], rebuilt["max"]) == (2, 3000, 7000)
+    assert len(loads) == 2
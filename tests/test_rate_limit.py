@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+
+from rate_limit import MemoryBackend, RateLimit, RateLimiter
+
+
+def test_sliding_window_weights_the_previous_window():
+    backend = MemoryBackend()
+    rule = RateLimit(limit=10, window=60)
+
+    for _ in range(10):
+        assert backend.hit([("k", rule)], now=30) == 0
+    wait = backend.hit([("k", rule)], now=59)
+    assert 0 < wait <= 1 + 60 * 0.1
+
+    # Halfway into the next window the 10 earlier hits still count as 5
+    allowed = sum(backend.hit([("k", rule)], now=90) == 0 for _ in range(10))
+    assert allowed == 5
+    # Two windows later they no longer count at all
+    assert sum(backend.hit([("k", rule)], now=180) == 0 for _ in range(20)) == 10
+
+
+def test_limiter_checks_rules_in_order_and_reports_retry_after():
+    limiter = RateLimiter(MemoryBackend())
+    per_client = RateLimit(limit=2, window=60)
+    per_target = RateLimit(limit=3, window=60)
+
+    for client in ("a", "a", "b"):
+        limiter.check([(f"client:{client}", per_client), ("target", per_target)], now=0)
+
+    with pytest.raises(HTTPException) as exhausted_client:
+        limiter.check([("client:a", per_client), ("target", per_target)], now=1)
+    assert exhausted_client.value.status_code == 429
+
+    with pytest.raises(HTTPException) as exhausted_target:
+        limiter.check([("client:c", per_client), ("target", per_target)], now=1)
+    assert int(exhausted_target.value.headers["Retry-After"]) >= 59
+
+
+def test_rejected_request_counts_against_no_rule():
+    limiter = RateLimiter(MemoryBackend())
+    per_client = RateLimit(limit=2, window=60)
+    per_target = RateLimit(limit=1, window=60)
+
+    limiter.check([("client:a", per_client), ("target:busy", per_target)], now=0)
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            limiter.check([("client:a", per_client), ("target:busy", per_target)], now=1)
+
+    # The turned-away requests didn't use up the client's own budget
+    limiter.check([("client:a", per_client), ("target:quiet", per_target)], now=2)
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_keys=3)
+    rule = RateLimit(limit=1, window=60)
+    for key in "abcd":
+        backend.hit([(key, rule)], now=0)
+    # "a" was evicted, so it is allowed again
+    assert backend.hit([("a", rule)], now=1) == 0
+    assert backend.hit([("d", rule)], now=1) > 0
@@ -0,0 +1,20 @@
+from cravings.trending import TrendingTracker
+
+
+def test_tracker_keeps_the_strongest_candidates_and_reads_top_k():
+    tracker = TrendingTracker(capacity=3, refresh_seconds=60, flush_seconds=60)
+    for craving_id, rank in [("a", 1.0), ("b", 5.0), ("c", 3.0)]:
+        tracker.observe(craving_id, rank)
+    assert tracker.top(2) == [("b", 5.0), ("c", 3.0)]
+
+    # Full: a weaker newcomer is ignored, a stronger one evicts the weakest
+    tracker.observe("d", 0.5)
+    tracker.observe("e", 4.0)
+    assert tracker.top(5) == [("b", 5.0), ("e", 4.0), ("c", 3.0)]
+
+    # Updated and discarded candidates leave outdated heap entries behind
+    tracker.observe("c", 6.0)
+    tracker.discard("b")
+    tracker.observe("f", 2.0)
+    tracker.observe("g", 1.0)
+    assert tracker.top(3) == [("c", 6.0), ("e", 4.0), ("f", 2.0)]
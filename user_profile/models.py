@@ -5,7 +5,7 @@ from database import Base
 class UserProfile(Base):
     __tablename__ = "user_profiles"
 
-    user_id = Column(String, ForeignKey("users.id"), primary_key=True, nullable=False)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, nullable=False)
     bio = Column(String, nullable=True)
     phone_number = Column(String, nullable=False)  
     delivery_address = Column(String, nullable=True)
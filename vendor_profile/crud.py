@@ -1,6 +1,25 @@
 # vendor_profile/crud.py
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from vendor_profile import models, schemas
+from mutations import update_owned, delete_owned, unchanged
+from database import SessionLocal
+from price_stats import PriceStats, PRICE_STATS_REBUILD_SECONDS, PRICE_STATS_MAX_STALE_WRITES, PRICE_STATS_SCAN_BATCH
+
+
+def _item_prices(db: Session):
+    return db.query(models.VendorProfile.service_category_id, models.VendorItem.item_price).join(
+        models.VendorProfile, models.VendorProfile.vendor_id == models.VendorItem.vendor_id
+    ).filter(models.VendorProfile.service_category_id.isnot(None)).yield_per(PRICE_STATS_SCAN_BATCH)
+
+
+# Item prices keyed by the vendor's service category
+item_price_stats = PriceStats(
+    _item_prices,
+    rebuild_seconds=PRICE_STATS_REBUILD_SECONDS,
+    max_stale_writes=PRICE_STATS_MAX_STALE_WRITES,
+    session_factory=SessionLocal,
+)
 
 
 # ---------------- SERVICE CATEGORY ----------------
@@ -8,6 +27,15 @@ def get_service_categories(db: Session):
     return db.query(models.ServiceCategory).all()
 
 
+def get_service_categories_version(db: Session):
+    """Cheap change detector for the (small) service_categories table"""
+    return db.query(
+        func.count(models.ServiceCategory.id),
+        func.max(models.ServiceCategory.id),
+        func.max(models.ServiceCategory.updated_at),
+    ).one()
+
+
 # ---------------- VENDOR PROFILE ----------------
 def create_vendor_profile(db: Session, vendor_id: str, profile: schemas.VendorProfileCreate):
     db_profile = models.VendorProfile(
@@ -30,21 +58,66 @@ def get_vendor_profile(db: Session, vendor_id: str):
     return db.query(models.VendorProfile).filter(models.VendorProfile.vendor_id == vendor_id).first()
 
 
-def update_vendor_profile(db: Session, vendor_id: str, profile_update: schemas.VendorProfileUpdate):
+def _vendor_profile_version_columns():
+    """
+    Validator columns of a vendor profile with its category and items. They are
+    correlated to the vendor_profiles row, so they serve both the version query
+    and the If-Match criteria of its UPDATE.
+    """
+    profile = models.VendorProfile
+    return (
+        profile.updated_at,
+        select(models.ServiceCategory.updated_at).where(
+            models.ServiceCategory.id == profile.service_category_id
+        ).scalar_subquery(),
+        select(func.count(models.VendorItem.id)).where(
+            models.VendorItem.vendor_id == profile.vendor_id
+        ).scalar_subquery(),
+        select(func.max(models.VendorItem.updated_at)).where(
+            models.VendorItem.vendor_id == profile.vendor_id
+        ).scalar_subquery(),
+    )
+
+
+def get_vendor_profile_version(db: Session, vendor_id: str):
+    """Validator for a vendor profile with its category and items; None if no profile"""
+    return db.query(*_vendor_profile_version_columns()).filter(models.VendorProfile.vendor_id == vendor_id).first()
+
+
+def update_vendor_profile(
+    db: Session, vendor_id: str, profile_update: schemas.VendorProfileUpdate, expected_version=None
+):
+    """
+    Update a vendor profile with one UPDATE that also re-checks `expected_version`
+    (see get_vendor_profile_version). Returns None if there is no profile or it
+    no longer matches.
+    """
     db_profile = get_vendor_profile(db, vendor_id)
     if not db_profile:
         return None
 
-    for key, value in profile_update.model_dump(exclude_unset=True).items():
-        setattr(db_profile, key, value)
+    data = profile_update.model_dump(exclude_unset=True)
+    if not data:
+        return db_profile
+    previous_category = db_profile.service_category_id
+    criteria = () if expected_version is None else tuple(
+        unchanged(db, _vendor_profile_version_columns(), expected_version)
+    )
+    values = {getattr(models.VendorProfile, key): value for key, value in data.items()}
+    if not update_owned(db, models.VendorProfile.vendor_id, vendor_id, vendor_id, values, criteria):
+        db.rollback()
+        return None
 
     db.commit()
+    if db_profile.service_category_id != previous_category:
+        # The vendor's items now count towards another category
+        item_price_stats.mark_stale()
     db.refresh(db_profile)
     return db_profile
 
 
 # ---------------- VENDOR ITEMS ----------------
-def add_vendor_item(db: Session, vendor_id: str, item_data: schemas.VendorItemCreate):
+def add_vendor_item(db: Session, vendor_id: str, item_data: schemas.VendorItemCreate, service_category_id: int = None):
     new_item = models.VendorItem(
         vendor_id=vendor_id,
         item_name=item_data.item_name,
@@ -55,6 +128,7 @@ def add_vendor_item(db: Session, vendor_id: str, item_data: schemas.VendorItemCr
     )
     db.add(new_item)
     db.commit()
+    item_price_stats.record(service_category_id, item_data.item_price)
     db.refresh(new_item)
     return new_item
 
@@ -63,14 +137,41 @@ def get_vendor_items(db: Session, vendor_id: str):
     return db.query(models.VendorItem).filter(models.VendorItem.vendor_id == vendor_id).all()
 
 
+def get_vendor_items_export_query(db: Session, vendor_id: str):
+    """Unmaterialized query over a vendor's whole catalog (see exports.py)"""
+    return db.query(models.VendorItem).filter(
+        models.VendorItem.vendor_id == vendor_id
+    ).order_by(models.VendorItem.created_at, models.VendorItem.id)
+
+
+def get_item_price_stats(db: Session, service_category_id: int) -> dict:
+    return {"service_category_id": service_category_id, **item_price_stats.summary(db, service_category_id)}
+
+
 def get_vendor_item(db: Session, item_id: str):
     return db.query(models.VendorItem).filter(models.VendorItem.id == item_id).first()
 
 
-def delete_vendor_item(db: Session, item_id: str):
-    item = get_vendor_item(db, item_id)
-    if item:
-        db.delete(item)
-        db.commit()
-        return True
-    return False
+def update_vendor_item(db: Session, item_id: str, vendor_id: str, values: dict):
+    """Single UPDATE ... RETURNING on an item owned by `vendor_id`; None if nothing matched"""
+    item = update_owned(
+        db, models.VendorItem.vendor_id, item_id, vendor_id,
+        {getattr(models.VendorItem, key): value for key, value in values.items()},
+    )
+    if not item:
+        db.rollback()
+        return None
+    db.expunge(item)
+    db.commit()
+    if "item_price" in values:
+        item_price_stats.mark_stale()
+    return item
+
+
+def delete_vendor_item(db: Session, item_id: str, vendor_id: str) -> bool:
+    if not delete_owned(db, models.VendorItem.vendor_id, item_id, vendor_id):
+        db.rollback()
+        return False
+    db.commit()
+    item_price_stats.mark_stale()
+    return True
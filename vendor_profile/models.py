@@ -46,17 +46,17 @@ class ServiceCategory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    vendors = relationship("VendorProfile", back_populates="category")
+    vendors = relationship("VendorProfile", back_populates="category", passive_deletes=True)
 
 
 # --- Vendor profile (1-to-1 with user) ---
 class VendorProfile(Base):
     __tablename__ = "vendor_profiles"  # Fixed: was "vendor_profile"
 
-    vendor_id = Column(String, ForeignKey("users.id"), primary_key=True, nullable=False, index=True)
+    vendor_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, nullable=False, index=True)
 
     business_name = Column(String(200), nullable=True)
-    service_category_id = Column(Integer, ForeignKey("service_categories.id"), nullable=True)
+    service_category_id = Column(Integer, ForeignKey("service_categories.id", ondelete="SET NULL"), nullable=True)
 
     vendor_address = Column(Text, nullable=True)
     vendor_phone = Column(String(50), nullable=True)
@@ -77,7 +77,7 @@ class VendorProfile(Base):
     # Relationships
     user = relationship("User", back_populates="vendor_profile")
     category = relationship("ServiceCategory", back_populates="vendors")
-    items = relationship("VendorItem", back_populates="vendor", cascade="all, delete-orphan")
+    items = relationship("VendorItem", back_populates="vendor", cascade="all, delete-orphan", passive_deletes=True)
 
 
 # --- Items sold by vendors (1 vendor -> many items) ---
@@ -85,7 +85,7 @@ class VendorItem(Base):
     __tablename__ = "vendor_items"
 
     id = Column(String, primary_key=True, default=shortuuid.uuid, index=True)
-    vendor_id = Column(String, ForeignKey("vendor_profiles.vendor_id"), nullable=False, index=True)
+    vendor_id = Column(String, ForeignKey("vendor_profiles.vendor_id", ondelete="CASCADE"), nullable=False, index=True)
 
     item_name = Column(String(200), nullable=False)
     item_description = Column(Text, nullable=True)
@@ -1,15 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
 from sqlalchemy.orm import Session
 from authentication.auth import get_current_active_user
 from authentication import models as auth_models, schemas as auth_schemas
 from authentication.models import UserType
 from authentication.role_helpers import require_vendor_role, can_access_vendor_features
 from database import get_db
-from vendor_profile import crud, schemas
+from vendor_profile import crud, models, schemas
 from cloudinary_setup import upload_image
+from http_cache import weak_etag, not_modified_response, if_match_version, precondition_failed
+from fast_json import fast_response
+from mutations import raise_missing_or_forbidden
+from exports import ExportFormat, stream_export
 
 router = APIRouter()
 
+VendorProfileResponse = auth_schemas.StandardResponse[schemas.VendorProfileResponse]
+VendorItemListResponse = auth_schemas.StandardResponse[list[schemas.VendorItemResponse]]
+
+
+def _vendor_profile_etag(db: Session, vendor_id: str):
+    version = crud.get_vendor_profile_version(db, vendor_id)
+    return weak_etag("vendor", vendor_id, *version) if version else None
+
+
+def _if_match(request: Request, db: Session, vendor_id: str):
+    """Profile version the request's If-Match matched; the UPDATE re-checks it in its WHERE clause"""
+    return if_match_version(
+        request,
+        lambda: crud.get_vendor_profile_version(db, vendor_id),
+        lambda version: weak_etag("vendor", vendor_id, *version),
+    )
+
 
 # ---------------- SERVICE CATEGORIES ----------------
 @router.get("/categories", response_model=auth_schemas.StandardResponse[list[schemas.ServiceCategoryResponse]])
@@ -57,35 +78,49 @@ def create_vendor_profile(
     }
 
 
-@router.get("/", response_model=auth_schemas.StandardResponse[schemas.VendorProfileResponse])
+@router.get("/", response_model=VendorProfileResponse)
 def get_vendor_profile(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Get current vendor's profile"""
     require_vendor_role(current_user)
 
+    etag = _vendor_profile_etag(db, current_user.id)
+    if not etag:
+        raise HTTPException(status_code=404, detail="Vendor profile not found.")
+    cached = not_modified_response(request, response, etag)
+    if cached:
+        return cached
+
     profile = crud.get_vendor_profile(db, current_user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="Vendor profile not found.")
-    return {
+    return fast_response(VendorProfileResponse, {
         "success": True,
         "message": "Vendor profile retrieved successfully",
         "data": profile
-    }
+    }, headers={"ETag": etag})
 
 
 @router.put("/", response_model=auth_schemas.StandardResponse[schemas.VendorProfileResponse])
 def update_vendor_profile(
     profile_update: schemas.VendorProfileUpdate,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
 ):
     """Update vendor profile"""
     require_vendor_role(current_user)
+    expected_version = _if_match(request, db, current_user.id)
 
-    updated_profile = crud.update_vendor_profile(db, current_user.id, profile_update)
+    updated_profile = crud.update_vendor_profile(db, current_user.id, profile_update, expected_version)
     if not updated_profile:
+        if expected_version is not None and crud.get_vendor_profile_version(db, current_user.id) is not None:
+            # Changed by another request after the If-Match check
+            raise precondition_failed()
         raise HTTPException(status_code=404, detail="Vendor profile not found.")
     return {
         "success": True,
@@ -174,7 +209,7 @@ def add_item(
     if not profile:
         raise HTTPException(status_code=400, detail="Create vendor profile before adding items.")
     
-    new_item = crud.add_vendor_item(db, current_user.id, item)
+    new_item = crud.add_vendor_item(db, current_user.id, item, service_category_id=profile.service_category_id)
     return {
         "success": True,
         "message": "Item added successfully",
@@ -182,7 +217,7 @@ def add_item(
     }
 
 
-@router.get("/items", response_model=auth_schemas.StandardResponse[list[schemas.VendorItemResponse]])
+@router.get("/items", response_model=VendorItemListResponse)
 def list_vendor_items(
     db: Session = Depends(get_db),
     current_user: auth_models.User = Depends(get_current_active_user),
@@ -190,11 +225,37 @@ def list_vendor_items(
     """Get all items for current vendor"""
     require_vendor_role(current_user)
     items = crud.get_vendor_items(db, current_user.id)
-    return {
+    return fast_response(VendorItemListResponse, {
         "success": True,
         "message": "Vendor items retrieved successfully",
         "data": items
-    }
+    })
+
+
+@router.get("/items/price-stats", response_model=auth_schemas.StandardResponse[schemas.ItemPriceStatsResponse])
+def get_item_price_stats(
+    service_category_id: int,
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Typical item prices among vendors in a service category"""
+    return fast_response(auth_schemas.StandardResponse[schemas.ItemPriceStatsResponse], {
+        "success": True,
+        "message": "Price stats retrieved successfully",
+        "data": crud.get_item_price_stats(db, service_category_id)
+    })
+
+
+@router.get("/items/export")
+def export_vendor_items(
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    db: Session = Depends(get_db),
+    current_user: auth_models.User = Depends(get_current_active_user),
+):
+    """Download the current vendor's item catalog as NDJSON or CSV"""
+    require_vendor_role(current_user)
+    query = crud.get_vendor_items_export_query(db, current_user.id)
+    return stream_export(db, query, schemas.VendorItemResponse, format, "vendor-items")
 
 
 @router.post("/items/{item_id}/upload-image", response_model=auth_schemas.StandardResponse[schemas.VendorItemResponse])
@@ -207,6 +268,7 @@ async def upload_item_image(
     """Upload image for a specific item"""
     require_vendor_role(current_user)
     
+    # Checked up front so we never upload on behalf of someone else
     item = crud.get_vendor_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found.")
@@ -219,9 +281,9 @@ async def upload_item_image(
         if not image_url:
             raise HTTPException(status_code=500, detail="Image upload failed")
         
-        item.item_image_url = image_url
-        db.commit()
-        db.refresh(item)
+        item = crud.update_vendor_item(db, item_id, current_user.id, {"item_image_url": image_url})
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found.")
         return {
             "success": True,
             "message": "Item image uploaded successfully",
@@ -240,16 +302,12 @@ def delete_vendor_item(
     """Delete an item"""
     require_vendor_role(current_user)
     
-    item = crud.get_vendor_item(db, item_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found.")
-    
-    if item.vendor_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this item.")
-    
-    success = crud.delete_vendor_item(db, item_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete item")
+    if not crud.delete_vendor_item(db, item_id, current_user.id):
+        raise_missing_or_forbidden(
+            db, models.VendorItem.vendor_id, item_id,
+            not_found="Item not found.",
+            forbidden="Not authorized to delete this item.",
+        )
     return {
         "success": True,
         "message": "Item deleted successfully"
@@ -61,6 +61,19 @@ class VendorItemResponse(VendorItemBase):
         from_attributes = True
 
 
+class ItemPriceStatsResponse(BaseModel):
+    service_category_id: int
+    count: int
+    mean: Optional[float] = None
+    stddev: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+
+
 # ---------------- VENDOR PROFILE ----------------
 class VendorProfileBase(BaseModel):
     business_name: Optional[str] = None